@@ -1,19 +1,15 @@
-import os
-from openai import OpenAI
-from dotenv import load_dotenv
+from client_registry import get_client_registry
 
 class AIAnalyzer:
     def __init__(self):
-        load_dotenv()
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.client = get_client_registry().openai_client()
 
     def analyze_sentiment(self, texts):
         if not texts:
             return 0
         
-        # Reload environment variables and reinitialize client
-        load_dotenv()
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        # Picks up a key changed in settings; otherwise the pooled client is reused
+        self.client = get_client_registry().openai_client()
         
         # Combine texts for batch analysis
         combined_text = "\n".join(texts[:5])  # Analyze up to 5 tweets at once
@@ -37,9 +33,8 @@ class AIAnalyzer:
         if not tweets:
             return "No tweets available for analysis."
             
-        # Reload environment variables and reinitialize client
-        load_dotenv()
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        # Picks up a key changed in settings; otherwise the pooled client is reused
+        self.client = get_client_registry().openai_client()
         
         # Combine tweets for analysis
         tweet_text = "\n".join([tweet.text for tweet in tweets[:3]])
@@ -1,49 +1,72 @@
+import contextvars
+import json
 import os
+import sys
 import logging
-from datetime import datetime, timedelta
-import pandas as pd
-from alpaca.trading.client import TradingClient
-from alpaca.trading.requests import MarketOrderRequest
-from alpaca.trading.enums import OrderSide, TimeInForce
-from alpaca.data.historical import StockHistoricalDataClient
-from alpaca.data.requests import StockBarsRequest
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from alpaca.common.enums import Sort
+from alpaca.common.exceptions import APIError
+from alpaca.trading.requests import GetOrdersRequest, MarketOrderRequest
+from alpaca.trading.enums import OrderSide, OrderStatus, QueryOrderStatus, TimeInForce
 from alpaca.data.timeframe import TimeFrame
-from dotenv import load_dotenv
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout as RequestsTimeout
+from bar_store import BarStore
+from client_registry import get_client_registry
+from config import ACCOUNT_CONFIG, BAR_FETCH_CONFIG, ORDER_STORE_CONFIG, ORDER_SUBMIT_CONFIG
+from portfolio_analytics import analyze_portfolio, chart_columns, position_columns, positions_digest
+from order_store import decode_cursor, encode_cursor, get_order_store, trade_key
+from single_flight import SingleFlight, coalesced
+import threading
 import time
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+def _from_micros(micros):
+    return datetime.fromtimestamp(micros / 1e6, tz=timezone.utc)
+
+def _is_transient(error):
+    """Timeouts, dropped connections, 429s and 5xx responses are worth retrying"""
+    if isinstance(error, APIError):
+        status = error.status_code or 0
+        return status == 429 or status >= 500
+    return isinstance(error, (TimeoutError, ConnectionError, RequestsConnectionError, RequestsTimeout))
+
 class AlpacaClient:
     def __init__(self):
         """Initialize Alpaca client with API credentials"""
         logger.info("Initializing AlpacaClient...")
-        load_dotenv()
         
-        # Get API credentials
-        self.api_key = os.getenv('ALPACA_API_KEY')
-        self.api_secret = os.getenv('ALPACA_API_SECRET')
-        self.paper_trading = os.getenv('ALPACA_PAPER_TRADING', 'True').lower() == 'true'
+        # Credentials and pooled clients are shared with every other service in the process
+        registry = get_client_registry()
+        self.api_key, self.api_secret, self.paper_trading = registry.alpaca_credentials()
         
         if not all([self.api_key, self.api_secret]):
             logger.error("Alpaca API credentials not found in environment variables")
             raise ValueError("Missing Alpaca API credentials")
             
-        # Initialize clients
-        logger.debug("Creating Alpaca trading client...")
-        self.trading_client = TradingClient(self.api_key, self.api_secret, paper=self.paper_trading)
+        self.trading_client = registry.trading_client()
+        self.data_client = registry.data_client()
+        registry.add_rotation_listener(self.handle_credentials_rotated)
+        self.bar_store = BarStore(**BAR_FETCH_CONFIG)
+        self._single_flight = SingleFlight()
         
-        logger.debug("Creating Alpaca data client...")
-        self.data_client = StockHistoricalDataClient(self.api_key, self.api_secret)
+        # One (account, positions) snapshot shared by every account/portfolio method
+        self._snapshot = None
+        self._snapshot_generation = 0
+        self._snapshot_lock = threading.Lock()
+        self._analysis = None  # (positions it was computed from, analysis)
+        self._charts = {}  # kind -> (analysis, positions digest, JSON body)
         
-        logger.info(f"Initialized Alpaca client (Paper Trading: {self.paper_trading})")
+        # Orders and fills are kept current by the trade-updates stream
+        self.order_store = get_order_store(self.trading_client)
+        # Held weakly by the shared store and registered once, so discarded clients don't pile up
+        self.order_store.add_listener(self.handle_order_update)
         
-        # Test connection
-        self.test_connection()
+        logger.info(f"Initialized Alpaca client (Paper Trading: {self.paper_trading})")
+        # The connection check runs separately (services.py readiness check) so building
+        # the client never blocks on the network
 
     def test_connection(self):
         """Test connection to Alpaca API"""
@@ -61,69 +84,116 @@ class AlpacaClient:
             logger.error(f"Failed to connect to Alpaca API: {e}")
             return False
 
+    def _account_snapshot(self):
+        """Return a coherent (account, positions) pair no older than the snapshot TTL"""
+        with self._snapshot_lock:
+            snapshot, generation = self._snapshot, self._snapshot_generation
+        if snapshot and time.monotonic() - snapshot[0] < ACCOUNT_CONFIG['snapshot_ttl']:
+            return snapshot[1], snapshot[2]
+        return self._refresh_account_snapshot(generation)
+
+    @coalesced
+    def _refresh_account_snapshot(self, generation):
+        """Fetch account and positions together.
+
+        The generation is part of the coalescing key, so callers arriving
+        after an invalidation never share a fetch that started before it.
+        """
+        logger.debug("Fetching account snapshot...")
+        account = self.trading_client.get_account()
+        positions = self.trading_client.get_all_positions()
+        with self._snapshot_lock:
+            if generation == self._snapshot_generation:
+                self._snapshot = (time.monotonic(), account, positions)
+        return account, positions
+
+    def invalidate_account_snapshot(self):
+        """Drop the cached account/positions so the next read refetches them"""
+        with self._snapshot_lock:
+            self._snapshot = None
+            self._snapshot_generation += 1
+
+    def handle_credentials_rotated(self):
+        """Switch to the clients the registry rebuilt for new Alpaca keys"""
+        registry = get_client_registry()
+        self.api_key, self.api_secret, self.paper_trading = registry.alpaca_credentials()
+        self.trading_client = registry.trading_client()
+        self.data_client = registry.data_client()
+        self.invalidate_account_snapshot()
+
+    def handle_order_update(self, event, order=None):
+        """React to a trade update for one of our orders (e.g. from the trade stream)"""
+        if self._changes_account(event):
+            self.invalidate_account_snapshot()
+
+    @staticmethod
+    def _changes_account(event):
+        """Whether a trade-update event can change the account's cash or positions"""
+        return event in ('fill', 'partial_fill', 'canceled', 'expired', 'rejected')
+
+    @staticmethod
+    def _is_duplicate_rejection(status_code):
+        """A 409/422 may mean the client_order_id was already used by an earlier attempt"""
+        return status_code in (409, 422)
+
+    @staticmethod
+    def _format_positions(positions):
+        return [
+            {
+                'symbol': position.symbol,
+                'qty': float(position.qty),
+                'avg_entry_price': float(position.avg_entry_price),
+                'current_price': float(position.current_price),
+                'market_value': float(position.market_value),
+                'unrealized_pl': float(position.unrealized_pl),
+                'unrealized_plpc': float(position.unrealized_plpc)
+            }
+            for position in positions
+        ]
+
+    @staticmethod
+    def _format_account(account):
+        return {
+            'id': account.id,
+            'cash': float(account.cash),
+            'portfolio_value': float(account.portfolio_value),
+            'buying_power': float(account.buying_power),
+            'initial_margin': float(account.initial_margin),
+            'maintenance_margin': float(account.maintenance_margin),
+            'daytrade_count': account.daytrade_count,
+            'last_equity': float(account.last_equity),
+            'status': account.status
+        }
+
     def get_positions(self):
         """Get current positions"""
         try:
-            logger.debug("Fetching positions...")
-            positions = self.trading_client.get_all_positions()
+            _, positions = self._account_snapshot()
             
             if not positions:
                 logger.warning("No positions found")
                 return []
             
-            # Format positions data
-            formatted_positions = []
-            for position in positions:
-                formatted_position = {
-                    'symbol': position.symbol,
-                    'qty': float(position.qty),
-                    'avg_entry_price': float(position.avg_entry_price),
-                    'current_price': float(position.current_price),
-                    'market_value': float(position.market_value),
-                    'unrealized_pl': float(position.unrealized_pl),
-                    'unrealized_plpc': float(position.unrealized_plpc)
-                }
-                formatted_positions.append(formatted_position)
-            
-            logger.info(f"Positions formatted: {formatted_positions}")
+            formatted_positions = self._format_positions(positions)
+            logger.debug("Formatted %d positions", len(formatted_positions))
             return formatted_positions
             
         except Exception as e:
             logger.error(f"Error getting positions: {e}")
             return []
 
+    @coalesced
     def get_historical_data(self, symbol, timeframe=TimeFrame.Day, limit=100):
         """Get historical price data for a symbol"""
         try:
             # Get current time and calculate start time
-            end = datetime.now()
+            end = datetime.now(timezone.utc)
             start = end - timedelta(days=limit)
             
-            request = StockBarsRequest(
-                symbol_or_symbols=symbol,
-                timeframe=timeframe,
-                start=start,
-                end=end
-            )
-            bars = self.data_client.get_stock_bars(request)
-            
-            if not bars or symbol not in bars:
-                logger.error(f"No data returned for {symbol}")
-                return None
-                
-            # Convert to pandas DataFrame
-            df = pd.DataFrame([{
-                'timestamp': bar.timestamp,
-                'open': float(bar.open),
-                'high': float(bar.high),
-                'low': float(bar.low),
-                'close': float(bar.close),
-                'volume': int(bar.volume)
-            } for bar in bars[symbol]])
+            # Served from the local bar store; only the missing tail is downloaded
+            df = self.bar_store.sync(self.data_client, symbol, timeframe, start, end)
             
             if len(df) > 0:
-                df.set_index('timestamp', inplace=True)
-                df.sort_index(inplace=True)
                 logger.info(f"Retrieved {len(df)} bars of historical data for {symbol}")
             else:
                 logger.warning(f"No historical data found for {symbol}")
@@ -134,19 +204,11 @@ class AlpacaClient:
             logger.error(f"Error getting historical data for {symbol}: {e}")
             return None
 
-    def place_market_order(self, symbol, qty, side='buy'):
+    def place_market_order(self, symbol, qty, side='buy', client_order_id=None):
         """Place a market order"""
         try:
-            order_side = OrderSide.BUY if side.lower() == 'buy' else OrderSide.SELL
-            
-            order_request = MarketOrderRequest(
-                symbol=symbol,
-                qty=qty,
-                side=order_side,
-                time_in_force=TimeInForce.DAY
-            )
-            
-            order = self.trading_client.submit_order(order_request)
+            order = self._submit_market_order(symbol, qty, side, client_order_id)
+            self.invalidate_account_snapshot()
             logger.info(f"Placed {side} order for {qty} shares of {symbol}")
             return order
             
@@ -154,21 +216,104 @@ class AlpacaClient:
             logger.error(f"Error placing order for {symbol}: {e}")
             return None
 
+    def _submit_market_order(self, symbol, qty, side, client_order_id=None):
+        order_request = MarketOrderRequest(
+            symbol=symbol,
+            qty=qty,
+            side=OrderSide.BUY if side.lower() == 'buy' else OrderSide.SELL,
+            time_in_force=TimeInForce.DAY,
+            client_order_id=client_order_id
+        )
+        order = self.trading_client.submit_order(order_request)
+        self.order_store.upsert(order)
+        return order
+
+    def submit_bulk_orders(self, orders, batch_id=None, max_workers=None):
+        """Submit market orders concurrently and report the outcome of each.
+
+        ``orders`` is a list of dicts with symbol, qty and side. Every order
+        gets a client_order_id derived from ``batch_id`` and its position, so
+        resubmitting the same batch (or a retry after a timeout) can never
+        create a duplicate order. Callers should derive ``batch_id`` from
+        what the batch is for (e.g. the trading pass); the random default
+        only protects retries within this call. Results come back in input
+        order.
+        """
+        batch_id = batch_id or uuid.uuid4().hex[:12]
+        max_workers = max_workers or ORDER_SUBMIT_CONFIG['max_workers']
+        started = time.perf_counter()
+        
+        def submit(index, order):
+            client_order_id = order.get('client_order_id') or f"bulk-{batch_id}-{index}"
+            return self._submit_idempotent(order['symbol'], order['qty'], order.get('side', 'buy'), client_order_id)
+        
+        results = []
+        if orders:
+            # Workers inherit the caller's context (request priority) like bar downloads do
+            contexts = [contextvars.copy_context() for _ in orders]
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(orders))) as pool:
+                results = list(pool.map(
+                    lambda context, index, order: context.run(submit, index, order),
+                    contexts, range(len(orders)), orders))
+            self.invalidate_account_snapshot()
+        
+        submitted = sum(1 for result in results if result['success'])
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Bulk batch {batch_id}: {submitted}/{len(results)} orders submitted in {elapsed_ms:.0f}ms")
+        return {
+            'batch_id': batch_id,
+            'submitted': submitted,
+            'failed': len(results) - submitted,
+            'elapsed_ms': elapsed_ms,
+            'results': results
+        }
+
+    def _submit_idempotent(self, symbol, qty, side, client_order_id):
+        """Submit one order, retrying transient failures under the same client_order_id"""
+        started = time.perf_counter()
+        result = {'symbol': symbol, 'qty': qty, 'side': side, 'client_order_id': client_order_id,
+                  'success': False, 'order_id': None, 'status': None, 'error': None, 'attempts': 0}
+        for attempt in range(1, ORDER_SUBMIT_CONFIG['max_attempts'] + 1):
+            result['attempts'] = attempt
+            try:
+                try:
+                    order = self._submit_market_order(symbol, qty, side, client_order_id)
+                except APIError as e:
+                    if not self._is_duplicate_rejection(e.status_code):
+                        raise
+                    # A duplicate client_order_id means an earlier attempt (or submission
+                    # of this batch) already reached Alpaca; any other rejection has no order
+                    order = self._order_by_client_id(client_order_id)
+                    if order is None:
+                        raise
+            except Exception as e:
+                # The request may or may not have reached Alpaca; a retry under the same id is safe
+                if _is_transient(e) and attempt < ORDER_SUBMIT_CONFIG['max_attempts']:
+                    logger.warning(f"Retrying order {client_order_id} for {symbol}: {e}")
+                    continue
+                result['error'] = str(e)
+                break
+            result.update(success=True, order_id=str(order.id), status=getattr(order.status, 'value', order.status))
+            break
+        if result['error']:
+            logger.error(f"Error placing order {client_order_id} for {symbol}: {result['error']}")
+        result['latency_ms'] = (time.perf_counter() - started) * 1000
+        return result
+
+    def _order_by_client_id(self, client_order_id):
+        """The order submitted under client_order_id, or None if Alpaca has none"""
+        try:
+            return self.trading_client.get_order_by_client_id(client_order_id)
+        except APIError as e:
+            if e.status_code == 404:
+                return None
+            raise
+
     def get_account_info(self):
         """Get detailed account information"""
         try:
-            account = self.trading_client.get_account()
-            return {
-                'id': account.id,
-                'cash': float(account.cash),
-                'portfolio_value': float(account.portfolio_value),
-                'buying_power': float(account.buying_power),
-                'initial_margin': float(account.initial_margin),
-                'maintenance_margin': float(account.maintenance_margin),
-                'daytrade_count': account.daytrade_count,
-                'last_equity': float(account.last_equity),
-                'status': account.status
-            }
+            account, _ = self._account_snapshot()
+            return self._format_account(account)
         except Exception as e:
             logger.error(f"Error getting account info: {e}")
             return None
@@ -176,73 +321,30 @@ class AlpacaClient:
     def get_portfolio_analysis(self):
         """Get detailed portfolio analysis including performance metrics"""
         try:
-            positions = self.get_positions()
-            account = self.get_account_info()
-            
-            if not positions or not account:
-                return None
-                
-            # Calculate portfolio metrics
-            total_market_value = float(account['portfolio_value'])
-            total_pl = sum(pos['unrealized_pl'] for pos in positions)
-            
-            # Calculate position-specific metrics
-            position_analysis = []
-            for pos in positions:
-                market_value = float(pos['market_value'])
-                weight = (market_value / total_market_value) * 100
-                pl_pct = float(pos['unrealized_plpc']) * 100
-                
-                position_analysis.append({
-                    'symbol': pos['symbol'],
-                    'shares': float(pos['qty']),
-                    'market_value': market_value,
-                    'weight': weight,
-                    'entry_price': float(pos['avg_entry_price']),
-                    'current_price': float(pos['current_price']),
-                    'pl_dollars': float(pos['unrealized_pl']),
-                    'pl_percent': pl_pct
-                })
-            
-            # Sort positions by market value (weight)
-            position_analysis.sort(key=lambda x: x['market_value'], reverse=True)
-            
-            # Calculate portfolio concentration
-            top_5_weight = sum(pos['weight'] for pos in position_analysis[:5])
-            
-            # Performance metrics
-            winners = [pos for pos in position_analysis if pos['pl_percent'] > 0]
-            losers = [pos for pos in position_analysis if pos['pl_percent'] <= 0]
-            
-            avg_winner = sum(pos['pl_percent'] for pos in winners) / len(winners) if winners else 0
-            avg_loser = sum(pos['pl_percent'] for pos in losers) / len(losers) if losers else 0
-            
-            # Risk metrics
-            max_gain = max(pos['pl_percent'] for pos in position_analysis)
-            max_loss = min(pos['pl_percent'] for pos in position_analysis)
-            
-            analysis = {
-                'portfolio_value': total_market_value,
-                'cash': float(account['cash']),
-                'buying_power': float(account['buying_power']),
-                'total_pl': total_pl,
-                'positions_count': len(positions),
-                'winning_positions': len(winners),
-                'losing_positions': len(losers),
-                'avg_winner_return': avg_winner,
-                'avg_loser_return': avg_loser,
-                'max_position_gain': max_gain,
-                'max_position_loss': max_loss,
-                'top_5_concentration': top_5_weight,
-                'positions': position_analysis
-            }
-            
+            # Account and positions must come from the same snapshot; analysis is reused until it changes
+            raw_account, raw_positions = self._account_snapshot()
+            cached = self._analysis
+            if cached is not None and cached[0] is raw_positions:
+                return cached[1]
+            analysis = self._analyze_portfolio(raw_account, raw_positions)
+            self._analysis = (raw_positions, analysis)
             return analysis
             
         except Exception as e:
             logger.error(f"Error analyzing portfolio: {e}")
             return None
 
+    @staticmethod
+    def _analyze_portfolio(raw_account, raw_positions):
+        if not raw_positions or not raw_account:
+            return None
+        return analyze_portfolio(
+            position_columns(raw_positions),
+            float(raw_account.portfolio_value),
+            float(raw_account.cash),
+            float(raw_account.buying_power)
+        )
+
     def get_portfolio_summary(self):
         """Get portfolio summary data"""
         logger.debug("Fetching portfolio summary...")
@@ -251,38 +353,10 @@ class AlpacaClient:
 
         for attempt in range(retry_count):
             try:
-                # Get account information
-                logger.debug(f"Getting account information (attempt {attempt + 1}/{retry_count})...")
-                account = self.trading_client.get_account()
-                logger.debug(f"Account info received: {account}")
-                
-                # Get all positions
-                logger.debug(f"Getting positions (attempt {attempt + 1}/{retry_count})...")
-                positions = self.trading_client.get_all_positions()
-                logger.debug(f"Retrieved {len(positions)} positions")
-                
-                # Calculate total P&L
-                total_pl = sum(float(pos.unrealized_pl) for pos in positions)
-                logger.debug(f"Total P&L calculated: {total_pl}")
-                
-                # Calculate daily P&L
-                daily_pl = float(account.equity) - float(account.last_equity)
-                logger.debug(f"Daily P&L calculated: {daily_pl}")
-                
-                summary = {
-                    'portfolio_value': float(account.portfolio_value),
-                    'cash': float(account.cash),
-                    'buying_power': float(account.buying_power),
-                    'total_pl': total_pl,
-                    'daily_pl': daily_pl,
-                    'daily_pl_percent': (daily_pl / float(account.last_equity)) * 100 if float(account.last_equity) != 0 else 0,
-                    'positions_count': len(positions),
-                    'status': account.status,
-                    'timestamp': datetime.now().isoformat(),
-                    'last_update_successful': True
-                }
-                
-                logger.info(f"Portfolio summary generated: {summary}")
+                # Get account information and positions
+                account, positions = self._account_snapshot()
+                summary = self._summarize_portfolio(account, positions)
+                logger.debug("Portfolio summary generated for %d positions", len(positions))
                 return summary
                 
             except Exception as e:
@@ -298,6 +372,23 @@ class AlpacaClient:
                         'timestamp': datetime.now().isoformat()
                     }
 
+    @staticmethod
+    def _summarize_portfolio(account, positions):
+        total_pl = sum(float(pos.unrealized_pl) for pos in positions)
+        daily_pl = float(account.equity) - float(account.last_equity)
+        return {
+            'portfolio_value': float(account.portfolio_value),
+            'cash': float(account.cash),
+            'buying_power': float(account.buying_power),
+            'total_pl': total_pl,
+            'daily_pl': daily_pl,
+            'daily_pl_percent': (daily_pl / float(account.last_equity)) * 100 if float(account.last_equity) != 0 else 0,
+            'positions_count': len(positions),
+            'status': account.status,
+            'timestamp': datetime.now().isoformat(),
+            'last_update_successful': True
+        }
+
     def print_portfolio_summary(self):
         """Print a formatted summary of the portfolio analysis"""
         try:
@@ -323,6 +414,9 @@ class AlpacaClient:
             
             logger.info("\n=== Portfolio Concentration ===")
             logger.info(f"Top 5 Positions Weight: {analysis['top_5_concentration']:.1f}%")
+            logger.info(f"HHI: {analysis['hhi']:.3f} ({analysis['effective_positions']:.1f} effective positions)")
+            logger.info(f"Gross/Net Exposure: {analysis['exposure']['gross_percent']:.1f}% / "
+                      f"{analysis['exposure']['net_percent']:.1f}%")
             
             logger.info("\n=== Top 5 Positions by Size ===")
             for pos in analysis['positions'][:5]:
@@ -330,35 +424,86 @@ class AlpacaClient:
                           f"({pos['weight']:.1f}% of portfolio, {pos['pl_percent']:+.2f}% P/L)")
             
             logger.info("\n=== Best Performing Positions ===")
-            best = sorted(analysis['positions'], key=lambda x: x['pl_percent'], reverse=True)[:3]
-            for pos in best:
+            for pos in analysis['best_positions']:
                 logger.info(f"{pos['symbol']}: {pos['pl_percent']:+.2f}% "
                           f"(${pos['pl_dollars']:,.2f})")
             
             logger.info("\n=== Worst Performing Positions ===")
-            worst = sorted(analysis['positions'], key=lambda x: x['pl_percent'])[:3]
-            for pos in worst:
+            for pos in analysis['worst_positions']:
                 logger.info(f"{pos['symbol']}: {pos['pl_percent']:+.2f}% "
                           f"(${pos['pl_dollars']:,.2f})")
                 
         except Exception as e:
             logger.error(f"Error printing portfolio summary: {e}")
 
-    def create_portfolio_visualizations(self):
-        """Create interactive portfolio visualizations using Plotly"""
+    def get_portfolio_charts(self):
+        """Return (version, JSON body) of the full Plotly figures for the portfolio charts.
+
+        Figures are only rebuilt and serialized when the positions change;
+        the version is a digest of the positions the charts were built from.
+        """
+        def build(analysis):
+            figures = self.create_portfolio_visualizations(analysis=analysis)
+            if not figures:
+                return None
+            return '{' + ', '.join(f'"{name}": {figure.to_json()}' for name, figure in figures.items()) + '}'
+        return self._versioned_chart_body('figures', build)
+
+    def get_portfolio_chart_data(self):
+        """Return (version, JSON body) of the columnar data behind the dashboard charts.
+
+        Only the arrays are sent; the figure templates live in
+        static/js/portfolio_charts.js. The version matches get_portfolio_charts.
+        """
+        def build(analysis):
+            return json.dumps(chart_columns(analysis['positions']), separators=(',', ':'))
+        return self._versioned_chart_body('data', build)
+
+    def _versioned_chart_body(self, kind, build):
         try:
+            analysis = self.get_portfolio_analysis()
+            if not analysis:
+                logger.error("Could not generate portfolio analysis for visualization")
+                return None
+            
+            cached = self._charts.get(kind)
+            if cached is not None and cached[0] is analysis:
+                return cached[1], cached[2]
+            version = positions_digest(analysis['positions'])
+            if cached is not None and cached[1] == version:
+                self._charts[kind] = (analysis, version, cached[2])
+                return version, cached[2]
+            
+            body = build(analysis)
+            if body is None:
+                return None
+            self._charts[kind] = (analysis, version, body)
+            logger.info(f"Rebuilt portfolio chart {kind} (version {version})")
+            return version, body
+            
+        except Exception as e:
+            logger.error(f"Error getting portfolio chart {kind}: {e}")
+            return None
+
+    def create_portfolio_visualizations(self, output_dir=None, analysis=None):
+        """Create interactive portfolio visualizations using Plotly.
+
+        With ``output_dir`` each figure is also written as an HTML file that
+        loads one shared plotly.min.js from that directory.
+        """
+        try:
+            import pandas as pd
             import plotly.graph_objects as go
             import plotly.express as px
             from plotly.subplots import make_subplots
             import os
             
-            analysis = self.get_portfolio_analysis()
+            analysis = analysis or self.get_portfolio_analysis()
             if not analysis:
                 logger.error("Could not generate portfolio analysis for visualization")
                 return
                 
             # Create output directory if specified
-            output_dir = None
             if output_dir:
                 os.makedirs(output_dir, exist_ok=True)
             
@@ -453,12 +598,12 @@ class AlpacaClient:
             )])
             fig_pie.update_layout(title='Portfolio Allocation')
             
-            # Save all figures if output directory is specified
+            # Save all figures if output directory is specified; plotly.js is written once beside them
             if output_dir:
-                fig_treemap.write_html(os.path.join(output_dir, 'portfolio_treemap.html'))
-                fig_dist.write_html(os.path.join(output_dir, 'return_distribution.html'))
-                fig_wl.write_html(os.path.join(output_dir, 'winners_losers.html'))
-                fig_pie.write_html(os.path.join(output_dir, 'portfolio_allocation.html'))
+                fig_treemap.write_html(os.path.join(output_dir, 'portfolio_treemap.html'), include_plotlyjs='directory')
+                fig_dist.write_html(os.path.join(output_dir, 'return_distribution.html'), include_plotlyjs='directory')
+                fig_wl.write_html(os.path.join(output_dir, 'winners_losers.html'), include_plotlyjs='directory')
+                fig_pie.write_html(os.path.join(output_dir, 'portfolio_allocation.html'), include_plotlyjs='directory')
                 
                 logger.info(f"\nVisualization files saved to: {output_dir}")
                 logger.info("Files created:")
@@ -478,37 +623,108 @@ class AlpacaClient:
             logger.error(f"Error creating portfolio visualizations: {e}")
             return None
 
-    def get_recent_trades(self, limit=50):
-        """Get recent trades"""
+    def get_recent_trades(self, limit=50, status='filled', symbols=None, after=None, until=None,
+                          cursor=None, since=None):
+        """Get recent trades (filled orders by default), newest first by fill time.
+
+        ``after``/``until`` bound the fill time (the submission time of
+        unfilled orders), ``cursor`` continues with the page older than a
+        previous result's cursor and ``since`` returns only trades newer
+        than that cursor. Fills after the local order table's horizon are
+        served from memory. Alpaca is queried only for a window that
+        explicitly reaches past the horizon (an older ``after``/``since``,
+        or paging on with ``until``/``cursor``), so an unbounded request
+        lists the fills since the horizon without any network call.
+        """
         try:
-            logger.debug(f"Fetching {limit} recent trades...")
-            
-            # Get all orders
-            trades = self.trading_client.get_orders()
+            logger.debug("Fetching %d recent trades", limit)
+            symbols = {s.upper() for s in symbols} if symbols else None
+            
+            # Bounds are exclusive trade keys; sys.maxunicode sorts after any order id
+            upper = decode_cursor(cursor) if cursor else None
+            if until is not None:
+                upper = min(upper or (float('inf'), ''), (round(until.timestamp() * 1e6), ''))
+            lower = decode_cursor(since) if since else None
+            if after is not None:
+                lower = max(lower or (0, ''), (round(after.timestamp() * 1e6), chr(sys.maxunicode)))
+            
+            store = self.order_store
+            if status == 'filled' and store.ensure_started():
+                # Every fill from the store's horizon on is in memory; Alpaca is asked only for older ones
+                horizon = round(store.horizon.timestamp() * 1e6)
+                in_store = (horizon, chr(sys.maxunicode))  # Keys above this are in the store
+                trades = store.recent_fills(limit, symbols, before=upper, since=max(lower or in_store, in_store))
+                past_horizon = lower < in_store if lower is not None else upper is not None
+                if len(trades) < limit and past_horizon:
+                    older_upper = min(upper or (float('inf'), ''), (horizon + 1, ''))
+                    trades += self._query_trades(limit - len(trades), status, symbols, lower, older_upper)
+            else:
+                trades = self._query_trades(limit, status, symbols, lower, upper)
             
             if not trades:
-                logger.warning("No trades found")
+                logger.debug("No trades found")
                 return []
             
-            # Filter and format the trades
-            formatted_trades = []
-            for trade in trades[:limit]:  # Limit the number of trades manually
-                if trade.status == 'filled':  # Only include filled orders
-                    formatted_trade = {
-                        'id': trade.id,
-                        'symbol': trade.symbol,
-                        'side': trade.side,
-                        'qty': float(trade.filled_qty),
-                        'filled_price': float(trade.filled_avg_price) if trade.filled_avg_price else 0.0,
-                        'timestamp': trade.filled_at.isoformat() if trade.filled_at else None,
-                        'type': trade.type,
-                        'status': trade.status
-                    }
-                    formatted_trades.append(formatted_trade)
+            formatted_trades = [self._format_trade(trade) for trade in trades]
             
-            logger.info(f"Retrieved {len(formatted_trades)} trades")
+            logger.debug("Retrieved %d trades", len(formatted_trades))
             return formatted_trades[:limit]  # Ensure we don't exceed the limit
             
         except Exception as e:
             logger.error(f"Error getting recent trades: {e}", exc_info=True)
             return []
+
+    @staticmethod
+    def _format_trade(trade):
+        return {
+            'id': trade.id,
+            'symbol': trade.symbol,
+            'side': trade.side,
+            'qty': float(trade.filled_qty),
+            'filled_price': float(trade.filled_avg_price) if trade.filled_avg_price else 0.0,
+            'timestamp': trade.filled_at.isoformat() if trade.filled_at else None,
+            'type': trade.type,
+            'status': trade.status,
+            'cursor': encode_cursor(trade_key(trade))
+        }
+
+    def _query_trades(self, limit, status, symbols, lower, upper, max_pages=20):
+        """Page through Alpaca's orders endpoint with status, symbol and time filters pushed down.
+
+        Alpaca filters on submission time. A trade is submitted no later than
+        it is keyed, so the upper bound is pushed down as is. The lower bound
+        is pushed down only for open orders, because an order submitted
+        before it may still have filled after it.
+        """
+        one_micro = timedelta(microseconds=1)
+        page_until = _from_micros(upper[0]) + one_micro if upper and upper[0] != float('inf') else None
+        page_after = _from_micros(lower[0]) - one_micro if lower and status == 'open' else None
+        query_status = QueryOrderStatus.OPEN if status == 'open' else (
+            QueryOrderStatus.ALL if status == 'all' else QueryOrderStatus.CLOSED)
+        
+        trades = []
+        seen = set()
+        for _ in range(max_pages):
+            page = self.trading_client.get_orders(GetOrdersRequest(
+                status=query_status,
+                symbols=sorted(symbols) if symbols else None,
+                after=page_after,
+                until=page_until,
+                limit=ORDER_STORE_CONFIG['page_size'],
+                direction=Sort.DESC
+            ))
+            new = [order for order in page if str(order.id) not in seen]
+            seen.update(str(order.id) for order in new)
+            for order in new:
+                key = trade_key(order)
+                if (upper and key >= upper) or (lower and key <= lower):
+                    continue
+                if status == 'filled' and order.status != OrderStatus.FILLED:
+                    continue
+                trades.append(order)
+            if len(trades) >= limit or len(page) < ORDER_STORE_CONFIG['page_size'] or not new:
+                break
+            # Ask for the next page from the oldest order seen, inclusively; repeats are dropped by id
+            page_until = min(order.submitted_at for order in page) + one_micro
+        trades.sort(key=trade_key, reverse=True)
+        return trades[:limit]
@@ -0,0 +1,411 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from alpaca.trading.models import Order, Position, TradeAccount
+
+from alpaca_client import AlpacaClient
+from cache import TTLCache
+from client_registry import get_client_registry
+from config import ACCOUNT_CONFIG, ASYNC_HTTP_CONFIG, CACHE_CONFIG
+from market_data_service import SNAPSHOT_LOOKBACK, MarketDataService
+from market_feed import get_shared_feed
+from rate_limiter import get_rate_limiter, get_request_priority, priority_for, set_request_priority
+
+logger = logging.getLogger(__name__)
+
+PAPER_TRADING_URL = 'https://paper-api.alpaca.markets'
+LIVE_TRADING_URL = 'https://api.alpaca.markets'
+DATA_URL = 'https://data.alpaca.markets'
+
+
+class AsyncAlpacaSession:
+    """One pooled httpx.AsyncClient for Alpaca's trading and data APIs.
+
+    Requests take a token from the shared rate limiter without blocking the
+    event loop, and 429s, 5xx responses and transport errors are retried
+    after an ``asyncio.sleep`` backoff.
+    """
+
+    def __init__(self, api_key, api_secret, paper=True, limiter=None, transport=None, **http_config):
+        config = {**ASYNC_HTTP_CONFIG, **http_config}
+        self.data_url = DATA_URL
+        self.limiter = limiter or get_rate_limiter()
+        self.max_retries = config['max_retries']
+        self.backoff = config['backoff']
+        self._client_options = {
+            'timeout': config['timeout'],
+            'limits': httpx.Limits(
+                max_connections=config['max_connections'],
+                max_keepalive_connections=config['max_keepalive_connections'],
+                keepalive_expiry=config['keepalive_expiry']
+            ),
+            'transport': transport
+        }
+        self._client = None
+        self._loop = None
+        self.set_credentials(api_key, api_secret, paper)
+
+    def set_credentials(self, api_key, api_secret, paper=True):
+        """Use new keys from the next request on; pooled connections are kept"""
+        self.trading_url = PAPER_TRADING_URL if paper else LIVE_TRADING_URL
+        self._headers = {'APCA-API-KEY-ID': api_key, 'APCA-API-SECRET-KEY': api_secret}
+
+    def _http(self):
+        # An AsyncClient's connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(**self._client_options)
+            self._loop = loop
+        return self._client
+
+    async def _acquire(self, priority):
+        started = time.monotonic()
+        while True:
+            wait = self.limiter.try_acquire(priority, time.monotonic() - started)
+            if wait is None:
+                return
+            await asyncio.sleep(wait)
+
+    async def request(self, method, url, params=None, json=None):
+        """Send one request and return the decoded JSON body; raises httpx.HTTPError"""
+        priority = priority_for(method, url)
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(priority)
+            try:
+                response = await self._http().request(method, url, params=params, json=json, headers=self._headers)
+                if response.status_code != 429 and response.status_code < 500:
+                    response.raise_for_status()
+                    return response.json()
+                if attempt == self.max_retries:
+                    response.raise_for_status()
+                logger.warning(f"{method} {url} returned {response.status_code}; retrying")
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"{method} {url} failed: {e}; retrying")
+            await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    async def trading(self, method, path, **kwargs):
+        return await self.request(method, self.trading_url + path, **kwargs)
+
+    async def data(self, path, params=None):
+        return await self.request('GET', self.data_url + path, params=params)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class _AsyncSingleFlight:
+    """asyncio counterpart of SingleFlight: concurrent identical calls share one task"""
+
+    def __init__(self):
+        self._tasks = {}
+
+    async def do(self, key, factory):
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(task)
+
+
+class AsyncAlpacaClient:
+    """asyncio counterpart of AlpacaClient returning the same shapes.
+
+    Account and positions are fetched concurrently into one short-TTL
+    snapshot; concurrent readers share the in-flight fetch and retries
+    sleep on the event loop instead of the calling thread. Orders go
+    through the process-wide order store of an AlpacaClient: submissions
+    are recorded in it, its fill updates invalidate the snapshot and recent
+    trades are read from it in a worker thread.
+    """
+
+    def __init__(self, session=None, client=None):
+        self.session = session or get_async_session()
+        self._client = None
+        self._single_flight = _AsyncSingleFlight()
+        self._snapshot = None
+        self._snapshot_generation = 0
+        if client is not None:
+            self._use_client(client)
+
+    def _use_client(self, client):
+        self._client = client
+        # Held weakly by the shared store, like AlpacaClient's own listener
+        client.order_store.add_listener(self.handle_order_update)
+        return client
+
+    async def _account_snapshot(self):
+        snapshot, generation = self._snapshot, self._snapshot_generation
+        if snapshot and time.monotonic() - snapshot[0] < ACCOUNT_CONFIG['snapshot_ttl']:
+            return snapshot[1], snapshot[2]
+        return await self._single_flight.do(
+            ('snapshot', generation), lambda: self._refresh_account_snapshot(generation))
+
+    async def _refresh_account_snapshot(self, generation):
+        account, positions = await asyncio.gather(
+            self.session.trading('GET', '/v2/account'),
+            self.session.trading('GET', '/v2/positions')
+        )
+        account = TradeAccount(**account)
+        positions = [Position(**position) for position in positions]
+        if generation == self._snapshot_generation:
+            self._snapshot = (time.monotonic(), account, positions)
+        return account, positions
+
+    def invalidate_account_snapshot(self):
+        self._snapshot = None
+        self._snapshot_generation += 1
+
+    def handle_order_update(self, event, order=None):
+        """Drop the snapshot when a trade update changes the account; called from the stream thread"""
+        if AlpacaClient._changes_account(event):
+            self.invalidate_account_snapshot()
+
+    async def get_positions(self):
+        """Get current positions"""
+        try:
+            _, positions = await self._account_snapshot()
+            return AlpacaClient._format_positions(positions)
+        except Exception as e:
+            logger.error(f"Error getting positions: {e}")
+            return []
+
+    async def get_account_info(self):
+        """Get detailed account information"""
+        try:
+            account, _ = await self._account_snapshot()
+            return AlpacaClient._format_account(account)
+        except Exception as e:
+            logger.error(f"Error getting account info: {e}")
+            return None
+
+    async def get_portfolio_analysis(self):
+        """Get detailed portfolio analysis including performance metrics"""
+        try:
+            account, positions = await self._account_snapshot()
+            return AlpacaClient._analyze_portfolio(account, positions)
+        except Exception as e:
+            logger.error(f"Error analyzing portfolio: {e}")
+            return None
+
+    async def get_portfolio_summary(self, retry_count=3, retry_delay=1):
+        """Get portfolio summary data, retrying without blocking the event loop"""
+        for attempt in range(retry_count):
+            try:
+                account, positions = await self._account_snapshot()
+                return AlpacaClient._summarize_portfolio(account, positions)
+            except Exception as e:
+                logger.error(f"Error getting portfolio summary (attempt {attempt + 1}/{retry_count}): {e}")
+                if attempt < retry_count - 1:
+                    await asyncio.sleep(retry_delay)
+                    retry_delay *= 2  # Exponential backoff
+                else:
+                    return {
+                        'error': str(e),
+                        'last_update_successful': False,
+                        'timestamp': datetime.now().isoformat()
+                    }
+
+    async def place_market_order(self, symbol, qty, side='buy', client_order_id=None):
+        """Place a market order; the client_order_id makes transport retries safe"""
+        client_order_id = client_order_id or uuid.uuid4().hex
+        try:
+            try:
+                order = await self.session.trading('POST', '/v2/orders', json={
+                    'symbol': symbol,
+                    'qty': str(qty),
+                    'side': 'buy' if side.lower() == 'buy' else 'sell',
+                    'type': 'market',
+                    'time_in_force': 'day',
+                    'client_order_id': client_order_id
+                })
+            except httpx.HTTPStatusError as e:
+                if not AlpacaClient._is_duplicate_rejection(e.response.status_code):
+                    raise
+                # A retried submission that had already reached Alpaca; any other rejection has no order
+                order = await self._order_by_client_id(client_order_id)
+                if order is None:
+                    raise
+            order = Order(**order)
+            client = await self._sync_client()
+            client.order_store.upsert(order)
+            self.invalidate_account_snapshot()
+            logger.info(f"Placed {side} order for {qty} shares of {symbol}")
+            return order
+        except Exception as e:
+            logger.error(f"Error placing order for {symbol}: {e}")
+            return None
+
+    async def _order_by_client_id(self, client_order_id):
+        """The order submitted under client_order_id as JSON, or None if Alpaca has none"""
+        try:
+            return await self.session.trading(
+                'GET', '/v2/orders:by_client_order_id', params={'client_order_id': client_order_id})
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                return None
+            raise
+
+    async def _sync_client(self):
+        if self._client is None:
+            client = await self._single_flight.do('client', lambda: asyncio.to_thread(AlpacaClient))
+            if self._client is None:
+                self._use_client(client)
+        return self._client
+
+    async def get_recent_trades(self, limit=50, status='filled', symbols=None, after=None, until=None,
+                                cursor=None, since=None):
+        """Get recent trades, newest first; see AlpacaClient.get_recent_trades"""
+        try:
+            client = await self._sync_client()
+            return await asyncio.to_thread(client.get_recent_trades, limit, status, symbols, after, until,
+                                           cursor, since)
+        except Exception as e:
+            logger.error(f"Error getting recent trades: {e}")
+            return []
+
+
+class AsyncMarketDataService:
+    """asyncio counterpart of MarketDataService.
+
+    Snapshots are served from the stream and the cache, with REST misses
+    fetched through the pooled session. Calculations backed by the local
+    bar store (indicators, breadth, VWAP) are delegated to a
+    MarketDataService in a worker thread, since they are disk and CPU bound.
+    """
+
+    def __init__(self, session=None, service=None):
+        self.session = session or get_async_session()
+        # One cache with the sync service, so each snapshot is fetched once for both
+        self.cache = service.cache if service is not None else TTLCache(
+            max_entries=CACHE_CONFIG['max_entries'],
+            max_bytes=CACHE_CONFIG['max_bytes'],
+            ttls=CACHE_CONFIG['ttls']
+        )
+        self.feed = get_shared_feed()
+        self._service = service
+        self._single_flight = _AsyncSingleFlight()
+
+    async def _sync_service(self):
+        if self._service is None:
+            service = await self._single_flight.do('service', lambda: asyncio.to_thread(MarketDataService))
+            service.cache = self.cache
+            self._service = service
+        return self._service
+
+    async def _delegate(self, method, *args):
+        service = await self._sync_service()
+        return await asyncio.to_thread(getattr(service, method), *args)
+
+    async def get_market_snapshot(self, symbols):
+        """Get current market snapshot for multiple symbols"""
+        try:
+            symbols = MarketDataService._normalize_symbols(symbols)
+            snapshot = self.feed.snapshot(symbols) if self.feed else {}
+            pending = [symbol for symbol in symbols if symbol not in snapshot]
+            hits, missing = self.cache.get_many('snapshot', pending)
+            snapshot.update(hits)
+            if missing:
+                missing = tuple(sorted(missing))
+                snapshot.update(await self._single_flight.do(
+                    ('snapshot', missing), lambda: self._fetch_snapshot(missing)))
+            return {symbol: snapshot[symbol] for symbol in symbols if symbol in snapshot}
+        except Exception as e:
+            logger.error(f"Error getting market snapshot: {e}", exc_info=True)
+            return None
+
+    async def _fetch_snapshot(self, symbols):
+        """Fetch recent hourly bars for symbols missing from the cache"""
+        end = datetime.now(timezone.utc)
+        params = {
+            'symbols': ','.join(symbols),
+            'timeframe': '1Hour',
+            'start': (end - SNAPSHOT_LOOKBACK).isoformat(),
+            'end': end.isoformat(),
+            'limit': 10000
+        }
+        bars = {}
+        while True:
+            page = await self.session.data('/v2/stocks/bars', params)
+            for symbol, symbol_bars in (page.get('bars') or {}).items():
+                bars.setdefault(symbol, []).extend(symbol_bars)
+            if not page.get('next_page_token'):
+                break
+            params['page_token'] = page['next_page_token']
+
+        snapshot = MarketDataService._snapshot_from_bars(bars, symbols)
+        if not snapshot:
+            logger.warning("No market data received")
+            return {}
+        self.cache.set_many('snapshot', snapshot)
+        return snapshot
+
+    async def get_technical_indicators(self, symbol, days=5):
+        return await self._delegate('get_technical_indicators', symbol, days)
+
+    async def get_technical_indicators_batch(self, symbols, days=5):
+        return await self._delegate('get_technical_indicators_batch', symbols, days)
+
+    async def get_market_breadth(self):
+        return await self._delegate('get_market_breadth')
+
+    async def get_intraday_vwap(self, symbol):
+        return await self._delegate('get_intraday_vwap', symbol)
+
+    async def is_market_open(self):
+        return await self._delegate('is_market_open')
+
+    async def get_market_status(self):
+        return await self._delegate('get_market_status')
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _use_rotated_credentials():
+    _session.set_credentials(*get_client_registry().alpaca_credentials())
+
+
+def get_async_session():
+    """Return the process-wide pooled session, built with the registry's credentials on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            registry = get_client_registry()
+            _session = AsyncAlpacaSession(*registry.alpaca_credentials())
+            registry.add_rotation_listener(_use_rotated_credentials)
+        return _session
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def run_coroutine(coro, timeout=None):
+    """Run `coro` on the shared background event loop and wait for its result.
+
+    Lets threaded code (Flask handlers, the Socket.IO background task) use
+    the asyncio services while every caller shares one loop and one
+    connection pool. The caller's request priority carries over.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='async-services', daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(_with_priority(coro, get_request_priority()), _loop).result(timeout)
+
+
+async def _with_priority(coro, priority):
+    if priority is not None:
+        set_request_priority(priority)  # Scoped to this task's context
+    return await coro
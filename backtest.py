@@ -0,0 +1,227 @@
+"""Replay stored bars through the bot's RSI strategy, vectorized over each symbol's history.
+
+Usage: python backtest.py SYMBOL [SYMBOL ...] [--timeframe 1Day] [--start 2024-01-01] [--end 2024-12-31]
+
+Bars are read from the local BarStore (no network access). Signals, fills,
+positions and P&L are computed with array operations per symbol; only the
+final trade list is built row by row.
+
+The default timeframe is 1Day because the live bot computes its RSI on
+daily bars; other timeframes replay the same rules on a different RSI than
+the bot trades on.
+"""
+import argparse
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from bar_store import BarStore
+from config import TradingConfig
+from logging_setup import configure_logging
+from strategy import BUY, SELL, momentum_params, order_quantity, rsi_signal, wilder_rsi
+
+logger = logging.getLogger(__name__)
+
+LIVE_TIMEFRAME = '1Day'  # BarStore directory of the daily bars market_data_service computes the live RSI from
+
+
+@dataclass
+class FillModel:
+    """Orders decided on a bar fill at the next bar's open (or the same bar's close), plus slippage"""
+    price: str = 'next_open'  # 'next_open' or 'close'
+    slippage_bps: float = 1.0
+
+    def fill_prices(self, opens, closes, side):
+        prices = opens if self.price == 'next_open' else closes
+        return prices * (1 + side * self.slippage_bps / 10000)
+
+
+@dataclass
+class CommissionModel:
+    """Commission per order: per-share plus percent of notional, with a minimum per order"""
+    per_share: float = 0.0
+    percent: float = 0.0
+    minimum: float = 0.0
+
+    def commissions(self, quantity, price):
+        fee = quantity * self.per_share + quantity * price * self.percent / 100
+        return np.where(quantity > 0, np.maximum(fee, self.minimum), 0.0)
+
+
+def _last_index(mask):
+    """For each position, the index of the latest True at or before it (0 if none)"""
+    return np.maximum.accumulate(np.where(mask, np.arange(len(mask)), 0))
+
+
+def simulate_symbol(timestamps, opens, closes, max_position_size, fill_model=None, commission_model=None,
+                    rsi_period=None, oversold=None, overbought=None):
+    """Backtest one symbol; returns (cumulative P&L per bar, trade list, commissions paid).
+
+    The strategy is the live one: buy a full position when RSI is oversold
+    and the symbol is flat, sell it all when RSI is overbought.
+    """
+    fill_model = fill_model or FillModel()
+    commission_model = commission_model or CommissionModel()
+    count = len(closes)
+    signal = rsi_signal(wilder_rsi(closes, rsi_period), oversold, overbought)
+
+    # Long while the latest BUY/SELL signal is a BUY; buy-when-flat/sell-when-holding makes it a forward fill
+    active = signal != 0
+    wanted = signal[_last_index(active)] == BUY
+    if fill_model.price == 'next_open':
+        holding = np.concatenate(([False], wanted[:-1]))  # Acted on at the next bar
+    else:
+        holding = wanted
+    previous = np.concatenate(([False], holding[:-1]))
+    entries, exits = holding & ~previous, ~holding & previous
+
+    buy_prices = fill_model.fill_prices(opens, closes, BUY)
+    sell_prices = fill_model.fill_prices(opens, closes, SELL)
+    entry_qty = np.where(entries, order_quantity(max_position_size, buy_prices), 0.0)
+    quantity = np.where(holding, entry_qty[_last_index(entries)], 0.0)
+    exit_qty = np.where(exits, np.concatenate(([0.0], quantity[:-1])), 0.0)
+
+    buy_fees = commission_model.commissions(entry_qty, buy_prices)
+    sell_fees = commission_model.commissions(exit_qty, sell_prices)
+    cash = np.cumsum(exit_qty * sell_prices - entry_qty * buy_prices - buy_fees - sell_fees)
+    pnl = cash + quantity * closes
+
+    trades = _trade_list(timestamps, closes, entries, exits, entry_qty, buy_prices, sell_prices,
+                         buy_fees, sell_fees, count)
+    return pnl, trades, float(buy_fees.sum() + sell_fees.sum())
+
+
+def _trade_list(timestamps, closes, entries, exits, entry_qty, buy_prices, sell_prices, buy_fees, sell_fees, count):
+    entry = np.flatnonzero(entries & (entry_qty > 0))
+    exit_index = np.flatnonzero(exits)
+    later = np.searchsorted(exit_index, entry, side='right')
+    closed = later < len(exit_index)
+    # Positions still open at the end are marked to the last close
+    exit = np.where(closed, exit_index[np.minimum(later, len(exit_index) - 1)] if len(exit_index) else 0, count - 1)
+    qty = entry_qty[entry]
+    entry_price = buy_prices[entry]
+    exit_price = np.where(closed, sell_prices[exit], closes[exit])
+    pnl = qty * (exit_price - entry_price) - buy_fees[entry] - np.where(closed, sell_fees[exit], 0.0)
+    entry_times = pd.DatetimeIndex(timestamps[entry], tz='UTC')
+    exit_times = pd.DatetimeIndex(timestamps[exit], tz='UTC')
+    return [
+        {
+            'entry_time': entry_time,
+            'exit_time': exit_time if is_closed else None,
+            'qty': shares,
+            'entry_price': entry_px,
+            'exit_price': exit_px,
+            'pnl': trade_pnl,
+            'return_percent': trade_pnl / (shares * entry_px) * 100,
+            'open': not is_closed
+        }
+        for entry_time, exit_time, is_closed, shares, entry_px, exit_px, trade_pnl in zip(
+            entry_times, exit_times, closed.tolist(), qty.tolist(), entry_price.tolist(),
+            exit_price.tolist(), pnl.tolist())
+    ]
+
+
+def run_backtest(bars, max_position_size=None, initial_cash=100_000.0, fill_model=None, commission_model=None,
+                 rsi_period=None, oversold=None, overbought=None):
+    """Backtest every symbol in `bars` ({symbol: BAR_DTYPE records}) and combine the results.
+
+    Each symbol trades independently with ``max_position_size`` dollars,
+    like the live bot. Returns total and per-symbol P&L, the equity curve on
+    the union of all bar timestamps, maximum drawdown and the trades.
+    """
+    max_position_size = max_position_size or TradingConfig().max_position_size
+    rsi_period = rsi_period or momentum_params()[0]
+    results = {}
+    for symbol, records in bars.items():
+        if len(records) <= rsi_period + 1:
+            logger.warning(f"Skipping {symbol}: only {len(records)} bars")
+            continue
+        timestamps = np.asarray(records['timestamp'])
+        pnl, trades, commissions = simulate_symbol(
+            timestamps, np.asarray(records['open']), np.asarray(records['close']), max_position_size,
+            fill_model, commission_model, rsi_period, oversold, overbought)
+        for trade in trades:
+            trade['symbol'] = symbol
+        results[symbol] = (timestamps, pnl, trades, commissions)
+
+    if not results:
+        return None
+
+    # Carry each symbol's P&L forward onto the combined timeline
+    grid = np.concatenate([timestamps for timestamps, _, _, _ in results.values()])
+    grid.sort(kind='stable')  # Timsort merges the already sorted per-symbol runs
+    grid = grid[np.append(True, grid[1:] != grid[:-1])]
+    total_pnl = np.zeros(len(grid))
+    for timestamps, pnl, _, _ in results.values():
+        index = np.searchsorted(timestamps, grid, side='right') - 1
+        total_pnl += np.where(index >= 0, pnl[np.maximum(index, 0)], 0.0)
+
+    equity = initial_cash + total_pnl
+    peak = np.maximum.accumulate(equity)
+    drawdown = equity / peak - 1
+    trades = sorted((trade for _, _, symbol_trades, _ in results.values() for trade in symbol_trades),
+                    key=lambda trade: trade['entry_time'])
+    closed = [trade for trade in trades if not trade['open']]
+    return {
+        'initial_cash': initial_cash,
+        'final_equity': float(equity[-1]),
+        'total_pnl': float(total_pnl[-1]),
+        'return_percent': float(total_pnl[-1] / initial_cash * 100),
+        'max_drawdown_percent': float(drawdown.min() * 100),
+        'commissions': sum(commissions for _, _, _, commissions in results.values()),
+        'trade_count': len(trades),
+        'win_rate': sum(1 for trade in closed if trade['pnl'] > 0) / len(closed) * 100 if closed else 0.0,
+        'symbol_pnl': {symbol: float(pnl[-1]) for symbol, (_, pnl, _, _) in results.items()},
+        'equity': pd.Series(equity, index=pd.DatetimeIndex(grid, tz='UTC', name='timestamp')),
+        'trades': trades
+    }
+
+
+def load_bars(symbols, timeframe=LIVE_TIMEFRAME, start=None, end=None, store=None):
+    """Read stored bars for symbols from the local BarStore; symbols without data are left out"""
+    store = store or BarStore()
+    bars = {}
+    for symbol in symbols:
+        records = store.read_records(symbol.upper(), timeframe, start, end)
+        if len(records):
+            bars[symbol.upper()] = records
+        else:
+            logger.warning(f"No stored {timeframe} bars for {symbol}")
+    return bars
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--timeframe', default=LIVE_TIMEFRAME)
+    parser.add_argument('--start')
+    parser.add_argument('--end')
+    parser.add_argument('--cash', type=float, default=100_000.0)
+    parser.add_argument('--fill', choices=['next_open', 'close'], default='next_open')
+    parser.add_argument('--slippage-bps', type=float, default=1.0)
+    parser.add_argument('--commission-per-share', type=float, default=0.0)
+    parser.add_argument('--commission-min', type=float, default=0.0)
+    args = parser.parse_args()
+
+    configure_logging()
+    bars = load_bars(args.symbols, args.timeframe, args.start, args.end)
+    result = run_backtest(
+        bars, initial_cash=args.cash, fill_model=FillModel(args.fill, args.slippage_bps),
+        commission_model=CommissionModel(per_share=args.commission_per_share, minimum=args.commission_min))
+    if not result:
+        print("No bars to backtest")
+        return
+
+    print(f"Bars: {sum(len(records) for records in bars.values()):,} across {len(bars)} symbols")
+    print(f"Total P/L: ${result['total_pnl']:,.2f} ({result['return_percent']:+.2f}%)")
+    print(f"Max drawdown: {result['max_drawdown_percent']:.2f}%")
+    print(f"Trades: {result['trade_count']} (win rate {result['win_rate']:.1f}%)")
+    print(f"Commissions: ${result['commissions']:,.2f}")
+    for symbol, pnl in sorted(result['symbol_pnl'].items(), key=lambda item: -item[1]):
+        print(f"{symbol:<8}{pnl:>14,.2f}")
+
+
+if __name__ == '__main__':
+    main()
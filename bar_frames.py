@@ -0,0 +1,99 @@
+from operator import attrgetter, itemgetter, methodcaller
+
+import numpy as np
+import pandas as pd
+
+# One record per bar; timestamps are UTC nanoseconds since the epoch
+BAR_DTYPE = np.dtype([
+    ('timestamp', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+BAR_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# Keys used by the raw Alpaca bar payload (StockHistoricalDataClient(raw_data=True))
+RAW_BAR_KEYS = {'timestamp': 't', 'open': 'o', 'high': 'h', 'low': 'l', 'close': 'c', 'volume': 'v'}
+
+
+def bars_by_symbol(bars):
+    """Return the {symbol: [bar, ...]} mapping from a BarSet or a raw bar response"""
+    if not bars:
+        return {}
+    return bars.data if hasattr(bars, 'data') else bars
+
+
+def bar_columns(bar_list):
+    """Extract contiguous NumPy columns from a list of bars.
+
+    Accepts either raw Alpaca payload dicts or parsed Bar objects and never
+    builds an intermediate per-row dict. Timestamps come back as int64 UTC
+    nanoseconds.
+    """
+    count = len(bar_list)
+    if count == 0:
+        return {name: np.empty(0, dtype=BAR_DTYPE[name]) for name in BAR_DTYPE.names}
+
+    raw = isinstance(bar_list[0], dict)
+    getter = (lambda name: itemgetter(RAW_BAR_KEYS[name])) if raw else attrgetter
+    columns = {
+        name: np.fromiter(map(getter(name), bar_list), dtype=np.float64, count=count)
+        for name in BAR_COLUMNS
+    }
+    columns['timestamp'] = _raw_timestamps(bar_list) if raw else _model_timestamps(bar_list)
+    return columns
+
+
+def _raw_timestamps(bar_list):
+    """Parse RFC 3339 UTC strings ("...Z") with NumPy's C parser"""
+    timestamps = list(map(itemgetter('t'), bar_list))
+    if not timestamps[0].endswith('Z'):
+        return pd.to_datetime(timestamps, utc=True, format='ISO8601').asi8
+    return np.array([ts[:-1] for ts in timestamps], dtype='datetime64[ns]').view(np.int64)
+
+
+def _model_timestamps(bar_list):
+    """Convert aware datetimes via epoch seconds, rounded to the microsecond they carry"""
+    seconds = np.fromiter(map(methodcaller('timestamp'), map(attrgetter('timestamp'), bar_list)),
+                          dtype=np.float64, count=len(bar_list))
+    return np.round(seconds * 1e6).astype(np.int64) * 1000
+
+
+def bars_to_records(bar_list):
+    """Convert a list of bars into a BAR_DTYPE record array"""
+    columns = bar_columns(bar_list)
+    records = np.empty(len(columns['timestamp']), dtype=BAR_DTYPE)
+    for name in BAR_DTYPE.names:
+        records[name] = columns[name]
+    return records
+
+
+def _index(timestamps):
+    """Build a UTC DatetimeIndex from int64 nanosecond timestamps without copying"""
+    return pd.DatetimeIndex(timestamps.view('M8[ns]'), tz='UTC', name='timestamp')
+
+
+def bars_to_frame(bar_list):
+    """Convert a list of bars for one symbol into a DataFrame indexed by UTC timestamp"""
+    columns = bar_columns(bar_list)
+    timestamps = columns.pop('timestamp')
+    return pd.DataFrame(columns, index=_index(timestamps))
+
+
+def barset_to_frame(bars):
+    """Convert a multi-symbol bar response into a (symbol, timestamp) MultiIndex DataFrame"""
+    data = bars_by_symbol(bars)
+    parts = {symbol: bar_columns(bar_list) for symbol, bar_list in data.items()}
+    symbols = np.repeat(np.array(list(parts), dtype=object),
+                        [len(cols['timestamp']) for cols in parts.values()])
+    if parts:
+        merged = {name: np.concatenate([cols[name] for cols in parts.values()]) for name in BAR_DTYPE.names}
+    else:
+        merged = {name: np.empty(0, dtype=BAR_DTYPE[name]) for name in BAR_DTYPE.names}
+    index = pd.MultiIndex.from_arrays(
+        [symbols, _index(merged.pop('timestamp'))],
+        names=['symbol', 'timestamp']
+    )
+    return pd.DataFrame(merged, index=index)
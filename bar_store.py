@@ -0,0 +1,318 @@
+import io
+import json
+import logging
+import os
+import contextvars
+import fcntl
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from alpaca.data.requests import StockBarsRequest
+
+from bar_frames import BAR_COLUMNS, BAR_DTYPE, bars_by_symbol, bars_to_records
+
+logger = logging.getLogger(__name__)
+
+# Locks are shared by every BarStore in the process so two services
+# pointing at the same directory never interleave writes to one file
+_key_locks = {}
+_key_locks_guard = threading.Lock()
+
+
+def _to_ns(value):
+    """Convert a datetime (naive values are taken as UTC, like Alpaca does) to epoch ns"""
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize('UTC')
+    return int(ts.value)
+
+
+def _from_ns(value):
+    """Convert epoch ns back to a naive UTC datetime for Alpaca requests"""
+    return pd.Timestamp(value, tz='UTC').tz_convert(None).to_pydatetime()
+
+
+def _merge_records(existing, new):
+    """Merge two record arrays sorted by timestamp, newer rows win on duplicates"""
+    if len(existing) == 0:
+        combined = new
+    elif len(new) == 0:
+        combined = existing
+    else:
+        combined = np.concatenate([existing, new])
+    if len(combined) == 0:
+        return combined
+    order = np.argsort(combined['timestamp'], kind='stable')
+    combined = combined[order]
+    ts = combined['timestamp']
+    keep = np.append(ts[1:] != ts[:-1], True)
+    return combined[keep]
+
+
+def _read_header(f):
+    """Read a .npy header with numpy's format API; returns (version, record count, data offset)"""
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    if dtype != BAR_DTYPE or fortran_order or len(shape) != 1:
+        raise ValueError(f"Unexpected bar file layout: {dtype}, shape {shape}")
+    return version, shape[0], f.tell()
+
+
+@contextmanager
+def _file_lock(f, mode):
+    """Hold an flock on an open bar file: readers share it, an in-place append takes it exclusively"""
+    fcntl.flock(f.fileno(), mode)
+    try:
+        yield
+    finally:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class BarStore:
+    """Local columnar bar store keyed by symbol and timeframe.
+
+    Bars live in one memory-mapped ``.npy`` record file per symbol under
+    ``<root_dir>/<timeframe>/`` next to a small JSON file recording the time
+    range that has already been fetched from Alpaca, so repeated requests only
+    download the missing head or tail of the window.
+    """
+
+    def __init__(self, root_dir=None, max_symbols_per_request=200, max_workers=4):
+        self.root_dir = root_dir or os.getenv('BAR_STORE_DIR', os.path.join('data', 'bars'))
+        self.max_symbols_per_request = max_symbols_per_request
+        self.max_workers = max_workers
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _paths(self, symbol, timeframe):
+        directory = os.path.join(self.root_dir, str(timeframe))
+        name = symbol.replace('/', '_')
+        return (os.path.join(directory, f"{name}.npy"),
+                os.path.join(directory, f"{name}.json"))
+
+    def _lock(self, symbol, timeframe):
+        key = self._paths(symbol, timeframe)[0]
+        with _key_locks_guard:
+            lock = _key_locks.get(key)
+            if lock is None:
+                lock = _key_locks[key] = threading.Lock()
+            return lock
+
+    def _load_records(self, symbol, timeframe):
+        data_path, _ = self._paths(symbol, timeframe)
+        if not os.path.exists(data_path):
+            return np.empty(0, dtype=BAR_DTYPE)
+        with open(data_path, 'rb') as f, _file_lock(f, fcntl.LOCK_SH):
+            _, count, offset = _read_header(f)
+            if count == 0:
+                return np.empty(0, dtype=BAR_DTYPE)
+            return np.memmap(data_path, dtype=BAR_DTYPE, mode='r', offset=offset, shape=(count,))
+
+    def _load_coverage(self, symbol, timeframe):
+        _, meta_path = self._paths(symbol, timeframe)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        return meta['start'], meta['end']
+
+    def _save(self, symbol, timeframe, records, coverage):
+        """Atomically replace the stored records and coverage for a key"""
+        data_path, _ = self._paths(symbol, timeframe)
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        tmp_path = data_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(records))
+        os.replace(tmp_path, data_path)
+        self._save_coverage(symbol, timeframe, coverage)
+
+    def _save_coverage(self, symbol, timeframe, coverage):
+        _, meta_path = self._paths(symbol, timeframe)
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump({'start': coverage[0], 'end': coverage[1]}, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def _append(self, symbol, timeframe, keep, records):
+        """Keep the first `keep` stored records and write `records` after them in place.
+
+        The file only grows: the records are written and flushed before the
+        header's shape is updated, under an exclusive lock that readers
+        share while they read the header, so a reader never maps more
+        records than the file holds. A crash before the header is rewritten
+        leaves the previous record count in place. Returns False when the
+        new shape no longer fits the existing header, in which case the
+        caller rewrites the file.
+        """
+        data_path, _ = self._paths(symbol, timeframe)
+        with open(data_path, 'r+b') as f, _file_lock(f, fcntl.LOCK_EX):
+            version, count, offset = _read_header(f)
+            header = io.BytesIO()
+            header_data = {'descr': np.lib.format.dtype_to_descr(BAR_DTYPE), 'fortran_order': False,
+                           'shape': (keep + len(records),)}
+            if version == (1, 0):
+                np.lib.format.write_array_header_1_0(header, header_data)
+            else:
+                np.lib.format.write_array_header_2_0(header, header_data)
+            if header.tell() != offset or keep + len(records) < count:
+                return False
+            f.seek(offset + keep * BAR_DTYPE.itemsize)
+            f.write(np.ascontiguousarray(records).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+            f.seek(0)
+            f.write(header.getvalue())
+            f.flush()
+        return True
+
+    def read_records(self, symbol, timeframe, start=None, end=None):
+        """Read stored bars for a symbol as a (memory-mapped) BAR_DTYPE record slice"""
+        records = self._load_records(symbol, timeframe)
+        ts = records['timestamp']
+        lo = 0 if start is None else int(np.searchsorted(ts, _to_ns(start), side='left'))
+        hi = len(records) if end is None else int(np.searchsorted(ts, _to_ns(end), side='right'))
+        return records[lo:hi]
+
+    def read(self, symbol, timeframe, start=None, end=None):
+        """Read stored bars for a symbol as a DataFrame indexed by UTC timestamp"""
+        window = self.read_records(symbol, timeframe, start, end)
+        df = pd.DataFrame(
+            {column: np.array(window[column]) for column in BAR_COLUMNS},
+            index=pd.DatetimeIndex(np.array(window['timestamp']), tz='UTC', name='timestamp')
+        )
+        return df
+
+    def last_timestamp(self, symbol, timeframe):
+        """Return the timestamp of the newest stored bar, or None"""
+        records = self._load_records(symbol, timeframe)
+        if len(records) == 0:
+            return None
+        return pd.Timestamp(int(records['timestamp'][-1]), tz='UTC')
+
+    def write(self, symbol, timeframe, records, start, end, reset_coverage=False):
+        """Merge fetched records into the store and extend the covered range.
+
+        Records that only replace the newest stored bar and extend past it
+        (the usual tail sync) are appended in place; anything else rewrites
+        the file.
+        """
+        with self._lock(symbol, timeframe):
+            existing = self._load_records(symbol, timeframe)
+            records = _merge_records(np.empty(0, dtype=BAR_DTYPE), records)
+            coverage = None if reset_coverage else self._load_coverage(symbol, timeframe)
+            start_ns, end_ns = _to_ns(start), _to_ns(end)
+            if coverage:
+                start_ns, end_ns = min(start_ns, coverage[0]), max(end_ns, coverage[1])
+            if (not reset_coverage and len(existing) and len(records)
+                    and records['timestamp'][0] >= existing['timestamp'][-1]):
+                keep = int(np.searchsorted(existing['timestamp'], records['timestamp'][0], side='left'))
+                if keep < len(existing) and existing[keep] == records[0]:
+                    # The refetched last bar is unchanged; leave it alone so open maps never see it rewritten
+                    keep, records = keep + 1, records[1:]
+                del existing  # Release the memory map before writing to the file
+                if not len(records) or self._append(symbol, timeframe, keep, records):
+                    self._save_coverage(symbol, timeframe, (start_ns, end_ns))
+                    return
+                existing = self._load_records(symbol, timeframe)
+            merged = _merge_records(np.array(existing), records)
+            self._save(symbol, timeframe, merged, (start_ns, end_ns))
+
+    def _fetch_chunk(self, data_client, chunk, timeframe, start_ns, end_ns):
+        request = StockBarsRequest(
+            symbol_or_symbols=chunk,
+            timeframe=timeframe,
+            start=_from_ns(start_ns),
+            end=_from_ns(end_ns)
+        )
+        data = bars_by_symbol(data_client.get_stock_bars(request))
+        return {symbol: bars_to_records(data.get(symbol, [])) for symbol in chunk}
+
+    def _fetch(self, data_client, symbols, timeframe, start_ns, end_ns):
+        """Fetch one window for many symbols, one multi-symbol request per chunk.
+
+        Chunks are requested in parallel (up to ``max_workers``) so a large
+        universe costs roughly one round trip per ``max_workers`` chunks.
+        """
+        chunks = [symbols[i:i + self.max_symbols_per_request]
+                  for i in range(0, len(symbols), self.max_symbols_per_request)]
+        if len(chunks) <= 1 or self.max_workers <= 1:
+            results = [self._fetch_chunk(data_client, chunk, timeframe, start_ns, end_ns) for chunk in chunks]
+        else:
+            # Each worker runs in a copy of the caller's context so settings such
+            # as the request priority follow the chunks
+            contexts = [contextvars.copy_context() for _ in chunks]
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as pool:
+                results = list(pool.map(
+                    lambda context, chunk: context.run(
+                        self._fetch_chunk, data_client, chunk, timeframe, start_ns, end_ns),
+                    contexts, chunks))
+        records = {}
+        for result in results:
+            records.update(result)
+        return records
+
+    def _plan_gaps(self, symbol, timeframe, start_ns, end_ns):
+        """Work out which ranges of [start_ns, end_ns] still need downloading.
+
+        Returns the list of gaps and whether the covered range must be reset.
+        The newest stored bar is always part of the tail gap because it may
+        still have been forming when it was first downloaded.
+        """
+        coverage = self._load_coverage(symbol, timeframe)
+        if coverage is None:
+            return [(start_ns, end_ns)], True
+
+        last = self.last_timestamp(symbol, timeframe)
+        tail_start = last.value if last is not None else coverage[1]
+        # A window entirely past the stored range would leave a hole in the
+        # coverage, so start a fresh covered range instead
+        if start_ns > tail_start:
+            return [(start_ns, end_ns)], True
+
+        gaps = []
+        if start_ns < coverage[0]:
+            gaps.append((start_ns, coverage[0]))
+        if end_ns >= tail_start:
+            gaps.append((tail_start, end_ns))
+        return gaps, False
+
+    def sync(self, data_client, symbol, timeframe, start, end=None):
+        """Return bars for [start, end], fetching only ranges not already stored"""
+        return self.sync_many(data_client, [symbol], timeframe, start, end)[symbol]
+
+    def sync_many(self, data_client, symbols, timeframe, start, end=None):
+        """Return a dict of DataFrames for [start, end], one per symbol.
+
+        Symbols that need the same gap filled (typically the tail since the
+        last shared bar) are fetched together in multi-symbol requests.
+        """
+        end = end or datetime.now(timezone.utc)
+        self._fill_gaps(data_client, symbols, timeframe, _to_ns(start), _to_ns(end))
+        return {symbol: self.read(symbol, timeframe, start, end) for symbol in symbols}
+
+    def sync_records(self, data_client, symbols, timeframe, start, end=None):
+        """Like sync_many, but return raw record slices instead of DataFrames"""
+        end = end or datetime.now(timezone.utc)
+        self._fill_gaps(data_client, symbols, timeframe, _to_ns(start), _to_ns(end))
+        return {symbol: self.read_records(symbol, timeframe, start, end) for symbol in symbols}
+
+    def _fill_gaps(self, data_client, symbols, timeframe, start_ns, end_ns):
+        """Download and store every range of [start_ns, end_ns] missing for symbols"""
+        pending = {}
+        for symbol in symbols:
+            gaps, reset = self._plan_gaps(symbol, timeframe, start_ns, end_ns)
+            for gap in gaps:
+                pending.setdefault(gap, []).append((symbol, reset))
+
+        for (gap_start, gap_end), entries in pending.items():
+            fetched = self._fetch(data_client, [symbol for symbol, _ in entries], timeframe, gap_start, gap_end)
+            logger.debug(f"Fetched {timeframe} bars for {len(entries)} symbols to fill gap")
+            for symbol, reset in entries:
+                self.write(symbol, timeframe, fetched[symbol], gap_start, gap_end, reset_coverage=reset)
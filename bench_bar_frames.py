@@ -0,0 +1,76 @@
+"""Benchmark bar payload conversion: legacy per-row dicts vs bar_frames columns.
+
+Usage: python bench_bar_frames.py [bar_count]
+"""
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+from alpaca.data.models import BarSet
+
+from bar_frames import bars_to_frame, barset_to_frame
+
+
+def make_raw_payload(count, symbols=('AAPL',)):
+    rng = np.random.default_rng(0)
+    start = datetime(2024, 1, 2, 14, 30, tzinfo=timezone.utc)
+    per_symbol = count // len(symbols)
+    payload = {}
+    for symbol in symbols:
+        closes = 100 + np.cumsum(rng.normal(0, 0.1, per_symbol))
+        payload[symbol] = [{
+            't': (start + timedelta(minutes=i)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'o': float(c), 'h': float(c) + 0.05, 'l': float(c) - 0.05, 'c': float(c),
+            'v': 1000 + i, 'n': 10, 'vw': float(c)
+        } for i, c in enumerate(closes)]
+    return payload
+
+
+def legacy_frame(bar_list):
+    """The per-row dict conversion previously used by get_historical_data"""
+    df = pd.DataFrame([{
+        'timestamp': bar.timestamp,
+        'open': float(bar.open),
+        'high': float(bar.high),
+        'low': float(bar.low),
+        'close': float(bar.close),
+        'volume': int(bar.volume)
+    } for bar in bar_list])
+    df.set_index('timestamp', inplace=True)
+    return df
+
+
+def timed(label, fn, repeat=3):
+    best = min(_run(fn) for _ in range(repeat))
+    print(f"{label:<48} {best * 1000:9.1f} ms")
+    return best
+
+
+def _run(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    payload = make_raw_payload(count)
+    barset = BarSet(payload)
+    bar_list = barset.data['AAPL']
+    print(f"Converting {count:,} bars")
+
+    parse = timed("BarSet parse (pydantic models)", lambda: BarSet(payload))
+    legacy = timed("legacy per-row dicts from Bar objects", lambda: legacy_frame(bar_list))
+    objects = timed("bar_frames columns from Bar objects", lambda: bars_to_frame(bar_list))
+    raw = timed("bar_frames columns from raw payload", lambda: bars_to_frame(payload['AAPL']))
+    print(f"Speedup on parsed bars:           {legacy / objects:5.1f}x")
+    print(f"Speedup end to end (raw vs parse + dicts): {(parse + legacy) / raw:5.1f}x")
+
+    multi = make_raw_payload(count, symbols=[f"SYM{i}" for i in range(100)])
+    timed("bar_frames MultiIndex frame, 100 symbols raw", lambda: barset_to_frame(multi))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from config import SCHEDULER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class BotScheduler:
+    """Decides when the trading loop runs, driven by market events instead of fixed sleeps.
+
+    Bar closes, quote updates and fills (whichever are listed in
+    ``wake_on``) call ``notify``; ``next_tick`` blocks until one arrives and
+    returns the triggers collected meanwhile. A burst (e.g. every symbol's
+    minute bar closing together) is coalesced into one run by waiting
+    ``coalesce_window`` seconds after the first event, and runs are at
+    least ``min_interval`` apart. Without events the loop still runs every
+    ``heartbeat`` seconds. While the market is closed the scheduler sleeps
+    until the next open, and ``stop`` wakes it immediately.
+    """
+
+    def __init__(self, is_open=None, next_open=None, wake_on=None, coalesce_window=None,
+                 min_interval=None, heartbeat=None, closed_recheck=None):
+        self.is_open = is_open or (lambda: True)
+        self.next_open = next_open or (lambda: None)
+        self.wake_on = set(wake_on or SCHEDULER_CONFIG['wake_on'])
+        self.coalesce_window = SCHEDULER_CONFIG['coalesce_window'] if coalesce_window is None else coalesce_window
+        self.min_interval = SCHEDULER_CONFIG['min_interval'] if min_interval is None else min_interval
+        self.heartbeat = heartbeat or SCHEDULER_CONFIG['heartbeat']
+        self.closed_recheck = closed_recheck or SCHEDULER_CONFIG['closed_recheck']
+        self._cond = threading.Condition()
+        self._pending = {}  # reason -> symbols
+        self._first_event = None
+        self._last_run = None
+        self._was_open = None  # None until the first check, so a closed market is logged once
+        self._stopped = False
+
+    def notify(self, reason, symbol=None):
+        """Record a trigger and wake the loop; cheap enough to call from stream callbacks"""
+        # Events while closed (pre-market quotes, ...) don't matter; the open itself triggers a run
+        if reason not in self.wake_on or not self._was_open:
+            return
+        with self._cond:
+            symbols = self._pending.get(reason)
+            if symbols is None:
+                symbols = self._pending[reason] = set()
+                if self._first_event is None:
+                    self._first_event = time.monotonic()
+                self._cond.notify_all()
+            if symbol:
+                symbols.add(symbol)
+
+    def on_bar(self, symbol, bar):
+        self.notify('bar', symbol)
+
+    def on_quote(self, symbol, quote):
+        self.notify('quote', symbol)
+
+    def on_order_update(self, event, order):
+        if event in ('fill', 'partial_fill'):
+            self.notify('fill', getattr(order, 'symbol', None))
+
+    def start(self):
+        """Re-arm a stopped scheduler; the first tick runs as soon as the market is open"""
+        with self._cond:
+            self._stopped = False
+            self._was_open = None
+            self._pending.clear()
+            self._first_event = None
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    @property
+    def stopped(self):
+        return self._stopped
+
+    def _seconds_until_open(self):
+        try:
+            next_open = self.next_open()
+        except Exception as e:
+            logger.error(f"Error getting next market open: {e}")
+            next_open = None
+        if next_open is None:
+            return self.closed_recheck
+        wait = (next_open - datetime.now(timezone.utc)).total_seconds()
+        return min(max(wait, 1), self.closed_recheck)
+
+    def next_tick(self):
+        """Block until the loop should run; returns {reason: symbols}, or None once stopped"""
+        while True:
+            # The calendar may hit the network at a session boundary, so it's asked outside the lock
+            market_open = self.is_open()
+            until_open = None if market_open else self._seconds_until_open()
+            with self._cond:
+                if self._stopped:
+                    return None
+                now = time.monotonic()
+
+                if not market_open:
+                    if self._was_open is not False:
+                        logger.info("Market closed; sleeping until the next open")
+                    self._was_open = False
+                    self._pending.clear()
+                    self._first_event = None
+                    self._cond.wait(until_open)
+                    continue
+
+                if not self._was_open:
+                    self._was_open = True
+                    return self._run(now, {'open': set()})
+
+                if self._pending:
+                    # Let the rest of a burst arrive, and keep runs min_interval apart
+                    ready_at = max(self._first_event + self.coalesce_window, self._last_run + self.min_interval)
+                    if now < ready_at:
+                        self._cond.wait(ready_at - now)
+                        continue
+                    triggers, self._pending = self._pending, {}
+                    return self._run(now, triggers)
+
+                idle = self._last_run + self.heartbeat - now
+                if idle <= 0:
+                    return self._run(now, {'heartbeat': set()})
+                self._cond.wait(idle)
+
+    def _run(self, now, triggers):
+        self._last_run = now
+        self._first_event = None
+        return triggers
@@ -0,0 +1,133 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def _estimate_size(value):
+    """Rough memory footprint of a cached value, recursing into containers"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_estimate_size(k) + _estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(_estimate_size(item) for item in value)
+    return size
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-namespace TTLs and size bounds.
+
+    Entries are keyed by ``(namespace, key)`` so different data types (market
+    snapshots, indicators, ...) share one memory budget but expire on their
+    own schedules. When either ``max_entries`` or ``max_bytes`` is exceeded the
+    least recently used entries are evicted first.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=None, ttls=None, default_ttl=60):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def ttl_for(self, namespace):
+        return self.ttls.get(namespace, self.default_ttl)
+
+    def _get_locked(self, full_key, now):
+        entry = self._entries.get(full_key)
+        if entry is None:
+            self._misses += 1
+            return None
+        value, expires_at, size = entry
+        if expires_at <= now:
+            self._remove_locked(full_key)
+            self._expirations += 1
+            self._misses += 1
+            return None
+        self._entries.move_to_end(full_key)
+        self._hits += 1
+        return value
+
+    def _remove_locked(self, full_key):
+        _, _, size = self._entries.pop(full_key)
+        self._bytes -= size
+
+    def _evict_locked(self):
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            full_key = next(iter(self._entries))
+            self._remove_locked(full_key)
+            self._evictions += 1
+
+    def get(self, namespace, key):
+        """Return the cached value, or None if missing or expired"""
+        with self._lock:
+            return self._get_locked((namespace, key), time.monotonic())
+
+    def get_many(self, namespace, keys):
+        """Look up several keys at once, returning (hits dict, list of missing keys)"""
+        hits, misses = {}, []
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                value = self._get_locked((namespace, key), now)
+                if value is None:
+                    misses.append(key)
+                else:
+                    hits[key] = value
+        return hits, misses
+
+    def set(self, namespace, key, value, ttl=None):
+        """Store a value, evicting least recently used entries if over budget"""
+        self.set_many(namespace, {key: value}, ttl)
+
+    def set_many(self, namespace, items, ttl=None):
+        ttl = self.ttl_for(namespace) if ttl is None else ttl
+        with self._lock:
+            expires_at = time.monotonic() + ttl
+            for key, value in items.items():
+                full_key = (namespace, key)
+                if full_key in self._entries:
+                    self._remove_locked(full_key)
+                size = _estimate_size(value)
+                self._entries[full_key] = (value, expires_at, size)
+                self._bytes += size
+            self._evict_locked()
+
+    def invalidate(self, namespace=None, key=None):
+        """Drop one key, a whole namespace, or everything"""
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                self._bytes = 0
+            elif key is not None:
+                if (namespace, key) in self._entries:
+                    self._remove_locked((namespace, key))
+            else:
+                for full_key in [k for k in self._entries if k[0] == namespace]:
+                    self._remove_locked(full_key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Return hit/miss/eviction counters and current occupancy"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations
+            }
@@ -0,0 +1,178 @@
+import logging
+import os
+import socket
+import threading
+
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+from config import HTTP_POOL_CONFIG
+from listeners import ListenerSet
+from rate_limiter import throttle
+
+logger = logging.getLogger(__name__)
+
+
+def _keepalive_socket_options(idle):
+    options = list(HTTPConnection.default_socket_options) + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    # Probe idle connections so the broker's load balancer doesn't silently drop them
+    for name, value in (('TCP_KEEPIDLE', idle), ('TCP_KEEPINTVL', max(idle // 3, 1)), ('TCP_KEEPCNT', 3)):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+    def __init__(self, socket_options, **kwargs):
+        self._socket_options = socket_options
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = self._socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+def tune_session(session, pool_maxsize=None, keepalive_idle=None):
+    """Size the connection pool of a requests session and enable TCP keep-alive"""
+    adapter = _KeepAliveAdapter(
+        _keepalive_socket_options(keepalive_idle or HTTP_POOL_CONFIG['keepalive_idle']),
+        pool_connections=HTTP_POOL_CONFIG['pool_connections'],
+        pool_maxsize=pool_maxsize or HTTP_POOL_CONFIG['pool_maxsize']
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class ClientRegistry:
+    """Process-wide API clients shared by every service and bot.
+
+    Hands out one throttled, connection-pooled TradingClient and
+    StockHistoricalDataClient and one OpenAI client, so services built
+    later (a new TradingBot, a settings test) reuse warm TLS connections
+    instead of opening their own pools. The Alpaca connection check runs
+    once per credentials. ``.env`` is read once, without overriding the
+    environment; settings saved later update ``os.environ`` themselves.
+
+    Every credential read goes through the registry. When the Alpaca keys
+    change, the Alpaca clients are rebuilt (closing the old pools) and the
+    rotation listeners are called so holders of clients, streams and
+    sessions pick up the new ones.
+    """
+
+    def __init__(self):
+        load_dotenv()
+        self._clients = {}
+        self._alpaca_keys = None  # Credentials the cached Alpaca clients were built with
+        self._lock = threading.Lock()
+        self._connection_checked = False
+        self._rotation_listeners = ListenerSet('credential rotation')
+
+    def _get(self, key, factory):
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = factory()
+            return client
+
+    @staticmethod
+    def alpaca_credentials():
+        """Return (api_key, api_secret, paper) for every Alpaca client and stream in the process"""
+        paper = os.getenv('ALPACA_PAPER_TRADING', 'True').lower() == 'true'
+        return os.getenv('ALPACA_API_KEY'), os.getenv('ALPACA_API_SECRET'), paper
+
+    def add_rotation_listener(self, listener):
+        """Register listener() to be called after the Alpaca keys change; bound methods are held weakly"""
+        self._rotation_listeners.add(listener)
+
+    def refresh(self):
+        """Pick up Alpaca keys changed in the environment; returns True if they rotated"""
+        credentials = self.alpaca_credentials()
+        with self._lock:
+            if self._alpaca_keys in (None, credentials):
+                self._alpaca_keys = credentials
+                return False
+            self._alpaca_keys = credentials
+            stale = [self._clients.pop(key) for key in ('trading', 'data') if key in self._clients]
+            self._connection_checked = False
+        logger.info("Alpaca credentials changed; rebuilding the Alpaca clients")
+        for client in stale:
+            client._session.close()
+        self._rotation_listeners()
+        return True
+
+    def trading_client(self):
+        self.refresh()
+
+        def build():
+            from alpaca.trading.client import TradingClient
+            api_key, api_secret, paper = self.alpaca_credentials()
+            client = TradingClient(api_key, api_secret, paper=paper)
+            tune_session(client._session)
+            return throttle(client)
+        return self._get('trading', build)
+
+    def data_client(self):
+        self.refresh()
+
+        def build():
+            from alpaca.data.historical import StockHistoricalDataClient
+            api_key, api_secret, _ = self.alpaca_credentials()
+            # Raw payloads skip per-bar model parsing; bar_frames converts them to columns
+            client = StockHistoricalDataClient(api_key, api_secret, raw_data=True)
+            tune_session(client._session)
+            return throttle(client)
+        return self._get('data', build)
+
+    def openai_client(self):
+        """Return the shared OpenAI client, rebuilt (and the old pool closed) if OPENAI_API_KEY changed"""
+        api_key = os.getenv('OPENAI_API_KEY')
+        with self._lock:
+            cached = self._clients.get('openai')
+            if cached is not None and cached[0] == api_key:
+                return cached[1]
+        import httpx
+        from openai import OpenAI
+        client = OpenAI(api_key=api_key, http_client=httpx.Client(
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_CONFIG['pool_maxsize'],
+                max_keepalive_connections=HTTP_POOL_CONFIG['pool_connections'],
+                keepalive_expiry=HTTP_POOL_CONFIG['keepalive_idle']
+            ),
+            timeout=HTTP_POOL_CONFIG['openai_timeout']
+        ))
+        with self._lock:
+            cached = self._clients.get('openai')
+            if cached is not None and cached[0] == api_key:
+                # Another thread built one for the same key first
+                client.close()
+                return cached[1]
+            self._clients['openai'] = (api_key, client)
+        if cached is not None:
+            logger.info("OpenAI API key changed; closing the previous client")
+            cached[1].close()
+        return client
+
+    def check_connection(self, check):
+        """Run `check()` until it first succeeds; later calls return True without a request"""
+        with self._lock:
+            if self._connection_checked:
+                return True
+        ok = check()
+        with self._lock:
+            self._connection_checked = self._connection_checked or bool(ok)
+        return ok
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry():
+    """Return the process-wide client registry"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ClientRegistry()
+        return _registry
@@ -36,3 +36,117 @@ STRATEGIES = {
         "min_mentions": 5
     }
 }
+
+# Market data cache configuration
+CACHE_CONFIG = {
+    "max_entries": 4096,
+    "max_bytes": 32 * 1024 * 1024,
+    "ttls": {  # Seconds each data type stays fresh
+        "snapshot": 60,
+        "indicators": 300,
+        "vwap": 60,
+        "breadth": 60,
+        "universe": 24 * 60 * 60
+    }
+}
+
+# Streaming indicator engine configuration
+INDICATOR_CONFIG = {
+    "warmup_days": 60  # Calendar days of daily bars used to seed a new symbol
+}
+
+# Multi-symbol bar downloads
+BAR_FETCH_CONFIG = {
+    "max_symbols_per_request": 100,  # Symbols per chunk
+    "max_workers": 4                 # Chunks downloaded in parallel
+}
+
+# Market breadth configuration
+BREADTH_CONFIG = {
+    "universe": "universe.txt",  # Symbols file (one per line) or "alpaca" for all liquid US equities
+    "lookback_days": 380,        # Calendar days of daily bars kept for the statistics below
+    "high_low_window": 252,      # Sessions used for new highs/lows (52 weeks)
+    "sma_window": 50,            # Percent of symbols closing above this SMA
+    "top_n": 5                   # Gainers/losers returned
+}
+
+# Shared Alpaca request budget (see rate_limiter.py)
+RATE_LIMIT_CONFIG = {
+    "requests_per_minute": 190,  # Alpaca allows 200/min; keep some headroom
+    "burst": 10                  # Requests that may go out back to back after idling
+}
+
+# Account/positions snapshot shared by AlpacaClient's portfolio methods
+ACCOUNT_CONFIG = {
+    "snapshot_ttl": 2  # Seconds; our own orders and fills invalidate it immediately
+}
+
+# Local order/fill table fed by the trade-updates stream
+ORDER_STORE_CONFIG = {
+    "backfill_days": 30,           # Fills served from memory without querying Alpaca
+    "order_lifetime_days": 90,     # Longest an order rests before filling (Alpaca expires GTC orders at 90 days)
+    "page_size": 500,              # Alpaca's maximum orders per request
+    "max_backfill_orders": 5000
+}
+
+# Bulk order submission (AlpacaClient.submit_bulk_orders)
+ORDER_SUBMIT_CONFIG = {
+    "max_workers": 10,  # Orders in flight at once; matches the rate limiter burst
+    "max_attempts": 3   # Submissions per order; retries reuse the client_order_id
+}
+
+# Pooled HTTP session used by the asyncio services (async_services.py)
+ASYNC_HTTP_CONFIG = {
+    "max_connections": 20,
+    "max_keepalive_connections": 10,
+    "keepalive_expiry": 30,  # Seconds an idle connection is kept open
+    "timeout": 10,           # Seconds per request
+    "max_retries": 3,        # Retries after 429, 5xx and transport errors
+    "backoff": 0.5           # First retry delay in seconds; doubles each attempt
+}
+
+# Shared HTTP connection pools (client_registry.py)
+HTTP_POOL_CONFIG = {
+    "pool_connections": 4,   # Hosts kept pooled per client (REST API, data API, ...)
+    "pool_maxsize": 16,      # Connections per host; covers bulk orders and parallel bar downloads
+    "keepalive_idle": 60,    # Seconds idle before TCP keep-alive probes start
+    "openai_timeout": 30
+}
+
+# Logging (logging_setup.configure_logging); $LOG_LEVEL overrides the root level
+LOGGING_CONFIG = {
+    "level": "INFO",
+    "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    "file": None,          # Optional log file written alongside the console
+    "queue_size": 10000,   # Records buffered for the writer thread; more are dropped, never waited on
+    "levels": {            # Per-module levels
+        "engineio": "WARNING",
+        "socketio": "WARNING",
+        "werkzeug": "WARNING",
+        "urllib3": "WARNING",
+        "httpx": "WARNING",
+        "httpcore": "WARNING",
+        "openai": "WARNING"
+    },
+    "sampling": {          # Repetitive records: at most `burst` per call site every `interval` seconds
+        "max_level": "DEBUG",
+        "burst": 5,
+        "interval": 60
+    }
+}
+
+# Per-symbol analysis stage of the trading loop (TradingBot.analyze_symbols)
+ANALYSIS_CONFIG = {
+    "max_workers": 8,      # Symbols analyzed at once
+    "symbol_timeout": 30,  # Seconds before a symbol is skipped for the current pass
+    "pass_timeout": 90     # Seconds from submission before a pass gives up on every unfinished symbol
+}
+
+# Event-driven trading loop (bot_scheduler.BotScheduler)
+SCHEDULER_CONFIG = {
+    "wake_on": ["bar", "fill"],  # Also "quote" to react to every quote (throttled by min_interval)
+    "coalesce_window": 0.25,     # Seconds to collect a burst of events into one run
+    "min_interval": 1,           # Minimum seconds between runs
+    "heartbeat": 60,             # Run at least this often without events (e.g. no streaming feed)
+    "closed_recheck": 900        # Longest sleep while closed before the calendar is asked again
+}
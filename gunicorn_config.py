@@ -17,6 +17,22 @@ accesslog = '/var/log/gunicorn/access.log'
 errorlog = '/var/log/gunicorn/error.log'
 loglevel = 'info'
 
+def post_fork(server, worker):
+    """Keep workers off the market data websocket when there are several of them.
+
+    Alpaca allows one market data websocket per account; each worker would
+    open its own, so with more than one worker MARKET_DATA_STREAM=alpaca is
+    ignored and prices are polled over REST. Runs before the app is loaded.
+    """
+    if server.cfg.workers > 1:
+        from market_feed import refuse_websocket
+        refuse_websocket(f"{server.cfg.workers} gunicorn workers share one account")
+
+def post_worker_init(worker):
+    """Route the app's logging through the queue handler in each worker process"""
+    from logging_setup import configure_logging
+    configure_logging()
+
 # Process naming
 proc_name = 'trading_bot'
 
@@ -0,0 +1,302 @@
+import threading
+
+import pytz
+
+EASTERN = pytz.timezone('US/Eastern')
+REGULAR_SESSION_MINUTES = (9 * 60 + 30, 16 * 60)  # 09:30-16:00 Eastern
+
+
+def regular_session_date(timestamp, bar_duration):
+    """Eastern date of the regular session a bar overlaps, or None for an extended-hours bar"""
+    start = timestamp.astimezone(EASTERN)
+    minute = start.hour * 60 + start.minute
+    open_minute, close_minute = REGULAR_SESSION_MINUTES
+    if minute < close_minute and minute + bar_duration.total_seconds() / 60 > open_minute:
+        return start.date()
+    return None
+
+
+def session_closes(timestamps, closes, bar_duration):
+    """Return (latest session date, its last close, previous session's close) from bars in time order.
+
+    Extended-hours bars are skipped, so the previous close is the regular
+    session close the day's change is measured against.
+    """
+    session = session_close = None
+    for timestamp, close in zip(reversed(timestamps), reversed(closes)):
+        date = regular_session_date(timestamp, bar_duration)
+        if date is None:
+            continue
+        if session is None:
+            session, session_close = date, float(close)
+        elif date < session:
+            return session, session_close, float(close)
+    return session, session_close, None
+
+
+def reference_close(timestamp, session, session_close, prev_close):
+    """Close a price at `timestamp` is compared with: the latest session's close on a later day, else the one before it"""
+    if session is not None and timestamp.astimezone(EASTERN).date() > session:
+        return session_close
+    return prev_close
+
+
+class RollingSMA:
+    """Simple moving average over a fixed window backed by a ring buffer"""
+
+    def __init__(self, window):
+        self.window = window
+        self._buffer = [0.0] * window
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
+
+    def update(self, value):
+        oldest = self._buffer[self._index]
+        self._buffer[self._index] = value
+        self._index = (self._index + 1) % self.window
+        if self._count < self.window:
+            self._count += 1
+            self._sum += value
+        else:
+            self._sum += value - oldest
+        if self._index == 0:
+            # Re-sum once per lap to stop floating point drift accumulating
+            self._sum = sum(self._buffer[:self._count])
+        return self.value
+
+    def peek(self, value):
+        """Value the SMA would have if `value` were the next update"""
+        if self._count + 1 < self.window:
+            return None
+        if self._count < self.window:
+            return (self._sum + value) / self.window
+        return (self._sum - self._buffer[self._index] + value) / self.window
+
+    @property
+    def value(self):
+        return self._sum / self.window if self._count == self.window else None
+
+
+class EMA:
+    """Exponential moving average seeded with the SMA of the first `period` values"""
+
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self._seed_sum = 0.0
+        self._count = 0
+        self._value = None
+
+    def update(self, value):
+        self._value = self.peek(value)
+        self._count += 1
+        if self._count <= self.period:
+            self._seed_sum += value
+        return self._value
+
+    def peek(self, value):
+        if self._count + 1 < self.period:
+            return None
+        if self._count + 1 == self.period:
+            return (self._seed_sum + value) / self.period
+        return self._value + self.alpha * (value - self._value)
+
+    @property
+    def value(self):
+        return self._value
+
+
+class WilderRSI:
+    """Relative Strength Index using Wilder's smoothing of gains and losses"""
+
+    def __init__(self, period=14):
+        self.period = period
+        self._prev_close = None
+        self._count = 0  # Number of price changes seen
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+
+    def _next_averages(self, close):
+        change = close - self._prev_close
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        n = self.period
+        if self._count < n:
+            # Seed phase: plain average of the first `period` changes
+            return ((self._avg_gain * self._count + gain) / (self._count + 1),
+                    (self._avg_loss * self._count + loss) / (self._count + 1))
+        return ((self._avg_gain * (n - 1) + gain) / n,
+                (self._avg_loss * (n - 1) + loss) / n)
+
+    def update(self, close):
+        if self._prev_close is not None:
+            self._avg_gain, self._avg_loss = self._next_averages(close)
+            self._count += 1
+        self._prev_close = close
+        return self.value
+
+    def peek(self, close):
+        if self._prev_close is None or self._count + 1 < self.period:
+            return None
+        return self._rsi(*self._next_averages(close))
+
+    @staticmethod
+    def _rsi(avg_gain, avg_loss):
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else 50.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    @property
+    def value(self):
+        if self._count < self.period:
+            return None
+        return self._rsi(self._avg_gain, self._avg_loss)
+
+
+class SessionVWAP:
+    """Cumulative volume weighted average price that resets each trading session"""
+
+    def __init__(self):
+        self._session = None
+        self._pv = 0.0
+        self._volume = 0.0
+
+    @staticmethod
+    def _session_of(timestamp):
+        return timestamp.astimezone(EASTERN).date()
+
+    def _next_totals(self, timestamp, high, low, close, volume):
+        typical_price = (high + low + close) / 3
+        if self._session != self._session_of(timestamp):
+            return typical_price * volume, volume
+        return self._pv + typical_price * volume, self._volume + volume
+
+    def update(self, timestamp, high, low, close, volume):
+        self._pv, self._volume = self._next_totals(timestamp, high, low, close, volume)
+        self._session = self._session_of(timestamp)
+        return self.value
+
+    def peek(self, timestamp, high, low, close, volume):
+        pv, total_volume = self._next_totals(timestamp, high, low, close, volume)
+        return pv / total_volume if total_volume else None
+
+    @property
+    def value(self):
+        return self._pv / self._volume if self._volume else None
+
+
+class SymbolIndicators:
+    """Rolling indicator state for one symbol on one timeframe"""
+
+    def __init__(self):
+        self.sma_5 = RollingSMA(5)
+        self.sma_20 = RollingSMA(20)
+        self.ema_12 = EMA(12)
+        self.ema_26 = EMA(26)
+        self.rsi = WilderRSI(14)
+        self.vwap = SessionVWAP()
+        self.last_timestamp = None
+        self.last_bar = None
+        self.forming_bar = None
+
+    def update(self, timestamp, high, low, close, volume):
+        """Apply one closed bar in O(1)"""
+        self.sma_5.update(close)
+        self.sma_20.update(close)
+        self.ema_12.update(close)
+        self.ema_26.update(close)
+        self.rsi.update(close)
+        self.vwap.update(timestamp, high, low, close, volume)
+        self.last_timestamp = timestamp
+        self.last_bar = (timestamp, high, low, close, volume)
+        self.forming_bar = None
+
+    def snapshot(self):
+        """Current indicator values, including the still-forming bar if there is one"""
+        if self.forming_bar is not None:
+            timestamp, high, low, close, volume = self.forming_bar
+            return {
+                'current_price': close,
+                'sma_5': self.sma_5.peek(close),
+                'sma_20': self.sma_20.peek(close),
+                'ema_12': self.ema_12.peek(close),
+                'ema_26': self.ema_26.peek(close),
+                'rsi': self.rsi.peek(close),
+                'vwap': self.vwap.peek(timestamp, high, low, close, volume),
+                'volume': volume,
+                'time': timestamp
+            }
+        if self.last_bar is None:
+            return None
+        timestamp, _, _, close, volume = self.last_bar
+        return {
+            'current_price': close,
+            'sma_5': self.sma_5.value,
+            'sma_20': self.sma_20.value,
+            'ema_12': self.ema_12.value,
+            'ema_26': self.ema_26.value,
+            'rsi': self.rsi.value,
+            'vwap': self.vwap.value,
+            'volume': volume,
+            'time': timestamp
+        }
+
+
+class IndicatorEngine:
+    """Per-symbol streaming indicators updated incrementally as bars arrive.
+
+    Closed bars are applied once in O(1); a bar that is still forming is kept
+    aside and only previewed (``peek``) so it can be revised on the next call
+    without replaying history.
+    """
+
+    def __init__(self, bar_duration):
+        self.bar_duration = bar_duration
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def has_state(self, symbol):
+        with self._lock:
+            return symbol in self._states
+
+    def last_timestamp(self, symbol):
+        with self._lock:
+            state = self._states.get(symbol)
+            return state.last_timestamp if state else None
+
+    def update_bar(self, symbol, timestamp, high, low, close, volume, now):
+        """Feed one bar; bars at or before the last closed bar are ignored"""
+        with self._lock:
+            state = self._states.get(symbol)
+            if state is None:
+                state = self._states[symbol] = SymbolIndicators()
+            if state.last_timestamp is not None and timestamp <= state.last_timestamp:
+                return
+            if timestamp + self.bar_duration <= now:
+                state.update(timestamp, high, low, close, volume)
+            else:
+                state.forming_bar = (timestamp, high, low, close, volume)
+
+    def ingest(self, symbol, df, now):
+        """Feed the rows of a bar DataFrame (indexed by timestamp) newer than the state"""
+        last = self.last_timestamp(symbol)
+        if last is not None:
+            df = df[df.index > last]
+        if not self.has_state(symbol) and df.empty:
+            return
+        for timestamp, high, low, close, volume in zip(
+                df.index.to_pydatetime(), df['high'].to_numpy(), df['low'].to_numpy(),
+                df['close'].to_numpy(), df['volume'].to_numpy()):
+            self.update_bar(symbol, timestamp, float(high), float(low), float(close), float(volume), now)
+
+    def snapshot(self, symbol):
+        with self._lock:
+            state = self._states.get(symbol)
+            return state.snapshot() if state else None
+
+    def reset(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._states.clear()
+            else:
+                self._states.pop(symbol, None)
@@ -0,0 +1,70 @@
+import logging
+import threading
+import weakref
+from inspect import ismethod
+
+logger = logging.getLogger(__name__)
+
+
+class _StrongRef:
+    """weakref-like wrapper that keeps a plain function alive"""
+
+    def __init__(self, listener):
+        self.listener = listener
+
+    def __call__(self):
+        return self.listener
+
+    def __eq__(self, other):
+        return isinstance(other, _StrongRef) and self.listener == other.listener
+
+    def __hash__(self):
+        return hash(self.listener)
+
+
+def _ref(listener):
+    return weakref.WeakMethod(listener) if ismethod(listener) else _StrongRef(listener)
+
+
+class ListenerSet:
+    """Callbacks for a long-lived event source such as a stream or the order store.
+
+    Bound methods are held weakly, so an object that registers one of its
+    methods does not outlive its last user, and is dropped from the set once
+    collected. Adding the same listener twice registers it once. Calling the
+    set calls every listener, logging and swallowing their errors.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._refs = []
+        self._lock = threading.Lock()
+
+    def add(self, listener):
+        ref = _ref(listener)
+        with self._lock:
+            if ref not in self._refs:
+                self._refs.append(ref)
+
+    def remove(self, listener):
+        ref = _ref(listener)
+        with self._lock:
+            self._refs = [existing for existing in self._refs if existing != ref]
+
+    def __call__(self, *args):
+        dead = False
+        for ref in self._refs:
+            listener = ref()
+            if listener is None:
+                dead = True
+                continue
+            try:
+                listener(*args)
+            except Exception as e:
+                logger.error(f"Error in {self.name} listener: {e}", exc_info=True)
+        if dead:
+            with self._lock:
+                self._refs = [ref for ref in self._refs if ref() is not None]
+
+    def __len__(self):
+        return sum(1 for ref in self._refs if ref() is not None)
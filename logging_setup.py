@@ -0,0 +1,135 @@
+"""Process-wide logging: one queue-backed handler, per-module levels and debug sampling.
+
+Modules only call ``logging.getLogger(__name__)``; entry points (main.py,
+web_app.py) call ``configure_logging()`` once. Records are put on a bounded
+queue and written by a background listener thread, so a slow terminal or
+disk never blocks the trading loop or a web worker. If the queue is full
+the record is dropped and counted rather than waited on.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from config import LOGGING_CONFIG
+
+
+class SamplingFilter(logging.Filter):
+    """Let through at most `burst` records per call site every `interval` seconds.
+
+    Only records at or below `max_level` are sampled. The first record let
+    through after a suppressed run notes how many were skipped.
+    """
+
+    def __init__(self, burst=5, interval=60.0, max_level=logging.DEBUG):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.max_level = max_level
+        self._sites = {}  # (pathname, lineno) -> [window start, passed, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > self.max_level:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.interval:
+                suppressed = site[2] if site else 0
+                self._sites[key] = [now, 1, 0]
+            elif site[1] < self.burst:
+                site[1] += 1
+                suppressed = 0
+            else:
+                site[2] += 1
+                return False
+        if suppressed:
+            record.msg = f"{record.msg} [{suppressed} similar suppressed]"
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: records that don't fit are counted and dropped"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener = None
+_handler = None
+_lock = threading.Lock()
+
+
+def _level(value):
+    return value if isinstance(value, int) else logging.getLevelName(str(value).upper())
+
+
+def configure_logging(level=None, levels=None, log_file=None, fmt=None):
+    """Install the queue handler on the root logger and start the writer thread.
+
+    ``level`` defaults to $LOG_LEVEL or LOGGING_CONFIG['level']; ``levels``
+    maps logger names to levels on top of LOGGING_CONFIG['levels']. Calling
+    it again only updates the levels.
+    """
+    global _listener, _handler
+    root = logging.getLogger()
+    root.setLevel(_level(level or os.getenv('LOG_LEVEL') or LOGGING_CONFIG['level']))
+    for name, name_level in {**LOGGING_CONFIG['levels'], **(levels or {})}.items():
+        logging.getLogger(name).setLevel(_level(name_level))
+
+    with _lock:
+        if _listener is not None:
+            return _handler
+
+        formatter = logging.Formatter(fmt or LOGGING_CONFIG['format'])
+        handlers = [logging.StreamHandler()]
+        log_file = log_file or LOGGING_CONFIG['file']
+        if log_file:
+            handlers.append(logging.FileHandler(log_file))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        _handler = DroppingQueueHandler(queue.Queue(LOGGING_CONFIG['queue_size']))
+        sampling = LOGGING_CONFIG['sampling']
+        _handler.addFilter(SamplingFilter(sampling['burst'], sampling['interval'], _level(sampling['max_level'])))
+        # Replace whatever basicConfig or a library installed, so nothing writes synchronously
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(_handler)
+
+        _listener = QueueListener(_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _handler
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener, _handler
+    with _lock:
+        listener, handler = _listener, _handler
+        _listener = _handler = None
+    if listener is not None:
+        listener.stop()
+        logging.getLogger().removeHandler(handler)
+        if handler.dropped:
+            logging.getLogger(__name__).warning(f"Dropped {handler.dropped} log records (queue full)")
+
+
+def logging_stats():
+    """Return the queue depth and number of dropped records"""
+    if _handler is None:
+        return {'queued': 0, 'dropped': 0}
+    return {'queued': _handler.queue.qsize(), 'dropped': _handler.dropped}
@@ -1,16 +1,10 @@
 from config import TradingConfig
 from trading_bot import TradingBot
 import logging
+from logging_setup import configure_logging
 
 def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('trading_bot.log'),
-            logging.StreamHandler()
-        ]
-    )
+    configure_logging(log_file='trading_bot.log')
 
 def main():
     setup_logging()
@@ -21,6 +15,7 @@ def main():
     
     # Initialize and start the trading bot
     bot = TradingBot(config)
+    bot.alpaca.test_connection()
     
     try:
         bot.start()
@@ -0,0 +1,123 @@
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Used when no universe is configured (or the configured one cannot be loaded)
+DEFAULT_UNIVERSE = ['AAPL', 'MSFT', 'AMZN', 'GOOGL', 'META', 'NVDA', 'BRK.B', 'JPM', 'JNJ', 'V']
+
+LISTING_EXCHANGES = {'NYSE', 'NASDAQ', 'ARCA', 'AMEX', 'BATS'}
+
+
+def load_universe(source, trading_client=None):
+    """Load the breadth universe from a symbols file or Alpaca's asset list.
+
+    ``source`` is either a path to a text file with one symbol per line
+    (``#`` starts a comment) or ``"alpaca"`` for every active, tradable,
+    fractionable US equity listed on a major exchange.
+    """
+    try:
+        if source == 'alpaca':
+            from alpaca.trading.enums import AssetClass, AssetStatus
+            from alpaca.trading.requests import GetAssetsRequest
+
+            assets = trading_client.get_all_assets(GetAssetsRequest(
+                status=AssetStatus.ACTIVE, asset_class=AssetClass.US_EQUITY))
+            symbols = sorted(a.symbol for a in assets
+                             if a.tradable and a.fractionable and str(a.exchange.value) in LISTING_EXCHANGES)
+        elif source and os.path.exists(source):
+            with open(source, 'r') as f:
+                lines = (line.split('#', 1)[0] for line in f)
+                symbols = list(dict.fromkeys(
+                    s.strip().upper() for line in lines for s in line.split(',') if s.strip()))
+        else:
+            logger.warning(f"Breadth universe '{source}' not found, using default universe")
+            return list(DEFAULT_UNIVERSE)
+    except Exception as e:
+        logger.error(f"Error loading breadth universe '{source}': {e}")
+        return list(DEFAULT_UNIVERSE)
+
+    if not symbols:
+        logger.warning(f"Breadth universe '{source}' is empty, using default universe")
+        return list(DEFAULT_UNIVERSE)
+    return symbols
+
+
+def _stack(columns, width):
+    """Right-align variable-length 1-D arrays into a NaN-padded (len(columns), width) matrix"""
+    lengths = np.fromiter((min(len(c), width) for c in columns), dtype=np.int64, count=len(columns))
+    matrix = np.full((len(columns), width), np.nan)
+    total = int(lengths.sum())
+    if total == 0:
+        return matrix
+    flat = np.concatenate([np.asarray(c[len(c) - n:], dtype=np.float64) for c, n in zip(columns, lengths)])
+    rows = np.repeat(np.arange(len(columns)), lengths)
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    cols = np.repeat(width - lengths, lengths) + (np.arange(total) - starts)
+    matrix[rows, cols] = flat
+    return matrix
+
+
+def compute_breadth(records_by_symbol, sma_window=50, high_low_window=252, top_n=5):
+    """Compute market breadth from daily bar records, vectorized across the universe.
+
+    Each symbol's bars are right-aligned into (symbol x day) matrices so every
+    statistic is a single NumPy reduction. Symbols whose newest bar is older
+    than the universe's newest bar (halted, delisted) are left out so the
+    columns line up by session.
+    """
+    symbols = [s for s, records in records_by_symbol.items() if len(records) >= 2]
+    if not symbols:
+        return None
+
+    last_ts = np.fromiter((records_by_symbol[s]['timestamp'][-1] for s in symbols), dtype=np.int64,
+                          count=len(symbols))
+    current = last_ts == last_ts.max()
+    symbols = [s for s, keep in zip(symbols, current) if keep]
+    records = [records_by_symbol[s] for s in symbols]
+
+    width = max(sma_window, high_low_window) + 1
+    close = _stack([r['close'] for r in records], width)
+    high = _stack([r['high'] for r in records], width)
+    low = _stack([r['low'] for r in records], width)
+
+    last, prev = close[:, -1], close[:, -2]
+    change = (last - prev) / prev * 100
+    valid = ~np.isnan(change)
+
+    # fmax/fmin skip the NaN padding of symbols with a shorter history
+    prior = slice(-high_low_window - 1, -1)
+    prior_high = np.fmax.reduce(high[:, prior], axis=1)
+    prior_low = np.fmin.reduce(low[:, prior], axis=1)
+
+    sma_block = close[:, -sma_window:]
+    has_sma = ~np.isnan(sma_block).any(axis=1)
+    sma = np.where(has_sma, np.nan_to_num(sma_block).sum(axis=1) / sma_window, np.nan)
+
+    advancing = int((change[valid] > 0).sum())
+    declining = int((change[valid] < 0).sum())
+
+    # NaN sorts last, so the first valid.sum() positions rank every symbol with a change
+    order = np.argsort(change, kind='stable')[:int(valid.sum())]
+
+    def ranked(indices):
+        return [{'symbol': symbols[i], 'change': float(change[i])} for i in indices]
+
+    return {
+        'advancing': advancing,
+        'declining': declining,
+        'unchanged': int(valid.sum()) - advancing - declining,
+        'advance_decline_ratio': advancing / declining if declining else None,
+        'new_highs': int((high[:, -1] >= prior_high).sum()),
+        'new_lows': int((low[:, -1] <= prior_low).sum()),
+        'pct_above_sma': float((last[has_sma] > sma[has_sma]).mean() * 100) if has_sma.any() else None,
+        'sma_window': sma_window,
+        'symbols': len(symbols),
+        'stale_symbols': int((~current).sum()),
+        'as_of': pd.Timestamp(int(last_ts.max()), tz='UTC').isoformat(),
+        'top_gainers': ranked(order[-top_n:]),
+        'top_losers': ranked(order[:top_n])
+    }
@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+
+from alpaca.trading.requests import GetCalendarRequest
+
+from client_registry import get_client_registry
+from indicators import EASTERN
+
+logger = logging.getLogger(__name__)
+
+
+def _to_epoch(value):
+    if value is None:
+        return time.time()
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+    return float(value)
+
+
+def _to_eastern(epoch):
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).astimezone(EASTERN)
+
+
+class MarketCalendar:
+    """Exchange session calendar answering open/close questions locally.
+
+    Sessions are loaded once from Alpaca's calendar endpoint into a sorted
+    list of alternating open/close epoch times. The answer for the current
+    interval is cached until the next boundary, so most calls are a single
+    comparison; crossing a boundary costs one bisect, and the calendar is
+    re-fetched only at a boundary when the loaded window is old or running
+    out.
+    """
+
+    def __init__(self, trading_client, lookahead_days=45, lookback_days=7,
+                 refresh_after=timedelta(days=1), retry_after=60):
+        self.trading_client = trading_client
+        self.lookahead_days = lookahead_days
+        self.lookback_days = lookback_days
+        self.refresh_after = refresh_after.total_seconds()
+        self.retry_after = retry_after
+        self._boundaries = []
+        self._loaded_at = None
+        self._failed_at = None
+        # (valid_from, valid_until, is_open, next_open, next_close) for the current interval
+        self._interval = None
+        self._lock = threading.Lock()
+
+    def _load(self, now):
+        """Fetch sessions around `now` and rebuild the boundary table"""
+        today = _to_eastern(now).date()
+        request = GetCalendarRequest(
+            start=today - timedelta(days=self.lookback_days),
+            end=today + timedelta(days=self.lookahead_days)
+        )
+        try:
+            sessions = self.trading_client.get_calendar(request)
+        except Exception as e:
+            logger.error(f"Error loading market calendar: {e}")
+            self._failed_at = now
+            return False
+
+        boundaries = []
+        for session in sorted(sessions, key=lambda s: s.open):
+            boundaries.append(EASTERN.localize(session.open).timestamp())
+            boundaries.append(EASTERN.localize(session.close).timestamp())
+        self._boundaries = boundaries
+        self._loaded_at = now
+        self._failed_at = None
+        logger.info(f"Loaded market calendar with {len(sessions)} sessions")
+        return True
+
+    def _needs_load(self, now):
+        if self._failed_at is not None and now - self._failed_at < self.retry_after:
+            return False
+        if self._loaded_at is None or now - self._loaded_at >= self.refresh_after:
+            return True
+        # Keep at least one full session ahead of `now`
+        return bisect_right(self._boundaries, now) + 2 >= len(self._boundaries)
+
+    def _resolve(self, now):
+        interval = self._interval
+        if interval and interval[0] <= now < interval[1]:
+            return interval
+        with self._lock:
+            if self._needs_load(now):
+                self._load(now)
+
+            boundaries = self._boundaries
+            index = bisect_right(boundaries, now)
+            if index + 1 >= len(boundaries) or index == 0:
+                # Outside the loaded window: answer "closed" without caching
+                return (now, now, False, None, None)
+
+            is_open = index % 2 == 1
+            following = boundaries[index + 1]
+            next_open, next_close = (following, boundaries[index]) if is_open else (boundaries[index], following)
+            self._interval = (boundaries[index - 1], boundaries[index], is_open, next_open, next_close)
+            return self._interval
+
+    def is_open(self, now=None):
+        """Whether the market is in a regular session at `now` (default: current time)"""
+        return self._resolve(_to_epoch(now))[2]
+
+    def next_open(self, now=None):
+        epoch = self._resolve(_to_epoch(now))[3]
+        return _to_eastern(epoch) if epoch is not None else None
+
+    def next_close(self, now=None):
+        epoch = self._resolve(_to_epoch(now))[4]
+        return _to_eastern(epoch) if epoch is not None else None
+
+    def status(self, now=None):
+        """Return is_open/next_open/next_close shaped like Alpaca's clock"""
+        _, _, is_open, next_open, next_close = self._resolve(_to_epoch(now))
+        return {
+            'is_open': is_open,
+            'next_open': _to_eastern(next_open).isoformat() if next_open is not None else None,
+            'next_close': _to_eastern(next_close).isoformat() if next_close is not None else None
+        }
+
+
+_calendar = None
+_calendar_lock = threading.Lock()
+
+
+def _use_rotated_client():
+    _calendar.trading_client = get_client_registry().trading_client()
+
+
+def get_market_calendar():
+    """Return the process-wide market calendar, creating it on first use"""
+    global _calendar
+    with _calendar_lock:
+        if _calendar is None:
+            registry = get_client_registry()
+            _calendar = MarketCalendar(registry.trading_client())
+            registry.add_rotation_listener(_use_rotated_client)
+        return _calendar
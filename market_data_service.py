@@ -1,229 +1,310 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import pandas as pd
-from alpaca.data.historical import StockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest, StockQuotesRequest
 from alpaca.data.timeframe import TimeFrame
-import os
-from dotenv import load_dotenv
+from bar_frames import bar_columns, bars_by_symbol
+from bar_store import BarStore
+from client_registry import get_client_registry
+from cache import TTLCache
+from single_flight import SingleFlight, coalesced
+from indicators import EASTERN, IndicatorEngine, reference_close, session_closes
+from market_feed import get_shared_feed
+from market_calendar import get_market_calendar
+from config import BAR_FETCH_CONFIG, BREADTH_CONFIG, CACHE_CONFIG, INDICATOR_CONFIG
+from market_breadth import compute_breadth, load_universe
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Hourly snapshot bars reach back past the previous session, even over long weekends
+SNAPSHOT_LOOKBACK = timedelta(days=7)
+
 class MarketDataService:
     def __init__(self):
-        load_dotenv()
-        self.api_key = os.getenv('ALPACA_API_KEY')
-        self.api_secret = os.getenv('ALPACA_API_SECRET')
+        registry = get_client_registry()
+        self.api_key, self.api_secret, _ = registry.alpaca_credentials()
         
         if not all([self.api_key, self.api_secret]):
             raise ValueError("Alpaca API credentials not found in environment variables")
             
-        self.data_client = StockHistoricalDataClient(self.api_key, self.api_secret)
-        self.cache = {}
-        self.cache_timeout = 60  # Cache timeout in seconds
-
-    def _is_cache_valid(self, key):
-        """Check if cached data is still valid"""
-        if key not in self.cache:
-            return False
-        data, timestamp = self.cache[key]
-        age = (datetime.now() - timestamp).total_seconds()
-        return age < self.cache_timeout
-
-    def _get_from_cache(self, key):
-        """Get data from cache if valid"""
-        if self._is_cache_valid(key):
-            return self.cache[key][0]
-        return None
-
-    def _store_in_cache(self, key, data):
-        """Store data in cache with current timestamp"""
-        self.cache[key] = (data, datetime.now())
+        # Raw-data client shared through the registry; bar_frames converts payloads to columns
+        self.data_client = registry.data_client()
+        registry.add_rotation_listener(self.handle_credentials_rotated)
+        self.bar_store = BarStore(**BAR_FETCH_CONFIG)
+        self.cache = TTLCache(
+            max_entries=CACHE_CONFIG['max_entries'],
+            max_bytes=CACHE_CONFIG['max_bytes'],
+            ttls=CACHE_CONFIG['ttls']
+        )
+        self._single_flight = SingleFlight()
+        self.daily_indicators = IndicatorEngine(timedelta(days=1))
+        self.intraday_indicators = IndicatorEngine(timedelta(minutes=1))
+        self.calendar = get_market_calendar()
+        self.feed = get_shared_feed()
+        if self.feed:
+            # Held weakly by the shared feed, so a discarded service is unregistered
+            self.feed.add_bar_listener(self._on_stream_bar)
+
+    def handle_credentials_rotated(self):
+        """Switch to the data client the registry rebuilt for new Alpaca keys"""
+        registry = get_client_registry()
+        self.api_key, self.api_secret, _ = registry.alpaca_credentials()
+        self.data_client = registry.data_client()
+
+    @staticmethod
+    def _normalize_symbols(symbols):
+        """Upper-case, strip and de-duplicate symbols while keeping their order"""
+        return list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+
+    def subscribe(self, symbols):
+        """Stream live prices for symbols when a market data feed is configured.
+
+        Newly streamed symbols are seeded with their session closes from REST
+        so the day's change is right before the stream sees a session end.
+        """
+        if not self.feed:
+            return
+        new = self.feed.subscribe(self._normalize_symbols(symbols))
+        if new:
+            try:
+                bars = self._fetch_hourly_bars(sorted(new))
+                for symbol, symbol_bars in bars.items():
+                    if symbol_bars:
+                        self.feed.seed_session(symbol, *self._session_closes(bar_columns(symbol_bars)))
+            except Exception as e:
+                logger.error(f"Error seeding session closes: {e}", exc_info=True)
+
+    def _on_stream_bar(self, symbol, bar):
+        """Apply a streamed minute bar to the intraday engine if it extends the state"""
+        engine = self.intraday_indicators
+        last = engine.last_timestamp(symbol)
+        # A gap (e.g. after a reconnect) is left for get_intraday_vwap to backfill via REST
+        if last is None or bar['timestamp'] - last != engine.bar_duration:
+            return
+        engine.update_bar(symbol, bar['timestamp'], bar['high'], bar['low'], bar['close'],
+                          bar['volume'], datetime.now(timezone.utc))
+        self.cache.invalidate('vwap', symbol)
 
     def get_market_snapshot(self, symbols):
         """Get current market snapshot for multiple symbols"""
         try:
-            cache_key = f"snapshot_{','.join(symbols)}"
-            cached_data = self._get_from_cache(cache_key)
-            if cached_data:
-                return cached_data
-
-            # Get latest bars for the symbols
-            end = datetime.now()
-            start = end - timedelta(days=1)  # Get last day of data
-            
-            request = StockBarsRequest(
-                symbol_or_symbols=symbols,
-                timeframe=TimeFrame.Hour,
-                start=start,
-                end=end
-            )
-            
-            bars = self.data_client.get_stock_bars(request)
-            
-            if not bars:
-                logger.warning("No market data received")
-                return None
-                
-            # Process and format the data
-            snapshot = {}
-            for symbol in symbols:
-                if symbol in bars:
-                    latest_bar = bars[symbol][-1]
-                    prev_bar = bars[symbol][-2] if len(bars[symbol]) > 1 else None
-                    
-                    change_pct = 0
-                    if prev_bar:
-                        change_pct = ((latest_bar.close - prev_bar.close) / prev_bar.close) * 100
-                        
-                    snapshot[symbol] = {
-                        'price': float(latest_bar.close),
-                        'change': float(change_pct),
-                        'volume': int(latest_bar.volume),
-                        'time': latest_bar.timestamp.isoformat()
-                    }
-            
-            self._store_in_cache(cache_key, snapshot)
-            return snapshot
+            symbols = self._normalize_symbols(symbols)
+            # Streamed state is fresher than any cached REST result
+            snapshot = self.feed.snapshot(symbols) if self.feed else {}
+            pending = [symbol for symbol in symbols if symbol not in snapshot]
+            hits, missing = self.cache.get_many('snapshot', pending)
+            snapshot.update(hits)
+            if missing:
+                snapshot.update(self._fetch_snapshot(sorted(missing)))
+            return {symbol: snapshot[symbol] for symbol in symbols if symbol in snapshot}
             
         except Exception as e:
             logger.error(f"Error getting market snapshot: {e}", exc_info=True)
             return None
 
+    @coalesced
+    def _fetch_snapshot(self, symbols):
+        """Fetch snapshot entries for symbols missing from the cache"""
+        snapshot = self._snapshot_from_bars(self._fetch_hourly_bars(symbols), symbols)
+        if not snapshot:
+            logger.warning("No market data received")
+            return {}
+        
+        self.cache.set_many('snapshot', snapshot)
+        return snapshot
+
+    def _fetch_hourly_bars(self, symbols):
+        end = datetime.now(timezone.utc)
+        request = StockBarsRequest(
+            symbol_or_symbols=symbols,
+            timeframe=TimeFrame.Hour,
+            start=end - SNAPSHOT_LOOKBACK,
+            end=end
+        )
+        return bars_by_symbol(self.data_client.get_stock_bars(request))
+
+    @staticmethod
+    def _session_closes(columns):
+        """(session date, session close, previous session close) from hourly bar columns"""
+        timestamps = pd.DatetimeIndex(columns['timestamp'], tz='UTC')
+        return session_closes(timestamps, columns['close'], timedelta(hours=1))
+
+    @staticmethod
+    def _snapshot_from_bars(bars, symbols):
+        """Format {symbol: [bar, ...]} hourly bars as snapshot entries, with change vs the previous session close"""
+        snapshot = {}
+        for symbol in symbols:
+            symbol_bars = bars.get(symbol)
+            if symbol_bars:
+                columns = bar_columns(symbol_bars)
+                closes = columns['close']
+                last_time = pd.Timestamp(columns['timestamp'][-1], tz='UTC')
+                prev_close = reference_close(last_time, *MarketDataService._session_closes(columns))
+                
+                change_pct = 0
+                if prev_close:
+                    change_pct = ((closes[-1] - prev_close) / prev_close) * 100
+                    
+                snapshot[symbol] = {
+                    'price': float(closes[-1]),
+                    'change': float(change_pct),
+                    'volume': int(columns['volume'][-1]),
+                    'time': last_time.isoformat()
+                }
+        return snapshot
+
+    @coalesced
     def get_technical_indicators(self, symbol, days=5):
-        """Calculate technical indicators for a symbol"""
+        """Calculate technical indicators for a symbol.
+
+        ``days`` is deprecated and ignored: values come from the streaming
+        engine, which always holds at least ``warmup_days`` of history.
+        """
         try:
-            end = datetime.now()
-            start = end - timedelta(days=days)
-            
-            request = StockBarsRequest(
-                symbol_or_symbols=symbol,
-                timeframe=TimeFrame.Day,
-                start=start,
-                end=end
-            )
-            
-            bars = self.data_client.get_stock_bars(request)
-            
-            if not bars or symbol not in bars:
+            cached = self.cache.get('indicators', symbol)
+            if cached:
+                return cached
+
+            indicators = self._update_daily_indicators([symbol]).get(symbol)
+            if not indicators:
                 logger.warning(f"No data received for {symbol}")
                 return None
-                
-            # Convert to pandas DataFrame
-            df = pd.DataFrame([{
-                'close': float(bar.close),
-                'volume': int(bar.volume)
-            } for bar in bars[symbol]])
             
-            # Calculate technical indicators
-            df['SMA_5'] = df['close'].rolling(window=5).mean()
-            df['SMA_20'] = df['close'].rolling(window=20).mean()
-            df['RSI'] = self._calculate_rsi(df['close'])
-            
-            return {
-                'current_price': float(df['close'].iloc[-1]),
-                'sma_5': float(df['SMA_5'].iloc[-1]) if not pd.isna(df['SMA_5'].iloc[-1]) else None,
-                'sma_20': float(df['SMA_20'].iloc[-1]) if not pd.isna(df['SMA_20'].iloc[-1]) else None,
-                'rsi': float(df['RSI'].iloc[-1]) if not pd.isna(df['RSI'].iloc[-1]) else None,
-                'volume': int(df['volume'].iloc[-1])
-            }
+            self.cache.set('indicators', symbol, indicators)
+            return indicators
             
         except Exception as e:
             logger.error(f"Error calculating technical indicators for {symbol}: {e}", exc_info=True)
             return None
 
-    def _calculate_rsi(self, prices, periods=14):
-        """Calculate RSI technical indicator"""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=periods).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=periods).mean()
-        rs = gain / loss
-        return 100 - (100 / (1 + rs))
+    def get_technical_indicators_batch(self, symbols, days=5):
+        """Calculate technical indicators for many symbols with one batched bar request (``days`` is ignored)"""
+        try:
+            symbols = self._normalize_symbols(symbols)
+            results, missing = self.cache.get_many('indicators', symbols)
+            if missing:
+                results.update(self._calculate_indicators_batch(missing))
+            return {symbol: results[symbol] for symbol in symbols if symbol in results}
+            
+        except Exception as e:
+            logger.error(f"Error calculating batch technical indicators: {e}", exc_info=True)
+            return {}
 
+    @coalesced
+    def _calculate_indicators_batch(self, symbols):
+        indicators = self._update_daily_indicators(symbols)
+        if not indicators:
+            logger.warning("No batch indicator data received")
+        self.cache.set_many('indicators', indicators)
+        return indicators
+
+    def _update_daily_indicators(self, symbols):
+        """Feed new daily bars into the streaming engine and return current values.
+
+        Symbols the engine has not seen are warmed up from ``warmup_days``
+        of history; known symbols only read bars newer than their last
+        closed bar, so each call costs O(new bars).
+        """
+        now = datetime.now(timezone.utc)
+        engine = self.daily_indicators
+        cold = [symbol for symbol in symbols if not engine.has_state(symbol)]
+        warm = [symbol for symbol in symbols if engine.has_state(symbol)]
+        warmup_start = now - timedelta(days=INDICATOR_CONFIG['warmup_days'])
+        
+        frames = {}
+        if cold:
+            frames.update(self.bar_store.sync_many(self.data_client, cold, TimeFrame.Day, warmup_start, now))
+        if warm:
+            start = min(engine.last_timestamp(symbol) or warmup_start for symbol in warm)
+            frames.update(self.bar_store.sync_many(self.data_client, warm, TimeFrame.Day, start, now))
+        
+        indicators = {}
+        for symbol in symbols:
+            engine.ingest(symbol, frames[symbol], now)
+            snapshot = engine.snapshot(symbol)
+            if snapshot:
+                indicators[symbol] = {
+                    'current_price': snapshot['current_price'],
+                    'sma_5': snapshot['sma_5'],
+                    'sma_20': snapshot['sma_20'],
+                    'ema_12': snapshot['ema_12'],
+                    'ema_26': snapshot['ema_26'],
+                    'rsi': snapshot['rsi'],
+                    'volume': int(snapshot['volume'])
+                }
+        return indicators
+
+    @coalesced
     def get_market_breadth(self):
-        """Get market breadth indicators"""
+        """Get market breadth indicators over the configured universe"""
         try:
-            # Use SPY components as a proxy for market breadth
-            spy_components = ['AAPL', 'MSFT', 'AMZN', 'GOOGL', 'META', 'NVDA', 'BRK.B', 'JPM', 'JNJ', 'V']  # Example components
-            
-            end = datetime.now()
-            start = end - timedelta(days=1)
+            cached = self.cache.get('breadth', 'default')
+            if cached:
+                return cached
+
+            universe = self._breadth_universe()
+            now = datetime.now(timezone.utc)
+            start = now - timedelta(days=BREADTH_CONFIG['lookback_days'])
             
-            request = StockBarsRequest(
-                symbol_or_symbols=spy_components,
-                timeframe=TimeFrame.Hour,
-                start=start,
-                end=end
+            # Daily bars come from the local store; only the missing tail is downloaded
+            records = self.bar_store.sync_records(self.data_client, universe, TimeFrame.Day, start, now)
+            breadth = compute_breadth(
+                records,
+                sma_window=BREADTH_CONFIG['sma_window'],
+                high_low_window=BREADTH_CONFIG['high_low_window'],
+                top_n=BREADTH_CONFIG['top_n']
             )
             
-            bars = self.data_client.get_stock_bars(request)
-            
-            if not bars:
+            if not breadth:
                 logger.warning("No market breadth data received")
                 return None
                 
-            # Calculate daily changes
-            changes = []
-            for symbol in spy_components:
-                if symbol in bars:
-                    symbol_bars = bars[symbol]
-                    if len(symbol_bars) >= 2:
-                        first_price = float(symbol_bars[0].close)
-                        last_price = float(symbol_bars[-1].close)
-                        pct_change = ((last_price - first_price) / first_price) * 100
-                        changes.append({'symbol': symbol, 'change': pct_change})
-            
-            # Sort by change
-            changes.sort(key=lambda x: x['change'])
-            
-            advancing = len([c for c in changes if c['change'] > 0])
-            declining = len([c for c in changes if c['change'] < 0])
-            
-            return {
-                'advancing': advancing,
-                'declining': declining,
-                'top_gainers': changes[-5:],  # Top 5 gainers
-                'top_losers': changes[:5]     # Top 5 losers
-            }
+            breadth['universe_size'] = len(universe)
+            self.cache.set('breadth', 'default', breadth)
+            return breadth
             
         except Exception as e:
             logger.error(f"Error getting market breadth: {e}", exc_info=True)
             return None
 
+    def _breadth_universe(self):
+        source = BREADTH_CONFIG['universe']
+        universe = self.cache.get('universe', source)
+        if universe is None:
+            universe = load_universe(source, self.calendar.trading_client)
+            self.cache.set('universe', source, universe)
+        return universe
+
+    @coalesced
     def get_intraday_vwap(self, symbol):
         """Calculate VWAP (Volume Weighted Average Price) for today"""
         try:
-            end = datetime.now()
-            start = end.replace(hour=9, minute=30, second=0, microsecond=0)  # Market open
+            cached = self.cache.get('vwap', symbol)
+            if cached:
+                return cached
+
+            now = datetime.now(timezone.utc)
+            session_open = now.astimezone(EASTERN).replace(hour=9, minute=30, second=0, microsecond=0)  # Market open
             
-            request = StockBarsRequest(
-                symbol_or_symbols=symbol,
-                timeframe=TimeFrame.Minute,
-                start=start,
-                end=end
-            )
+            # Only bars after the last one applied to the session VWAP are read
+            engine = self.intraday_indicators
+            last = engine.last_timestamp(symbol)
+            start = last if last is not None and last >= session_open else session_open
             
-            bars = self.data_client.get_stock_bars(request)
+            df = self.bar_store.sync(self.data_client, symbol, TimeFrame.Minute, start, now)
+            engine.ingest(symbol, df[df.index >= session_open], now)
+            snapshot = engine.snapshot(symbol)
             
-            if not bars or symbol not in bars:
+            if not snapshot or snapshot['time'] < session_open or snapshot['vwap'] is None:
                 logger.warning(f"No intraday data received for {symbol}")
                 return None
-                
-            # Calculate VWAP
-            df = pd.DataFrame([{
-                'close': float(bar.close),
-                'volume': int(bar.volume),
-                'typical_price': (float(bar.high) + float(bar.low) + float(bar.close)) / 3
-            } for bar in bars[symbol]])
-            
-            df['volume_typical'] = df['typical_price'] * df['volume']
-            vwap = df['volume_typical'].sum() / df['volume'].sum()
             
-            return {
-                'vwap': float(vwap),
-                'last_price': float(df['close'].iloc[-1])
+            result = {
+                'vwap': float(snapshot['vwap']),
+                'last_price': float(snapshot['current_price'])
             }
+            self.cache.set('vwap', symbol, result)
+            return result
             
         except Exception as e:
             logger.error(f"Error calculating VWAP for {symbol}: {e}", exc_info=True)
@@ -231,5 +312,8 @@ class MarketDataService:
 
     def is_market_open(self):
         """Check if the market is currently open"""
-        # This method is not implemented in the provided code
-        pass
+        return self.calendar.is_open()
+
+    def get_market_status(self):
+        """Return is_open/next_open/next_close from the cached exchange calendar"""
+        return self.calendar.status()
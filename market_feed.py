@@ -0,0 +1,339 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from client_registry import get_client_registry
+from indicators import reference_close, regular_session_date
+from listeners import ListenerSet
+
+logger = logging.getLogger(__name__)
+
+
+def _as_datetime(timestamp):
+    """Normalize stream timestamps (datetime or epoch ns) to aware UTC datetimes"""
+    if isinstance(timestamp, datetime):
+        return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+    return datetime.fromtimestamp(timestamp / 1e9, tz=timezone.utc)
+
+
+class MarketDataFeed:
+    """In-memory latest-state table fed by a streaming source.
+
+    A source (live Alpaca websocket or local replay) pushes trades, quotes and
+    bars into ``on_trade``/``on_quote``/``on_bar``; the bot and dashboard read
+    the newest values with ``latest``/``snapshot`` instead of polling REST.
+    Bar listeners are called after each bar is applied, e.g. to update the
+    streaming indicator engine; quote listeners after each quote. A day's
+    change is measured against the previous regular session's close.
+    """
+
+    def __init__(self, source, max_age=120, bar_duration=timedelta(minutes=1)):
+        self.source = source
+        self.max_age = max_age  # Seconds before a symbol's state counts as stale
+        self.bar_duration = bar_duration
+        self._state = {}
+        self._symbols = set()
+        self._bar_listeners = ListenerSet('bar')
+        self._quote_listeners = ListenerSet('quote')
+        self._lock = threading.Lock()
+        self.running = False
+
+    def add_bar_listener(self, listener):
+        """Register listener(symbol, bar_dict) to be called for every bar"""
+        self._bar_listeners.add(listener)
+
+    def remove_bar_listener(self, listener):
+        self._bar_listeners.remove(listener)
+
+    def add_quote_listener(self, listener):
+        """Register listener(symbol, quote_dict) to be called for every quote"""
+        self._quote_listeners.add(listener)
+
+    def remove_quote_listener(self, listener):
+        self._quote_listeners.remove(listener)
+
+    def seed_session(self, symbol, session, session_close, prev_close):
+        """Set a symbol's session closes from REST data unless the stream has seen a later session"""
+        with self._lock:
+            entry = self._entry(symbol)
+            if entry['session'] is None or session > entry['session']:
+                entry.update(session=session, session_close=session_close, prev_close=prev_close)
+            elif session == entry['session'] and entry['prev_close'] is None:
+                entry['prev_close'] = prev_close
+
+    def subscribe(self, symbols):
+        """Start streaming symbols that are not already subscribed"""
+        with self._lock:
+            new = [s for s in symbols if s not in self._symbols]
+            self._symbols.update(new)
+        if new and self.running:
+            self.source.subscribe(self, new)
+        return new
+
+    @property
+    def symbols(self):
+        with self._lock:
+            return sorted(self._symbols)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        logger.info(f"Starting market data feed for {len(self._symbols)} symbols")
+        self.source.start(self, self.symbols)
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self.source.stop()
+        logger.info("Market data feed stopped")
+
+    def _entry(self, symbol):
+        entry = self._state.get(symbol)
+        if entry is None:
+            entry = self._state[symbol] = {
+                'price': None, 'bid': None, 'ask': None, 'bid_size': None, 'ask_size': None,
+                'bar': None, 'session': None, 'session_close': None, 'prev_close': None,
+                'time': None, 'updated_at': None
+            }
+        return entry
+
+    def on_trade(self, symbol, timestamp, price, size):
+        with self._lock:
+            entry = self._entry(symbol)
+            entry['price'] = float(price)
+            entry['time'] = _as_datetime(timestamp)
+            entry['updated_at'] = time.monotonic()
+
+    def on_quote(self, symbol, timestamp, bid, ask, bid_size, ask_size):
+        with self._lock:
+            entry = self._entry(symbol)
+            entry.update(bid=float(bid), ask=float(ask), bid_size=float(bid_size), ask_size=float(ask_size))
+            if entry['price'] is None and bid and ask:
+                entry['price'] = (float(bid) + float(ask)) / 2
+                entry['time'] = _as_datetime(timestamp)
+            entry['updated_at'] = time.monotonic()
+        if self._quote_listeners:
+            quote = {'bid': float(bid), 'ask': float(ask), 'bid_size': float(bid_size), 'ask_size': float(ask_size)}
+            self._quote_listeners(symbol, quote)
+
+    def on_bar(self, symbol, timestamp, open, high, low, close, volume):
+        bar = {
+            'timestamp': _as_datetime(timestamp), 'open': float(open), 'high': float(high),
+            'low': float(low), 'close': float(close), 'volume': float(volume)
+        }
+        session = regular_session_date(bar['timestamp'], self.bar_duration)
+        with self._lock:
+            entry = self._entry(symbol)
+            if session is not None and (entry['session'] is None or session >= entry['session']):
+                if entry['session'] is not None and session > entry['session']:
+                    entry['prev_close'] = entry['session_close']
+                entry['session'] = session
+                entry['session_close'] = bar['close']
+            entry['bar'] = bar
+            if entry['time'] is None or bar['timestamp'] >= entry['time']:
+                entry['price'] = bar['close']
+                entry['time'] = bar['timestamp']
+            entry['updated_at'] = time.monotonic()
+        self._bar_listeners(symbol, bar)
+
+    def latest(self, symbol):
+        """Return a copy of the full latest state for a symbol, or None"""
+        with self._lock:
+            entry = self._state.get(symbol)
+            return dict(entry) if entry else None
+
+    def snapshot(self, symbols):
+        """Return fresh entries shaped like MarketDataService.get_market_snapshot"""
+        now = time.monotonic()
+        snapshot = {}
+        with self._lock:
+            for symbol in symbols:
+                entry = self._state.get(symbol)
+                if not entry or entry['price'] is None or now - entry['updated_at'] > self.max_age:
+                    continue
+                prev_close = reference_close(entry['time'], entry['session'], entry['session_close'],
+                                             entry['prev_close'])
+                change = ((entry['price'] - prev_close) / prev_close) * 100 if prev_close else 0
+                snapshot[symbol] = {
+                    'price': entry['price'],
+                    'change': float(change),
+                    'volume': int(entry['bar']['volume']) if entry['bar'] else 0,
+                    'time': entry['time'].isoformat()
+                }
+        return snapshot
+
+
+class AlpacaStreamSource:
+    """Live source backed by alpaca-py's StockDataStream websocket"""
+
+    def __init__(self, api_key, api_secret, feed='iex'):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.feed_name = feed
+        self._stream = None
+        self._thread = None
+
+    def _handlers(self, feed):
+        async def on_trade(trade):
+            feed.on_trade(trade.symbol, trade.timestamp, trade.price, trade.size)
+
+        async def on_quote(quote):
+            feed.on_quote(quote.symbol, quote.timestamp, quote.bid_price, quote.ask_price,
+                          quote.bid_size, quote.ask_size)
+
+        async def on_bar(bar):
+            feed.on_bar(bar.symbol, bar.timestamp, bar.open, bar.high, bar.low, bar.close, bar.volume)
+
+        return on_trade, on_quote, on_bar
+
+    def subscribe(self, feed, symbols):
+        on_trade, on_quote, on_bar = self._handlers(feed)
+        self._stream.subscribe_trades(on_trade, *symbols)
+        self._stream.subscribe_quotes(on_quote, *symbols)
+        self._stream.subscribe_bars(on_bar, *symbols)
+
+    def start(self, feed, symbols):
+        from alpaca.data.enums import DataFeed
+        from alpaca.data.live import StockDataStream
+
+        self._stream = StockDataStream(self.api_key, self.api_secret, feed=DataFeed(self.feed_name))
+        if symbols:
+            self.subscribe(feed, symbols)
+        self._thread = threading.Thread(target=self._stream.run, name='market-data-stream', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._stream:
+            self._stream.stop()
+
+
+class ReplaySource:
+    """Offline source that replays recorded events into a feed.
+
+    Events are dicts with ``type`` ('trade', 'quote' or 'bar'), ``symbol``,
+    ``timestamp`` and the fields of the matching ``on_*`` callback. With
+    ``speed=None`` events are pushed as fast as possible; otherwise the gaps
+    between event timestamps are replayed divided by ``speed``.
+    """
+
+    def __init__(self, events, speed=None):
+        self.events = list(events)
+        self.speed = speed
+        self._stop = threading.Event()
+        self._thread = None
+        self._symbols = set()
+
+    @classmethod
+    def from_bar_store(cls, store, symbols, timeframe, start=None, end=None, speed=None):
+        """Build a replay of stored bars, merged across symbols in time order"""
+        events = []
+        for symbol in symbols:
+            df = store.read(symbol, timeframe, start, end)
+            for timestamp, row in zip(df.index.to_pydatetime(), df.itertuples(index=False)):
+                events.append({'type': 'bar', 'symbol': symbol, 'timestamp': timestamp,
+                               'open': row.open, 'high': row.high, 'low': row.low,
+                               'close': row.close, 'volume': row.volume})
+        events.sort(key=lambda event: event['timestamp'])
+        return cls(events, speed)
+
+    def subscribe(self, feed, symbols):
+        self._symbols.update(symbols)
+
+    def start(self, feed, symbols):
+        self._symbols = set(symbols)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(feed,), name='market-data-replay', daemon=True)
+        self._thread.start()
+
+    def _run(self, feed):
+        previous = None
+        for event in self.events:
+            if self._stop.is_set():
+                break
+            if self._symbols and event['symbol'] not in self._symbols:
+                continue
+            timestamp = _as_datetime(event['timestamp'])
+            if self.speed and previous is not None:
+                delay = (timestamp - previous).total_seconds() / self.speed
+                if delay > 0 and self._stop.wait(delay):
+                    break
+            previous = timestamp
+            fields = {k: v for k, v in event.items() if k != 'type'}
+            getattr(feed, f"on_{event['type']}")(**fields)
+
+    def join(self, timeout=None):
+        """Wait for the replay to finish"""
+        if self._thread:
+            self._thread.join(timeout)
+
+    def stop(self):
+        self._stop.set()
+
+
+def _replay_from_bar_store(speed):
+    """Replay every symbol with stored minute bars"""
+    from alpaca.data.timeframe import TimeFrame
+    from bar_store import BarStore
+
+    store = BarStore()
+    directory = os.path.join(store.root_dir, str(TimeFrame.Minute))
+    symbols = [name[:-len('.npy')] for name in os.listdir(directory)
+               if name.endswith('.npy')] if os.path.isdir(directory) else []
+    return ReplaySource.from_bar_store(store, symbols, TimeFrame.Minute, speed=speed)
+
+
+_shared_feed = None
+_shared_feed_lock = threading.Lock()
+_websocket_refused = None  # Why this process must not open the market data websocket
+
+
+def refuse_websocket(reason):
+    """Keep this process off the market data websocket, e.g. in one of several web workers.
+
+    Alpaca allows one market data websocket per account, so with several
+    server processes MARKET_DATA_STREAM=alpaca is ignored in each of them
+    and prices are polled over REST instead.
+    """
+    global _websocket_refused
+    _websocket_refused = reason
+    logger.info(f"Market data websocket disabled in this process: {reason}")
+
+
+def _restart_with_rotated_keys():
+    api_key, api_secret, _ = get_client_registry().alpaca_credentials()
+    _shared_feed.source.api_key, _shared_feed.source.api_secret = api_key, api_secret
+    _shared_feed.stop()
+    _shared_feed.start()
+
+
+def get_shared_feed():
+    """Return the process-wide feed configured by MARKET_DATA_STREAM, or None.
+
+    Alpaca allows a single market data websocket per account, so every
+    service in the process shares one feed; a process that other processes
+    share the account with must call refuse_websocket first. Set
+    MARKET_DATA_STREAM to ``alpaca`` for the live websocket or ``replay``
+    to replay minute bars from the local bar store.
+    """
+    global _shared_feed
+    registry = get_client_registry()  # Loads .env once per process
+    mode = os.getenv('MARKET_DATA_STREAM', '').lower()
+    if mode not in ('alpaca', 'replay'):
+        return None
+    if mode == 'alpaca' and _websocket_refused:
+        return None
+    with _shared_feed_lock:
+        if _shared_feed is None:
+            if mode == 'alpaca':
+                api_key, api_secret, _ = registry.alpaca_credentials()
+                source = AlpacaStreamSource(api_key, api_secret, feed=os.getenv('MARKET_DATA_FEED', 'iex').lower())
+                registry.add_rotation_listener(_restart_with_rotated_keys)
+            else:
+                source = _replay_from_bar_store(float(os.getenv('MARKET_DATA_REPLAY_SPEED', '60')))
+            _shared_feed = MarketDataFeed(source)
+            _shared_feed.start()
+        return _shared_feed
@@ -0,0 +1,248 @@
+import logging
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta, timezone
+
+from alpaca.common.enums import Sort
+from alpaca.trading.enums import OrderSide, OrderStatus, QueryOrderStatus
+from alpaca.trading.requests import GetOrdersRequest
+
+from client_registry import get_client_registry
+from config import ORDER_STORE_CONFIG
+from listeners import ListenerSet
+
+logger = logging.getLogger(__name__)
+
+
+_CLOSED_STATUSES = frozenset({
+    OrderStatus.FILLED, OrderStatus.CANCELED, OrderStatus.EXPIRED, OrderStatus.REJECTED,
+    OrderStatus.REPLACED, OrderStatus.DONE_FOR_DAY
+})
+
+
+def _epoch(value):
+    return value.timestamp() if value is not None else 0.0
+
+
+def trade_key(order):
+    """Sort key (epoch microseconds, id) of a trade: its fill time, or the submission time while unfilled"""
+    return (round(_epoch(order.filled_at or order.submitted_at) * 1e6), str(order.id))
+
+
+def encode_cursor(key):
+    return f"{key[0]}:{key[1]}"
+
+
+def decode_cursor(cursor):
+    """Parse a cursor produced by encode_cursor; raises ValueError if malformed"""
+    micros, order_id = cursor.split(':', 1)
+    return int(micros), order_id
+
+
+class TradeUpdatesStream:
+    """Runs alpaca-py's TradingStream in a background thread"""
+
+    def __init__(self, api_key, api_secret, paper=True):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.paper = paper
+        self._stream = None
+
+    def start(self, callback):
+        """Call callback(event, order) for every trade update"""
+        from alpaca.trading.stream import TradingStream
+
+        async def on_update(update):
+            callback(getattr(update.event, 'value', update.event), update.order)
+
+        self._stream = TradingStream(self.api_key, self.api_secret, paper=self.paper)
+        self._stream.subscribe_trade_updates(on_update)
+        threading.Thread(target=self._stream.run, name='trade-updates-stream', daemon=True).start()
+
+    def stop(self):
+        if self._stream:
+            self._stream.stop()
+
+
+class OrderStore:
+    """In-memory table of the account's orders, kept current by trade updates.
+
+    Started once: the trade-update stream is subscribed first and the table
+    is then backfilled with server-side filtered, paginated order queries,
+    so nothing that happens during the backfill is lost. Afterwards reads
+    are served from memory without any network calls. Orders are keyed by
+    id and an older version never overwrites a newer one.
+    """
+
+    def __init__(self, trading_client, stream=None, backfill_days=30, page_size=500, max_backfill_orders=5000,
+                 order_lifetime_days=90):
+        self.trading_client = trading_client
+        self.stream = stream
+        self.backfill_days = backfill_days
+        self.order_lifetime_days = order_lifetime_days
+        self.page_size = page_size
+        self.max_backfill_orders = max_backfill_orders
+        self._orders = {}
+        self._fills = []  # Sorted trade_key (fill time) of filled orders
+        self.horizon = None  # Every fill after this is in the table
+        self._listeners = ListenerSet('order update')
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stream_started = False
+        self.ready = False
+
+    def rebind(self, trading_client, stream=None):
+        """Switch to clients for other credentials; the table is emptied and reloaded on next use"""
+        with self._start_lock:
+            self.ready = False
+            if self.stream and self._stream_started:
+                self.stream.stop()
+            self.trading_client, self.stream = trading_client, stream
+            self._stream_started = False
+            with self._lock:
+                self._orders = {}
+                self._fills = []
+            self.horizon = None
+
+    def add_listener(self, listener):
+        """Register listener(event, order) to be called for every trade update; bound methods are held weakly"""
+        self._listeners.add(listener)
+
+    def remove_listener(self, listener):
+        self._listeners.remove(listener)
+
+    def ensure_started(self):
+        """Subscribe to trade updates and backfill once; retried on the next call if it fails"""
+        if self.ready:
+            return True
+        with self._start_lock:
+            if self.ready:
+                return True
+            try:
+                if self.stream and not self._stream_started:
+                    self.stream.start(self.apply_update)
+                    self._stream_started = True
+                self.backfill()
+                self.ready = True
+            except Exception as e:
+                logger.error(f"Error starting order store: {e}", exc_info=True)
+            return self.ready
+
+    def backfill(self):
+        """Load open orders and recently closed orders, newest first, page by page.
+
+        Alpaca filters orders by submission time while trades are keyed by
+        fill time, so closed orders are loaded from ``order_lifetime_days``
+        before the horizon: an order filled after the horizon was submitted
+        at most that long before it.
+        """
+        self._load(GetOrdersRequest(status=QueryOrderStatus.OPEN, limit=self.page_size))
+
+        lifetime = timedelta(days=self.order_lifetime_days)
+        after = datetime.now(timezone.utc) - timedelta(days=self.backfill_days) - lifetime
+        until = None
+        seen = set()
+        while len(seen) < self.max_backfill_orders:
+            page = self._load(GetOrdersRequest(
+                status=QueryOrderStatus.CLOSED,
+                limit=self.page_size,
+                after=after,
+                until=until,
+                direction=Sort.DESC
+            ))
+            new = {str(order.id) for order in page} - seen
+            seen.update(new)
+            if len(page) < self.page_size:
+                until = None
+                break
+            if not new:
+                logger.warning(f"More than {self.page_size} orders share one submission time; backfill stops there")
+                break
+            # Continue from the oldest order of this page, inclusively so orders sharing its
+            # timestamp are not skipped; the ones already loaded are recognized by id
+            until = min(order.submitted_at for order in page) + timedelta(microseconds=1)
+        # A backfill cut short by max_backfill_orders is only complete back to its oldest page
+        self.horizon = (until or after) + lifetime
+        logger.info(f"Backfilled {len(self._orders)} orders")
+
+    def _load(self, request):
+        orders = self.trading_client.get_orders(request)
+        for order in orders:
+            self.upsert(order)
+        return orders
+
+    def upsert(self, order):
+        """Insert or update an order unless the stored version is newer"""
+        with self._lock:
+            existing = self._orders.get(str(order.id))
+            if existing is not None and _epoch(existing.updated_at) > _epoch(order.updated_at):
+                return
+            self._orders[str(order.id)] = order
+            if order.status == OrderStatus.FILLED and order.filled_at is not None and (
+                    existing is None or existing.status != OrderStatus.FILLED):
+                insort(self._fills, trade_key(order))
+
+    def apply_update(self, event, order):
+        """Handle one trade-update event from the stream"""
+        self.upsert(order)
+        self._listeners(event, order)
+
+    def get(self, order_id):
+        with self._lock:
+            return self._orders.get(str(order_id))
+
+    def recent_fills(self, limit=50, symbols=None, before=None, since=None):
+        """Return filled orders by fill time, newest first, optionally between two trade keys (exclusive)"""
+        with self._lock:
+            lo = bisect_right(self._fills, since) if since is not None else 0
+            hi = bisect_left(self._fills, before) if before is not None else len(self._fills)
+            fills = []
+            for _, order_id in reversed(self._fills[lo:hi]):
+                order = self._orders[order_id]
+                if symbols is None or order.symbol in symbols:
+                    fills.append(order)
+                    if len(fills) == limit:
+                        break
+            return fills
+
+    def open_quantities(self, symbols=None):
+        """Unfilled quantity of open orders per symbol: buys count positive, sells negative"""
+        quantities = {}
+        with self._lock:
+            for order in self._orders.values():
+                if order.status in _CLOSED_STATUSES or (symbols is not None and order.symbol not in symbols):
+                    continue
+                remaining = float(order.qty or 0) - float(order.filled_qty or 0)
+                sign = 1 if order.side == OrderSide.BUY else -1
+                quantities[order.symbol] = quantities.get(order.symbol, 0.0) + sign * remaining
+        return quantities
+
+    def __len__(self):
+        return len(self._orders)
+
+
+_order_store = None
+_order_store_lock = threading.Lock()
+
+
+def _trade_updates_stream():
+    return TradeUpdatesStream(*get_client_registry().alpaca_credentials())
+
+
+def _rebind_order_store():
+    # New keys may belong to another account, so its orders are loaded afresh
+    _order_store.rebind(get_client_registry().trading_client(), _trade_updates_stream())
+
+
+def get_order_store(trading_client):
+    """Return the process-wide order store, creating it with `trading_client` on first use.
+
+    One store (and one trade-updates websocket) is shared by every
+    AlpacaClient in the process.
+    """
+    global _order_store
+    with _order_store_lock:
+        if _order_store is None:
+            _order_store = OrderStore(trading_client, _trade_updates_stream(), **ORDER_STORE_CONFIG)
+            get_client_registry().add_rotation_listener(_rebind_order_store)
+        return _order_store
@@ -0,0 +1,139 @@
+import hashlib
+import math
+from itertools import chain
+from operator import attrgetter, itemgetter
+
+import numpy as np
+
+POSITION_COLUMNS = ('qty', 'avg_entry_price', 'current_price', 'market_value', 'unrealized_pl', 'unrealized_plpc')
+
+
+def _to_float(value):
+    return float(value) if value is not None else math.nan
+
+
+def position_columns(positions):
+    """Load Alpaca positions (models or formatted dicts) into columnar NumPy arrays in one pass"""
+    count = len(positions)
+    getter = itemgetter if count and isinstance(positions[0], dict) else attrgetter
+    values = np.fromiter(
+        map(_to_float, chain.from_iterable(map(getter(*POSITION_COLUMNS), positions))),
+        dtype=np.float64, count=count * len(POSITION_COLUMNS)
+    ).reshape(count, len(POSITION_COLUMNS))
+    columns = {name: values[:, i] for i, name in enumerate(POSITION_COLUMNS)}
+    columns['symbol'] = np.array(list(map(getter('symbol'), positions)), dtype=object)
+    return columns
+
+
+def analyze_portfolio(columns, portfolio_value, cash, buying_power, volatility=None, top_n=5, extremes=3):
+    """Compute portfolio metrics from position columns in vectorized passes.
+
+    Returns the same fields as before (counts, winner/loser averages,
+    best/worst returns, top-N concentration and positions ordered by
+    market value) plus long/short exposure, the Herfindahl-Hirschman
+    index of absolute exposure and each position's share of portfolio
+    risk. Without per-position ``volatility`` the risk split assumes
+    equal, uncorrelated volatilities, so it reduces to squared exposure.
+    """
+    count = len(columns['symbol'])
+    if count == 0:
+        return None
+
+    market_value = columns['market_value']
+    unrealized_pl = columns['unrealized_pl']
+    pl_percent = columns['unrealized_plpc'] * 100
+    weight = market_value / portfolio_value * 100 if portfolio_value else np.zeros(count)
+
+    winners = pl_percent > 0
+    winner_count = int(np.count_nonzero(winners))
+    loser_count = count - winner_count
+    order = np.argsort(-market_value, kind='stable')
+
+    long_value = float(market_value[market_value > 0].sum())
+    short_value = float(-market_value[market_value < 0].sum())
+    gross = long_value + short_value
+    share = np.abs(market_value) / gross if gross else np.full(count, 1.0 / count)
+    hhi = float(np.dot(share, share))
+
+    risk = share * (np.asarray(volatility, dtype=np.float64) if volatility is not None else 1.0)
+    risk = risk * risk
+    risk_total = risk.sum()
+    risk_contribution = risk / risk_total * 100 if risk_total else np.zeros(count)
+
+    def percent_of_equity(value):
+        return value / portfolio_value * 100 if portfolio_value else 0.0
+
+    fields = zip(
+        columns['symbol'][order].tolist(), columns['qty'][order].tolist(), market_value[order].tolist(),
+        weight[order].tolist(), columns['avg_entry_price'][order].tolist(), columns['current_price'][order].tolist(),
+        unrealized_pl[order].tolist(), pl_percent[order].tolist(), risk_contribution[order].tolist()
+    )
+    positions = [
+        {
+            'symbol': symbol,
+            'shares': shares,
+            'market_value': value,
+            'weight': position_weight,
+            'entry_price': entry_price,
+            'current_price': current_price,
+            'pl_dollars': pl_dollars,
+            'pl_percent': pl_pct,
+            'risk_contribution': contribution
+        }
+        for symbol, shares, value, position_weight, entry_price, current_price, pl_dollars, pl_pct, contribution in fields
+    ]
+
+    # Rank of each position in `positions`, to pick best/worst without re-sorting the dicts
+    rank = np.empty(count, dtype=np.intp)
+    rank[order] = np.arange(count)
+    by_return = np.argsort(-pl_percent, kind='stable')
+
+    return {
+        'portfolio_value': portfolio_value,
+        'cash': cash,
+        'buying_power': buying_power,
+        'total_pl': float(unrealized_pl.sum()),
+        'positions_count': count,
+        'winning_positions': winner_count,
+        'losing_positions': loser_count,
+        'avg_winner_return': float(pl_percent[winners].mean()) if winner_count else 0,
+        'avg_loser_return': float(pl_percent[~winners].mean()) if loser_count else 0,
+        'max_position_gain': float(pl_percent.max()),
+        'max_position_loss': float(pl_percent.min()),
+        'top_5_concentration': float(weight[order[:top_n]].sum()),
+        'exposure': {
+            'long': long_value,
+            'short': short_value,
+            'gross': gross,
+            'net': long_value - short_value,
+            'gross_percent': percent_of_equity(gross),
+            'net_percent': percent_of_equity(long_value - short_value)
+        },
+        'hhi': hhi,
+        'effective_positions': 1 / hhi if hhi else 0.0,
+        'best_positions': [positions[i] for i in rank[by_return[:extremes]]],
+        'worst_positions': [positions[i] for i in rank[by_return[::-1][:extremes]]],
+        'positions': positions
+    }
+
+
+def positions_digest(positions):
+    """Short digest of the analyzed positions' symbols, sizes, values and returns (cents/bps)"""
+    rows = [
+        (p['symbol'], p['shares'], round(p['market_value'], 2), round(p['pl_percent'], 2), round(p['weight'], 2))
+        for p in positions
+    ]
+    return hashlib.blake2b(repr(rows).encode(), digest_size=8).hexdigest()
+
+
+def chart_columns(positions, decimals=2):
+    """Columnar chart data (one array per field, ordered by market value) for the dashboard charts"""
+    return {
+        'symbols': [p['symbol'] for p in positions],
+        'shares': [p['shares'] for p in positions],
+        'market_value': [round(p['market_value'], decimals) for p in positions],
+        'pl_percent': [round(p['pl_percent'], decimals) for p in positions],
+        'pl_dollars': [round(p['pl_dollars'], decimals) for p in positions],
+        'entry_price': [round(p['entry_price'], decimals) for p in positions],
+        'current_price': [round(p['current_price'], decimals) for p in positions]
+    }
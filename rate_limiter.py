@@ -0,0 +1,190 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from urllib.parse import urlparse
+
+from config import RATE_LIMIT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Request classes, most urgent first"""
+    ORDERS = 0
+    ACCOUNT = 1
+    MARKET_DATA = 2
+    DASHBOARD = 3
+
+
+_priority = ContextVar('alpaca_request_priority', default=None)
+
+
+def set_request_priority(priority):
+    """Set the priority of Alpaca calls in the current context; returns a reset token"""
+    return _priority.set(priority)
+
+
+def get_request_priority():
+    """Priority set for the current context, or None"""
+    return _priority.get()
+
+
+def reset_request_priority(token):
+    _priority.reset(token)
+
+
+@contextmanager
+def request_priority(priority):
+    """Run the enclosed Alpaca calls (in this thread/context) at `priority`"""
+    token = set_request_priority(priority)
+    try:
+        yield
+    finally:
+        reset_request_priority(token)
+
+
+def classify(method, url):
+    """Default priority of a request from its method and URL"""
+    parsed = urlparse(url)
+    if parsed.hostname and parsed.hostname.startswith('data.'):
+        return Priority.MARKET_DATA
+    if '/orders' in parsed.path and method.upper() != 'GET':
+        return Priority.ORDERS
+    return Priority.ACCOUNT
+
+
+def priority_for(method, url):
+    """Priority of a request: the one set for this context, else its default"""
+    priority = _priority.get()
+    return classify(method, url) if priority is None else priority
+
+
+class RateLimiter:
+    """Process-wide token bucket that queues callers by priority.
+
+    Tokens refill continuously at ``requests_per_minute`` up to ``burst``.
+    Callers that find the bucket empty wait in a priority queue (FIFO within
+    a priority) instead of failing, so when the budget runs short order
+    submission is served before account, market data and dashboard calls.
+    """
+
+    def __init__(self, requests_per_minute=200, burst=10, clock=time.monotonic):
+        self.rate = requests_per_minute / 60.0
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition(threading.Lock())
+        self._stats = {p: {'requests': 0, 'queued': 0, 'total_wait': 0.0, 'max_wait': 0.0} for p in Priority}
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority=Priority.ACCOUNT):
+        """Block until a token is available for `priority`; return seconds waited"""
+        with self._condition:
+            start = self._clock()
+            self._refill(start)
+            if not self._waiters and self._tokens >= 1:
+                self._tokens -= 1
+                self._record(priority, 0.0, queued=False)
+                return 0.0
+
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = self._clock()
+                    self._refill(now)
+                    if self._waiters[0] == entry and self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    self._condition.wait((1 - self._tokens) / self.rate if self._tokens < 1 else None)
+            finally:
+                if self._waiters[0] == entry:
+                    heapq.heappop(self._waiters)
+                else:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                # Let the next waiter in line re-check the bucket
+                self._condition.notify_all()
+
+            waited = self._clock() - start
+            self._record(priority, waited, queued=True)
+            return waited
+
+    def try_acquire(self, priority=Priority.ACCOUNT, waited=0.0):
+        """Take a token without blocking; return None if granted, else seconds to wait.
+
+        For callers that must not block (asyncio). A token is only granted
+        when no blocked caller of the same or higher priority is queued.
+        """
+        with self._condition:
+            self._refill(self._clock())
+            if self._tokens >= 1 and (not self._waiters or priority < self._waiters[0][0]):
+                self._tokens -= 1
+                self._record(priority, waited, queued=waited > 0)
+                return None
+            return max((1 - self._tokens) / self.rate, 0.001)
+
+    def _record(self, priority, waited, queued):
+        stats = self._stats[priority]
+        stats['requests'] += 1
+        stats['queued'] += queued
+        stats['total_wait'] += waited
+        stats['max_wait'] = max(stats['max_wait'], waited)
+
+    def stats(self):
+        """Return per-priority request counts and wait times plus the current queue"""
+        with self._condition:
+            self._refill(self._clock())
+            return {
+                'tokens': round(self._tokens, 3),
+                'waiting': len(self._waiters),
+                'priorities': {
+                    p.name.lower(): {
+                        **s,
+                        'avg_wait': s['total_wait'] / s['requests'] if s['requests'] else 0.0
+                    }
+                    for p, s in self._stats.items()
+                }
+            }
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Return the limiter shared by every Alpaca client in the process"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(RATE_LIMIT_CONFIG['requests_per_minute'], RATE_LIMIT_CONFIG['burst'])
+        return _limiter
+
+
+def throttle(client, limiter=None):
+    """Route every HTTP request made by an alpaca-py REST client through the limiter.
+
+    Wraps the client's ``_one_request`` so retries after a 429 also wait for
+    a token. The priority comes from ``request_priority`` when set, otherwise
+    from the request itself (see ``classify``).
+    """
+    limiter = limiter or get_rate_limiter()
+    one_request = client._one_request
+
+    def _throttled_one_request(method, url, opts, retry):
+        limiter.acquire(priority_for(method, url))
+        return one_request(method, url, opts, retry)
+
+    client._one_request = _throttled_one_request
+    return client
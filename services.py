@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _alpaca_client():
+    from alpaca_client import AlpacaClient
+    return AlpacaClient()
+
+
+def _market_data_service():
+    from market_data_service import MarketDataService
+    return MarketDataService()
+
+
+def _async_alpaca_client():
+    from async_services import AsyncAlpacaClient
+    return AsyncAlpacaClient(client=get_alpaca_client())
+
+
+def _async_market_data_service():
+    from async_services import AsyncMarketDataService
+    return AsyncMarketDataService(service=get_market_data_service())
+
+
+def _check_alpaca_connection():
+    from client_registry import get_client_registry
+    return get_client_registry().check_connection(get_alpaca_client().test_connection)
+
+
+class LazyServices:
+    """Services constructed on first use rather than at import time.
+
+    Each service is built once, under its own lock, and its construction
+    time and any error are recorded for the health report. A background
+    readiness check can warm everything up and verify the broker
+    connection without holding up the first request.
+    """
+
+    def __init__(self, factories, checks=None):
+        self._factories = factories
+        self._checks = checks or {}
+        self._instances = {}
+        self._locks = {name: threading.Lock() for name in factories}
+        self._status = {name: {'ready': False, 'init_seconds': None, 'error': None} for name in factories}
+        self._check_results = {name: None for name in self._checks}
+        self._readiness_thread = None
+        self._started = time.monotonic()
+
+    def get(self, name):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is None:
+                started = time.perf_counter()
+                try:
+                    instance = self._factories[name]()
+                except Exception as e:
+                    self._status[name]['error'] = str(e)
+                    raise
+                finally:
+                    self._status[name]['init_seconds'] = time.perf_counter() - started
+                self._instances[name] = instance
+                self._status[name].update(ready=True, error=None)
+                logger.info(f"Initialized {name} in {self._status[name]['init_seconds']:.3f}s")
+            return instance
+
+    def start_readiness_check(self):
+        """Build every service and run the checks in a background thread"""
+        if self._readiness_thread is not None:
+            return
+        self._readiness_thread = threading.Thread(target=self._check_readiness, name='readiness-check', daemon=True)
+        self._readiness_thread.start()
+
+    def _check_readiness(self):
+        for name in self._factories:
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.error(f"Error initializing {name}: {e}", exc_info=True)
+        for name, check in self._checks.items():
+            try:
+                self._check_results[name] = bool(check())
+            except Exception as e:
+                logger.error(f"Readiness check {name} failed: {e}")
+                self._check_results[name] = False
+
+    def health(self):
+        """Return overall status ('starting', 'ok' or 'degraded') with per-service details"""
+        services = {name: dict(status) for name, status in self._status.items()}
+        checks = dict(self._check_results)
+        if any(status['error'] for status in services.values()) or False in checks.values():
+            status = 'degraded'
+        elif all(s['ready'] for s in services.values()) and None not in checks.values():
+            status = 'ok'
+        else:
+            status = 'starting'
+        return {
+            'status': status,
+            'uptime': time.monotonic() - self._started,
+            'services': services,
+            'checks': checks
+        }
+
+
+services = LazyServices(
+    {
+        'alpaca': _alpaca_client,
+        'market_data': _market_data_service,
+        'async_alpaca': _async_alpaca_client,
+        'async_market_data': _async_market_data_service
+    },
+    checks={'alpaca_api': _check_alpaca_connection}
+)
+
+
+def get_alpaca_client():
+    return services.get('alpaca')
+
+
+def get_market_data_service():
+    return services.get('market_data')
+
+
+def get_async_alpaca_client():
+    return services.get('async_alpaca')
+
+
+def get_async_market_data_service():
+    return services.get('async_market_data')
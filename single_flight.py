@@ -0,0 +1,92 @@
+import functools
+import threading
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error', 'shared')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.shared = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    still in flight block until it finishes and receive the same result (or
+    the same exception). Nothing is cached once the call completes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._executed = 0
+        self._coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.shared += 1
+                self._coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._executed += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stats(self):
+        """Return how many calls ran and how many piggybacked on an in-flight one"""
+        with self._lock:
+            return {
+                'executed': self._executed,
+                'coalesced': self._coalesced,
+                'in_flight': len(self._calls)
+            }
+
+
+def _freeze(value):
+    """Make call arguments hashable so they can form a single-flight key"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, set):
+        return tuple(sorted(value))
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    # Value objects such as TimeFrame compare by identity; key on their text form
+    return (type(value).__name__, str(value))
+
+
+def coalesced(method):
+    """Decorate a method so concurrent identical calls on one instance share a request.
+
+    The instance must provide a ``_single_flight`` attribute holding a
+    SingleFlight; the method name and arguments form the key.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, _freeze(args), _freeze(kwargs))
+        return self._single_flight.do(key, method, self, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,73 @@
+"""Report where web app startup time goes: module imports, then service construction.
+
+Usage: python startup_timing.py [module] [top_n]
+
+The module (default web_app) is imported in a fresh interpreter with
+``-X importtime``; the slowest imports are listed by cumulative time. Each
+lazily built service from services.py is then constructed and timed,
+followed by the broker connection check.
+"""
+import subprocess
+import sys
+import time
+
+
+def import_times(module):
+    """Return (self_us, cumulative_us, name) for every import made by `module`"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    return rows
+
+
+def report_imports(module, top_n):
+    rows = import_times(module)
+    total = max((cumulative for _, cumulative, name in rows if name == module), default=0)
+    print(f"import {module}: {total / 1000:.1f} ms")
+    # Top-level packages only, so pandas isn't listed again as pandas.core, pandas.core.api, ...
+    packages = {}
+    for _, cumulative, name in rows:
+        package = name.split('.')[0]
+        packages[package] = max(packages.get(package, 0), cumulative)
+    packages.pop(module, None)
+    print(f"{'package':<28}{'cumulative ms':>14}")
+    for package, cumulative in sorted(packages.items(), key=lambda item: -item[1])[:top_n]:
+        print(f"{package:<28}{cumulative / 1000:>14.1f}")
+
+
+def report_services():
+    import logging
+    logging.disable(logging.INFO)
+    from services import services
+
+    print(f"\n{'service':<28}{'init ms':>14}")
+    for name in services.health()['services']:
+        try:
+            services.get(name)
+        except Exception:
+            pass
+        status = services.health()['services'][name]
+        outcome = 'ok' if status['ready'] else f"failed  {status['error']}"
+        print(f"{name:<28}{status['init_seconds'] * 1000:>14.1f}  {outcome}")
+
+    from services import _check_alpaca_connection
+    started = time.perf_counter()
+    try:
+        outcome = 'ok' if _check_alpaca_connection() else 'failed'
+    except Exception as e:
+        outcome = f"failed  {e}"
+    print(f"{'alpaca connection check':<28}{(time.perf_counter() - started) * 1000:>14.1f}  {outcome}")
+
+
+if __name__ == '__main__':
+    module = sys.argv[1] if len(sys.argv) > 1 else 'web_app'
+    top_n = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    report_imports(module, top_n)
+    report_services()
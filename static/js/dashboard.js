@@ -33,6 +33,8 @@ document.addEventListener('DOMContentLoaded', function() {
             return;
         }
         updatePositionsTable(data);
+        // Costs a 304 unless the positions behind the charts changed
+        window.PortfolioCharts.refresh();
     });
 
     // Listen for trades updates
@@ -0,0 +1,137 @@
+// Portfolio chart templates. The server sends only columnar arrays from
+// /api/portfolio/chart-data; the figures are built here. Requests carry the
+// last ETag, so an unchanged portfolio costs a 304 and no redraw.
+window.PortfolioCharts = (function() {
+    let etag = null;
+    let pending = null;
+
+    const config = { responsive: true, displaylogo: false };
+
+    function treemap(data) {
+        const total = data.market_value.reduce((sum, value) => sum + value, 0);
+        return {
+            data: [{
+                type: 'treemap',
+                labels: ['Portfolio'].concat(data.symbols),
+                parents: [''].concat(data.symbols.map(() => 'Portfolio')),
+                values: [total].concat(data.market_value),
+                branchvalues: 'total',
+                marker: {
+                    colors: [0].concat(data.pl_percent),
+                    colorscale: 'RdYlGn',
+                    cmid: 0,
+                    showscale: true
+                },
+                customdata: [[null, null, null, null, null]].concat(data.symbols.map((_, i) => [
+                    data.shares[i], data.entry_price[i], data.current_price[i], data.pl_dollars[i], data.pl_percent[i]
+                ])),
+                hovertemplate: '<b>%{label}</b><br>' +
+                    'Value: $%{value:,.2f}<br>' +
+                    'Shares: %{customdata[0]:.0f}<br>' +
+                    'Entry: $%{customdata[1]:.2f}<br>' +
+                    'Current: $%{customdata[2]:.2f}<br>' +
+                    'P/L: $%{customdata[3]:+,.2f} (%{customdata[4]:+.2f}%)<extra></extra>'
+            }],
+            layout: { title: 'Portfolio Composition and Performance', margin: { t: 40, l: 0, r: 0, b: 0 } }
+        };
+    }
+
+    function allocation(data) {
+        return {
+            data: [{
+                type: 'pie',
+                labels: data.symbols,
+                values: data.market_value,
+                hole: 0.3,
+                textinfo: 'label+percent',
+                hovertemplate: '<b>%{label}</b><br>Value: $%{value:,.2f}<br>Portfolio: %{percent}<extra></extra>'
+            }],
+            layout: { title: 'Portfolio Allocation' }
+        };
+    }
+
+    function winnersLosers(data, count = 5) {
+        const order = data.pl_percent.map((_, i) => i).sort((a, b) => data.pl_percent[b] - data.pl_percent[a]);
+        const bar = (indices, color, name, axis) => ({
+            type: 'bar',
+            x: indices.map(i => data.symbols[i]),
+            y: indices.map(i => data.pl_percent[i]),
+            marker: { color: color },
+            name: name,
+            xaxis: 'x' + axis,
+            yaxis: 'y' + axis
+        });
+        return {
+            data: [
+                bar(order.slice(0, count), 'green', 'Winners', ''),
+                bar(order.slice(-count).reverse(), 'red', 'Losers', '2')
+            ],
+            layout: {
+                title: 'Top Winners and Losers',
+                showlegend: false,
+                xaxis: { domain: [0, 0.45], title: 'Top 5 Winners' },
+                xaxis2: { domain: [0.55, 1], title: 'Top 5 Losers' },
+                yaxis: { title: 'Return (%)' },
+                yaxis2: { title: 'Return (%)', anchor: 'x2' }
+            }
+        };
+    }
+
+    function distribution(data) {
+        return {
+            data: [{
+                type: 'histogram',
+                x: data.pl_percent,
+                name: 'P/L Distribution',
+                nbinsx: 20,
+                marker: { color: 'lightblue' }
+            }],
+            layout: {
+                title: 'Distribution of Position Returns',
+                xaxis: { title: 'Return (%)' },
+                yaxis: { title: 'Number of Positions' },
+                showlegend: false
+            }
+        };
+    }
+
+    const charts = {
+        'treemap-chart': treemap,
+        'allocation-chart': allocation,
+        'winners-losers-chart': winnersLosers,
+        'distribution-chart': distribution
+    };
+
+    function render(data) {
+        Object.entries(charts).forEach(([elementId, template]) => {
+            const element = document.getElementById(elementId);
+            if (!element) return;
+            if (!data.symbols.length) {
+                element.innerHTML = '<p class="text-muted text-center">No positions</p>';
+                return;
+            }
+            const figure = template(data);
+            Plotly.react(element, figure.data, figure.layout, config);
+        });
+    }
+
+    function refresh() {
+        // Coalesce overlapping refreshes (e.g. a burst of position updates)
+        if (pending) return pending;
+        const headers = etag ? { 'If-None-Match': etag } : {};
+        pending = fetch('/api/portfolio/chart-data', { headers: headers, cache: 'no-store' })
+            .then(response => {
+                if (response.status === 304) return;
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                etag = response.headers.get('ETag');
+                return response.json().then(render);
+            })
+            .catch(error => console.error('Error loading portfolio charts:', error))
+            .finally(() => { pending = null; });
+        return pending;
+    }
+
+    document.addEventListener('DOMContentLoaded', refresh);
+
+    return { refresh: refresh };
+})();
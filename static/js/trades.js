@@ -16,32 +16,66 @@ document.addEventListener('DOMContentLoaded', function() {
         }).format(value / 100);
     }
 
-    function updateTrades() {
-        fetch('/api/trades/recent')
+    let latestCursor = null;
+
+    function renderTrade(trade) {
+        const side = String(trade.side).toUpperCase();
+        return `
+            <tr>
+                <td>${trade.symbol}</td>
+                <td class="${side === 'BUY' ? 'text-success' : 'text-danger'}">${side}</td>
+                <td>${trade.qty}</td>
+                <td>${formatCurrency(trade.filled_price)}</td>
+                <td>${trade.pl ? formatCurrency(trade.pl) : '-'}</td>
+                <td>${trade.pl_percent ? formatPercentage(trade.pl_percent) : '-'}</td>
+                <td>${new Date(trade.timestamp).toLocaleString()}</td>
+            </tr>
+        `;
+    }
+
+    function fetchTrades(params) {
+        const query = new URLSearchParams(params).toString();
+        return fetch(query ? `/api/trades/recent?${query}` : '/api/trades/recent')
             .then(response => response.json())
+            .then(data => {
+                if (data.error) throw new Error(data.error);
+                return data;
+            });
+    }
+
+    function fetchTradesSince(since, cursor = null, trades = []) {
+        // Each page holds the newest fills after `since` older than `cursor`; follow
+        // next_cursor until the gap is closed so a burst of fills isn't skipped
+        const params = cursor ? {since, cursor} : {since};
+        return fetchTrades(params).then(data => {
+            trades = trades.concat(data.trades);
+            return data.next_cursor ? fetchTradesSince(since, data.next_cursor, trades) : trades;
+        });
+    }
+
+    function updateTrades() {
+        const tbody = document.getElementById('trades-body');
+        if (!latestCursor) {
+            fetchTrades({})
+                .then(data => {
+                    tbody.innerHTML = data.trades.map(renderTrade).join('');
+                    latestCursor = data.latest_cursor;
+                })
+                .catch(error => console.error('Error fetching trades:', error));
+            return;
+        }
+        // After the first page only fills newer than the latest one seen are transferred
+        fetchTradesSince(latestCursor)
             .then(trades => {
-                const tbody = document.getElementById('trades-body');
-                tbody.innerHTML = '';
-                
-                trades.forEach(trade => {
-                    const row = `
-                        <tr>
-                            <td>${trade.symbol}</td>
-                            <td class="${trade.side === 'BUY' ? 'text-success' : 'text-danger'}">${trade.side}</td>
-                            <td>${trade.quantity}</td>
-                            <td>${formatCurrency(trade.price)}</td>
-                            <td>${trade.pl ? formatCurrency(trade.pl) : '-'}</td>
-                            <td>${trade.pl_percent ? formatPercentage(trade.pl_percent) : '-'}</td>
-                            <td>${new Date(trade.timestamp).toLocaleString()}</td>
-                        </tr>
-                    `;
-                    tbody.insertAdjacentHTML('beforeend', row);
-                });
+                if (!trades.length) return;
+                // Trades arrive newest first; prepend as one block to keep that order
+                tbody.insertAdjacentHTML('afterbegin', trades.map(renderTrade).join(''));
+                latestCursor = trades[0].cursor;
             })
             .catch(error => console.error('Error fetching trades:', error));
     }
 
-    // Update trades immediately and every minute
+    // Load trades immediately and poll for new fills every minute
     updateTrades();
     setInterval(updateTrades, 60000);
 });
@@ -0,0 +1,74 @@
+"""RSI mean-reversion rules shared by the live bot and the backtester.
+
+Every function accepts scalars or NumPy arrays, so TradingBot evaluates
+one symbol per pass with the same code backtest.py runs over whole
+histories.
+"""
+import numpy as np
+import pandas as pd
+
+from config import STRATEGIES
+
+BUY, HOLD, SELL = 1, 0, -1
+
+
+def momentum_params():
+    """RSI period and thresholds from STRATEGIES['momentum']"""
+    params = STRATEGIES['momentum']
+    return params['rsi_period'], params['rsi_oversold'], params['rsi_overbought']
+
+
+def rsi_signal(rsi, oversold=None, overbought=None):
+    """BUY below `oversold`, SELL above `overbought`, otherwise (or without an RSI) HOLD"""
+    _, default_oversold, default_overbought = momentum_params()
+    oversold = default_oversold if oversold is None else oversold
+    overbought = default_overbought if overbought is None else overbought
+    rsi = np.asarray(np.nan if rsi is None else rsi, dtype=np.float64)
+    signal = np.where(rsi < oversold, BUY, np.where(rsi > overbought, SELL, HOLD))
+    return int(signal) if signal.ndim == 0 else signal
+
+
+def order_quantity(max_position_size, price):
+    """Whole shares worth at most `max_position_size` at `price`"""
+    quantity = np.floor(max_position_size / np.asarray(price, dtype=np.float64))
+    return int(quantity) if quantity.ndim == 0 else quantity
+
+
+def decide(signal, position_qty, max_position_size, price):
+    """Turn a signal into an order: buy a full position only when flat, sell everything only when holding.
+
+    Returns (action, quantity), or None when there is nothing to do.
+    """
+    if signal == BUY and position_qty <= 0:
+        quantity = order_quantity(max_position_size, price)
+        return ('BUY', quantity) if quantity > 0 else None
+    if signal == SELL and position_qty > 0:
+        return 'SELL', position_qty
+    return None
+
+
+def wilder_rsi(closes, period=None):
+    """RSI of a close series with Wilder's smoothing; NaN until `period` changes are seen.
+
+    Matches indicators.WilderRSI value for value: the first average is the
+    plain mean of the first `period` gains/losses, after which each new
+    change is blended in with weight 1/period.
+    """
+    period = period or momentum_params()[0]
+    closes = np.asarray(closes, dtype=np.float64)
+    rsi = np.full(len(closes), np.nan)
+    if len(closes) <= period:
+        return rsi
+    change = np.diff(closes)
+    gain, loss = np.maximum(change, 0.0), np.maximum(-change, 0.0)
+
+    def smooth(values):
+        seeded = np.concatenate(([values[:period].mean()], values[period:]))
+        return pd.Series(seeded).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+
+    avg_gain, avg_loss = smooth(gain), smooth(loss)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = 100 - 100 / (1 + avg_gain / avg_loss)
+    values = np.where(avg_loss == 0, np.where(avg_gain > 0, 100.0, 50.0), values)
+    rsi[period:] = values
+    return rsi
@@ -0,0 +1,262 @@
+import os
+import threading
+import time
+import unittest
+from datetime import timedelta
+from types import SimpleNamespace
+
+from alpaca.common.exceptions import APIError
+
+
+def make_account():
+    return SimpleNamespace(id='acct', cash='1000', portfolio_value='5000', buying_power='2000',
+                           initial_margin='0', maintenance_margin='0', daytrade_count=0,
+                           last_equity='4900', equity='5000', status='ACTIVE')
+
+
+def make_position(symbol, qty=10):
+    return SimpleNamespace(symbol=symbol, qty=str(qty), avg_entry_price='100', current_price='110',
+                           market_value=str(110 * qty), unrealized_pl=str(10 * qty), unrealized_plpc='0.1')
+
+
+def api_error(status_code, message):
+    return APIError(f'{{"code":40010001,"message":"{message}"}}',
+                    SimpleNamespace(response=SimpleNamespace(status_code=status_code), request=None))
+
+
+class FakeTradingClient:
+    """Counts account/position requests; each fetch can be slowed down to overlap threads"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.account_calls = 0
+        self.position_calls = 0
+        self.positions = [make_position('AAPL'), make_position('MSFT', 5)]
+        self.orders = []
+
+    def get_account(self):
+        self.account_calls += 1
+        time.sleep(self.delay)
+        return make_account()
+
+    def get_all_positions(self):
+        self.position_calls += 1
+        return list(self.positions)
+
+    def submit_order(self, request):
+        time.sleep(self.delay)
+        if request.client_order_id and any(o.client_order_id == request.client_order_id for o in self.orders):
+            raise api_error(422, 'client_order_id must be unique')
+        self.orders.append(request)
+        return self.get_order_by_client_id(request.client_order_id, index=len(self.orders))
+
+    def get_order_by_client_id(self, client_order_id, index=None):
+        index = index or next((i + 1 for i, o in enumerate(self.orders) if o.client_order_id == client_order_id), None)
+        if index is None:
+            raise api_error(404, 'order not found')
+        return SimpleNamespace(id=f'order-{index}', symbol=self.orders[index - 1].symbol, status='accepted',
+                               updated_at=None, filled_at=None)
+
+
+class TestAccountSnapshot(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault('ALPACA_API_KEY', 'test-key')
+        os.environ.setdefault('ALPACA_API_SECRET', 'test-secret')
+        from alpaca_client import AlpacaClient
+        self.client = AlpacaClient()
+        self.fake = FakeTradingClient()
+        self.client.trading_client = self.fake
+
+    def test_portfolio_methods_share_one_snapshot(self):
+        self.client.get_positions()
+        self.client.get_account_info()
+        analysis = self.client.get_portfolio_analysis()
+        summary = self.client.get_portfolio_summary()
+        self.assertEqual((self.fake.account_calls, self.fake.position_calls), (1, 1))
+        self.assertEqual(analysis['positions_count'], 2)
+        self.assertEqual(summary['positions_count'], 2)
+        self.assertAlmostEqual(summary['daily_pl'], 100.0)
+
+    def test_concurrent_readers_coalesce_into_one_fetch(self):
+        self.fake.delay = 0.05
+        threads = [threading.Thread(target=self.client.get_portfolio_summary) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(self.fake.account_calls, 1)
+
+    def test_order_submission_invalidates_snapshot(self):
+        self.assertEqual(len(self.client.get_positions()), 2)
+        self.fake.positions.append(make_position('NVDA'))
+        self.assertEqual(len(self.client.get_positions()), 2)  # Still cached
+        self.client.place_market_order('NVDA', 10, 'buy')
+        self.assertEqual(len(self.client.get_positions()), 3)
+        self.assertEqual(self.fake.account_calls, 2)
+
+    def test_recent_trades_served_from_order_store(self):
+        from order_store import OrderStore
+        from test_order_store import FakeOrdersClient, FakeStream, make_order
+        orders_client = FakeOrdersClient([make_order(i) for i in range(3)])
+        self.client.order_store = OrderStore(orders_client, FakeStream())
+        first = self.client.get_recent_trades(limit=2)
+        second = self.client.get_recent_trades(limit=2)
+        self.assertEqual([t['id'] for t in first], ['order-2', 'order-1'])
+        self.assertEqual(first, second)
+        self.assertEqual(len(orders_client.requests), 2)  # Backfill only
+
+    def test_recent_trades_cursor_pages_and_since(self):
+        from order_store import OrderStore
+        from test_order_store import FakeOrdersClient, FakeStream, make_order
+        orders_client = FakeOrdersClient([make_order(i) for i in range(5)])
+        self.client.order_store = OrderStore(orders_client, FakeStream())
+        first = self.client.get_recent_trades(limit=2)
+        second = self.client.get_recent_trades(limit=2, cursor=first[-1]['cursor'])
+        self.assertEqual([t['id'] for t in second], ['order-2', 'order-1'])
+        self.assertEqual(self.client.get_recent_trades(since=first[0]['cursor']), [])
+        self.client.order_store.upsert(make_order(6))
+        newer = self.client.get_recent_trades(since=first[0]['cursor'])
+        self.assertEqual([t['id'] for t in newer], ['order-6'])
+        self.assertEqual(len(orders_client.requests), 2)  # Backfill only
+
+    def test_fills_since_a_cursor_page_with_cursor(self):
+        from order_store import OrderStore
+        from test_order_store import FakeOrdersClient, FakeStream, make_order
+        self.client.order_store = OrderStore(FakeOrdersClient([make_order(0)]), FakeStream())
+        latest = self.client.get_recent_trades(limit=1)[0]['cursor']
+        for i in range(1, 6):
+            self.client.order_store.upsert(make_order(i))
+        # How trades.js catches up after more than a page of fills between polls
+        pages = [self.client.get_recent_trades(limit=2, since=latest)]
+        while len(pages[-1]) == 2:
+            pages.append(self.client.get_recent_trades(limit=2, since=latest, cursor=pages[-1][-1]['cursor']))
+        self.assertEqual([t['id'] for page in pages for t in page], [f'order-{i}' for i in range(5, 0, -1)])
+
+    def test_recent_trades_are_ordered_by_fill_time(self):
+        from order_store import OrderStore
+        from test_order_store import FakeOrdersClient, FakeStream, make_order
+        orders = [make_order(i) for i in range(3)]
+        orders[0].filled_at = orders[2].filled_at + timedelta(minutes=5)  # Resting order filled last
+        self.client.order_store = OrderStore(FakeOrdersClient(orders), FakeStream())
+        trades = self.client.get_recent_trades(limit=3)
+        self.assertEqual([t['id'] for t in trades], ['order-0', 'order-2', 'order-1'])
+        self.assertEqual(self.client.get_recent_trades(since=trades[1]['cursor'])[0]['id'], 'order-0')
+
+    def test_short_store_result_only_queries_before_the_horizon(self):
+        from order_store import OrderStore
+        from test_order_store import FakeOrdersClient, FakeStream, make_order
+        orders_client = FakeOrdersClient([make_order(i) for i in range(3)])
+        self.client.trading_client = orders_client
+        self.client.order_store = OrderStore(orders_client, FakeStream())
+        trades = self.client.get_recent_trades(limit=10)
+        self.assertEqual([t['id'] for t in trades], ['order-2', 'order-1', 'order-0'])
+        self.assertEqual(len(orders_client.requests), 2)  # A short unbounded page is served from the store
+        self.client.get_recent_trades(limit=10, since=trades[0]['cursor'])
+        self.assertEqual(len(orders_client.requests), 2)
+        self.client.get_recent_trades(limit=10, cursor=trades[-1]['cursor'])
+        self.assertEqual(len(orders_client.requests), 3)  # Paging past the store's oldest fill asks Alpaca
+        self.assertLessEqual(orders_client.requests[-1].until, self.client.order_store.horizon + timedelta(microseconds=2))
+        self.client.get_recent_trades(limit=10, after=self.client.order_store.horizon)
+        self.assertEqual(len(orders_client.requests), 3)  # Inside the horizon the store is authoritative
+
+    def test_recent_trades_beyond_store_horizon_are_queried(self):
+        from order_store import OrderStore
+        from test_order_store import T0, FakeOrdersClient, FakeStream, make_order
+        orders = [make_order(i, symbol='MSFT' if i % 2 else 'AAPL') for i in range(6)]
+        orders_client = FakeOrdersClient(orders)
+        self.client.trading_client = orders_client
+        self.client.order_store = OrderStore(orders_client, FakeStream(), backfill_days=0, order_lifetime_days=0)
+        trades = self.client.get_recent_trades(limit=10, symbols=['msft'], after=T0 - timedelta(days=1))
+        self.assertEqual([t['id'] for t in trades], ['order-5', 'order-3', 'order-1'])
+        self.assertEqual(orders_client.requests[-1].symbols, ['MSFT'])
+
+    def test_bulk_orders_submitted_concurrently(self):
+        self.fake.delay = 0.1
+        orders = [{'symbol': f'SYM{i}', 'qty': i + 1, 'side': 'buy'} for i in range(10)]
+        batch = self.client.submit_bulk_orders(orders, batch_id='b1', max_workers=10)
+        self.assertEqual(batch['submitted'], 10)
+        self.assertLess(batch['elapsed_ms'], 500)  # Not 10 x 100ms
+        self.assertEqual([r['symbol'] for r in batch['results']], [o['symbol'] for o in orders])
+        self.assertEqual(batch['results'][3]['client_order_id'], 'bulk-b1-3')
+        self.assertTrue(all(r['latency_ms'] >= 100 for r in batch['results']))
+
+    def test_bulk_resubmission_and_retries_are_idempotent(self):
+        orders = [{'symbol': 'AAPL', 'qty': 1, 'side': 'buy'}, {'symbol': 'MSFT', 'qty': 2, 'side': 'sell'}]
+        first = self.client.submit_bulk_orders(orders, batch_id='b2')
+        # A timeout after the order reached the broker is retried under the same id
+        submit_order = self.fake.submit_order
+
+        def lost_response(request):
+            submit_order(request)
+            raise ConnectionError('read timed out')
+        self.fake.submit_order = lost_response
+        third = self.client.submit_bulk_orders([{'symbol': 'NVDA', 'qty': 3}], batch_id='b3')
+        self.fake.submit_order = submit_order
+        second = self.client.submit_bulk_orders(orders, batch_id='b2')
+        self.assertEqual(len(self.fake.orders), 3)
+        self.assertEqual([r['order_id'] for r in second['results']], [r['order_id'] for r in first['results']])
+        self.assertEqual(third['results'][0]['attempts'], 2)
+        self.assertTrue(third['results'][0]['success'])
+
+    def test_only_transient_submission_errors_are_retried(self):
+        errors = [api_error(429, 'too many requests'), api_error(503, 'unavailable')]
+        submit_order = self.fake.submit_order
+
+        def flaky(request):
+            if errors:
+                raise errors.pop(0)
+            return submit_order(request)
+        self.fake.submit_order = flaky
+        result = self.client.submit_bulk_orders([{'symbol': 'AAPL', 'qty': 1}], batch_id='b4')['results'][0]
+        self.assertTrue(result['success'])
+        self.assertEqual(result['attempts'], 3)
+
+        for error in (api_error(422, 'insufficient buying power'), api_error(403, 'forbidden'), ValueError('bad qty')):
+            def rejected(request, error=error):
+                raise error
+            self.fake.submit_order = rejected
+            result = self.client.submit_bulk_orders([{'symbol': 'MSFT', 'qty': 1}], batch_id='b5')['results'][0]
+            self.assertFalse(result['success'])
+            self.assertEqual(result['attempts'], 1)
+            self.assertIn(error.args[0] if isinstance(error, ValueError) else 'message', result['error'])
+
+    def test_charts_rebuilt_only_when_positions_change(self):
+        import json
+        build = self.client.create_portfolio_visualizations
+        builds = []
+
+        def counting_build(**kwargs):
+            builds.append(1)
+            return build(**kwargs)
+        self.client.create_portfolio_visualizations = counting_build
+        version, body = self.client.get_portfolio_charts()
+        self.assertEqual(set(json.loads(body)), {'treemap', 'distribution', 'winners_losers', 'allocation'})
+        self.client.invalidate_account_snapshot()  # Same positions refetched
+        self.assertEqual(self.client.get_portfolio_charts(), (version, body))
+        self.assertEqual(len(builds), 1)
+        self.fake.positions.append(make_position('NVDA'))
+        self.client.invalidate_account_snapshot()
+        self.assertNotEqual(self.client.get_portfolio_charts()[0], version)
+        self.assertEqual(len(builds), 2)
+
+    def test_chart_data_is_columnar_and_versioned_with_charts(self):
+        import json
+        version, body = self.client.get_portfolio_chart_data()
+        data = json.loads(body)
+        self.assertEqual(len(data['symbols']), len(self.fake.positions))
+        self.assertEqual(len(data['pl_percent']), len(data['symbols']))
+        self.assertEqual(self.client.get_portfolio_charts()[0], version)
+        self.assertLess(len(body), len(self.client.get_portfolio_charts()[1]) / 10)
+
+    def test_fill_update_invalidates_snapshot(self):
+        self.client.get_positions()
+        self.client.handle_order_update('new')
+        self.client.get_positions()
+        self.assertEqual(self.fake.account_calls, 1)
+        self.client.handle_order_update('fill')
+        self.client.get_positions()
+        self.assertEqual(self.fake.account_calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
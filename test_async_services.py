@@ -0,0 +1,172 @@
+import asyncio
+import json
+import unittest
+import uuid
+from types import SimpleNamespace
+
+import httpx
+
+from async_services import AsyncAlpacaClient, AsyncAlpacaSession, AsyncMarketDataService
+from rate_limiter import RateLimiter
+
+ACCOUNT = {
+    'id': str(uuid.uuid4()), 'account_number': 'PA1', 'status': 'ACTIVE', 'cash': '1000',
+    'portfolio_value': '5000', 'buying_power': '2000', 'equity': '5000', 'last_equity': '4900',
+    'initial_margin': '0', 'maintenance_margin': '0', 'daytrade_count': 0
+}
+
+
+def make_position(symbol, qty=10):
+    return {
+        'asset_id': str(uuid.uuid4()), 'symbol': symbol, 'exchange': 'NASDAQ', 'asset_class': 'us_equity',
+        'avg_entry_price': '100', 'qty': str(qty), 'side': 'long', 'cost_basis': str(100 * qty),
+        'current_price': '110', 'market_value': str(110 * qty), 'unrealized_pl': str(10 * qty),
+        'unrealized_plpc': '0.1'
+    }
+
+
+def make_bars(closes):
+    """One hourly bar per session: 15:00 ET on 2024-07-01, then 10:00 ET on each following day"""
+    times = ['2024-07-01T19:00:00Z'] + [f'2024-07-{2 + i:02d}T14:00:00Z' for i in range(len(closes) - 1)]
+    return [{'t': t, 'o': c, 'h': c, 'l': c, 'c': c, 'v': 100 * (i + 1), 'n': 1, 'vw': c}
+            for i, (t, c) in enumerate(zip(times, closes))]
+
+
+def make_order(client_order_id, symbol='AAPL'):
+    return {
+        'id': str(uuid.uuid4()), 'client_order_id': client_order_id, 'created_at': '2024-07-01T14:00:00Z',
+        'updated_at': '2024-07-01T14:00:00Z', 'submitted_at': '2024-07-01T14:00:00Z',
+        'asset_id': str(uuid.uuid4()), 'symbol': symbol, 'asset_class': 'us_equity', 'qty': '5',
+        'filled_qty': '0', 'order_class': 'simple', 'order_type': 'market', 'type': 'market', 'side': 'buy',
+        'time_in_force': 'day', 'status': 'accepted', 'extended_hours': False
+    }
+
+
+class FakeOrderStore:
+    def __init__(self):
+        self.orders = []
+        self.listeners = []
+
+    def upsert(self, order):
+        self.orders.append(order)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+
+class FakeAlpaca:
+    """httpx transport answering the handful of Alpaca endpoints the facade uses"""
+
+    def __init__(self):
+        self.requests = []
+        self.failures = 0  # Number of upcoming requests answered with a 503
+        self.orders = {}  # client_order_id -> order JSON
+
+    def __call__(self, request):
+        self.requests.append((request.method, request.url.path))
+        if self.failures:
+            self.failures -= 1
+            return httpx.Response(503, json={'message': 'unavailable'})
+        if request.url.path == '/v2/account':
+            return httpx.Response(200, json=ACCOUNT)
+        if request.url.path == '/v2/positions':
+            return httpx.Response(200, json=[make_position('AAPL'), make_position('MSFT', 5)])
+        if request.url.path == '/v2/orders':
+            body = json.loads(request.content)
+            if body['symbol'] == 'BAD':
+                return httpx.Response(422, json={'code': 40010001, 'message': 'qty must be > 0'})
+            if body['client_order_id'] in self.orders:
+                return httpx.Response(422, json={'code': 40010001, 'message': 'client_order_id must be unique'})
+            order = self.orders[body['client_order_id']] = make_order(body['client_order_id'], body['symbol'])
+            return httpx.Response(200, json=order)
+        if request.url.path == '/v2/orders:by_client_order_id':
+            order = self.orders.get(request.url.params['client_order_id'])
+            return httpx.Response(200, json=order) if order else httpx.Response(404, json={'message': 'not found'})
+        if request.url.path == '/v2/stocks/bars':
+            symbols = request.url.params['symbols'].split(',')
+            if 'page_token' not in request.url.params:
+                return httpx.Response(200, json={'bars': {symbols[0]: make_bars([100, 102])},
+                                                 'next_page_token': 'next'})
+            return httpx.Response(200, json={'bars': {s: make_bars([50, 49]) for s in symbols[1:]},
+                                             'next_page_token': None})
+        return httpx.Response(404, json={'message': 'not found'})
+
+
+class TestAsyncServices(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeAlpaca()
+        self.session = AsyncAlpacaSession(
+            'key', 'secret', limiter=RateLimiter(requests_per_minute=6000, burst=100),
+            transport=httpx.MockTransport(self.fake), backoff=0.01
+        )
+
+    def test_concurrent_summaries_share_one_snapshot(self):
+        client = AsyncAlpacaClient(self.session)
+
+        async def run():
+            return await asyncio.gather(*(client.get_portfolio_summary() for _ in range(10)))
+        summaries = asyncio.run(run())
+        self.assertEqual(len(self.fake.requests), 2)  # One account and one positions request
+        self.assertTrue(all(s['positions_count'] == 2 for s in summaries))
+        self.assertAlmostEqual(summaries[0]['daily_pl'], 100.0)
+
+    def test_server_errors_are_retried(self):
+        self.fake.failures = 2
+        positions = asyncio.run(AsyncAlpacaClient(self.session).get_positions())
+        self.assertEqual([p['symbol'] for p in positions], ['AAPL', 'MSFT'])
+        self.assertEqual(len(self.fake.requests), 4)
+
+    def test_market_snapshot_follows_pages(self):
+        service = AsyncMarketDataService(self.session)
+        service.feed = None
+        snapshot = asyncio.run(service.get_market_snapshot(['aapl', 'msft']))
+        self.assertAlmostEqual(snapshot['AAPL']['change'], 2.0)
+        self.assertAlmostEqual(snapshot['MSFT']['price'], 49.0)
+        # Cached afterwards
+        asyncio.run(service.get_market_snapshot(['AAPL', 'MSFT']))
+        self.assertEqual(len(self.fake.requests), 2)
+
+    def make_client(self, **attributes):
+        self.order_store = FakeOrderStore()
+        return AsyncAlpacaClient(self.session, client=SimpleNamespace(order_store=self.order_store, **attributes))
+
+    def test_duplicate_submission_returns_the_existing_order(self):
+        client = self.make_client()
+
+        async def run():
+            first = await client.place_market_order('AAPL', 5, client_order_id='c1')
+            return first, await client.place_market_order('AAPL', 5, client_order_id='c1')
+        first, second = asyncio.run(run())
+        self.assertEqual(second.id, first.id)
+        self.assertEqual([order.id for order in self.order_store.orders], [first.id, first.id])
+        # A rejection without an existing order is not mistaken for a duplicate
+        self.assertIsNone(asyncio.run(client.place_market_order('BAD', 5, client_order_id='c2')))
+        self.assertEqual(len(self.order_store.orders), 2)
+
+    def test_fill_update_invalidates_snapshot(self):
+        client = self.make_client()
+        asyncio.run(client.get_positions())
+        self.assertIsNotNone(client._snapshot)
+        for listener in self.order_store.listeners:
+            listener('new', None)
+        self.assertIsNotNone(client._snapshot)
+        for listener in self.order_store.listeners:
+            listener('fill', None)
+        self.assertIsNone(client._snapshot)
+
+    def test_recent_trades_come_from_the_sync_order_store_path(self):
+        calls = []
+        client = self.make_client(get_recent_trades=lambda *args: calls.append(args) or [{'id': 'order-1'}])
+        trades = asyncio.run(client.get_recent_trades(10, symbols=['AAPL']))
+        self.assertEqual(trades, [{'id': 'order-1'}])
+        self.assertEqual(calls, [(10, 'filled', ['AAPL'], None, None, None, None)])
+        self.assertEqual(self.fake.requests, [])
+
+    def test_market_data_shares_the_sync_service_cache(self):
+        sync_service = SimpleNamespace(cache=object())
+        service = AsyncMarketDataService(self.session, service=sync_service)
+        self.assertIs(service.cache, sync_service.cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
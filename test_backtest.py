@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from alpaca.data.timeframe import TimeFrame
+
+from backtest import CommissionModel, FillModel, load_bars, run_backtest, simulate_symbol
+from bar_frames import BAR_DTYPE
+from bar_store import BarStore
+
+MINUTE_NS = 60_000_000_000
+START_NS = 1_704_205_800_000_000_000  # 2024-01-02 14:30 UTC
+
+
+def make_records(closes, start=START_NS):
+    closes = np.asarray(closes, dtype=float)
+    records = np.zeros(len(closes), dtype=BAR_DTYPE)
+    records['timestamp'] = start + np.arange(len(closes)) * MINUTE_NS
+    records['open'] = np.concatenate(([closes[0]], closes[:-1]))
+    records['high'] = records['low'] = records['close'] = closes
+    records['volume'] = 100
+    return records
+
+
+# Falls 20 bars (RSI 0, oversold), then rises 20 bars (RSI 100, overbought), then flat
+SWING = [100 - i for i in range(20)] + [81 + i for i in range(20)] + [100] * 10
+
+
+class TestBacktest(unittest.TestCase):
+    def test_one_round_trip_through_the_rsi_rules(self):
+        records = make_records(SWING)
+        pnl, trades, commissions = simulate_symbol(
+            records['timestamp'], records['open'], records['close'], 1000,
+            FillModel('next_open', slippage_bps=0), CommissionModel(per_share=0.01, minimum=1.0))
+        self.assertEqual(len(trades), 1)
+        trade = trades[0]
+        # Oversold from bar 14 (first RSI); bought at bar 15's open, the close of bar 14
+        self.assertEqual(trade['entry_price'], 86.0)
+        self.assertEqual(trade['qty'], 11)
+        # Overbought once RSI recovers above 70 on the way up; sold at the next open
+        self.assertFalse(trade['open'])
+        self.assertGreater(trade['exit_price'], trade['entry_price'])
+        self.assertEqual(commissions, 2.0)
+        self.assertAlmostEqual(trade['pnl'], 11 * (trade['exit_price'] - 86.0) - 2.0)
+        self.assertAlmostEqual(pnl[-1], trade['pnl'])
+
+    def test_portfolio_results_from_stored_bars(self):
+        with tempfile.TemporaryDirectory() as root:
+            store = BarStore(root)
+            for symbol, closes in (('AAA', SWING), ('BBB', [50.0] * 60)):
+                records = make_records(closes)
+                store.write(symbol, '1Min', records, int(records['timestamp'][0]), int(records['timestamp'][-1]))
+            bars = load_bars(['aaa', 'bbb', 'ccc'], '1Min', store=store)
+            self.assertEqual(sorted(bars), ['AAA', 'BBB'])
+            result = run_backtest(bars, max_position_size=1000, initial_cash=10_000,
+                                  fill_model=FillModel(slippage_bps=0))
+
+        self.assertEqual(result['trade_count'], 1)
+        self.assertEqual(result['symbol_pnl']['BBB'], 0.0)
+        self.assertAlmostEqual(result['total_pnl'], result['trades'][0]['pnl'])
+        self.assertEqual(len(result['equity']), 60)
+        self.assertLess(result['max_drawdown_percent'], 0)
+        self.assertEqual(result['win_rate'], 100.0)
+
+    def test_default_timeframe_reads_the_live_bot_daily_bars(self):
+        with tempfile.TemporaryDirectory() as root:
+            store = BarStore(root)
+            records = make_records(SWING)
+            # Stored under the same key the live indicator sync writes
+            store.write('AAA', TimeFrame.Day, records, int(records['timestamp'][0]), int(records['timestamp'][-1]))
+            self.assertEqual(len(load_bars(['AAA'], store=store)['AAA']), len(SWING))
+
+
+if __name__ == '__main__':
+    unittest.main()
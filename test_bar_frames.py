@@ -0,0 +1,40 @@
+import unittest
+
+import numpy as np
+from alpaca.data.models import BarSet
+
+from bar_frames import bar_columns, bars_to_frame, bars_to_records, barset_to_frame
+from bench_bar_frames import make_raw_payload
+
+
+class TestBarFrames(unittest.TestCase):
+    def setUp(self):
+        self.payload = make_raw_payload(300, symbols=('AAPL', 'MSFT', 'SPY'))
+
+    def test_raw_and_model_bars_convert_identically(self):
+        raw = bar_columns(self.payload['AAPL'])
+        parsed = bar_columns(BarSet(self.payload).data['AAPL'])
+        for name in raw:
+            np.testing.assert_array_equal(raw[name], parsed[name])
+
+    def test_frame_is_indexed_by_utc_timestamp(self):
+        df = bars_to_frame(self.payload['AAPL'])
+        self.assertEqual(list(df.columns), ['open', 'high', 'low', 'close', 'volume'])
+        self.assertEqual(str(df.index.tz), 'UTC')
+        self.assertEqual(df.index[0].isoformat(), '2024-01-02T14:30:00+00:00')
+        self.assertEqual(df['close'].iloc[-1], self.payload['AAPL'][-1]['c'])
+
+    def test_multi_symbol_frame_uses_symbol_timestamp_index(self):
+        df = barset_to_frame(self.payload)
+        self.assertEqual(df.index.names, ['symbol', 'timestamp'])
+        self.assertEqual(len(df), 300)
+        self.assertEqual(df.loc['MSFT']['close'].iloc[0], self.payload['MSFT'][0]['c'])
+
+    def test_empty_inputs(self):
+        self.assertTrue(bars_to_frame([]).empty)
+        self.assertTrue(barset_to_frame({}).empty)
+        self.assertEqual(len(bars_to_records([])), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+
+from alpaca.data.timeframe import TimeFrame
+from bar_frames import BAR_DTYPE
+from bar_store import BarStore
+
+
+def make_bar(ts, close):
+    return SimpleNamespace(timestamp=ts, open=close, high=close + 1, low=close - 1,
+                           close=close, volume=100.0)
+
+
+class FakeDataClient:
+    """Serves bars from an in-memory series and records requested windows"""
+
+    def __init__(self, bars):
+        self.bars = bars
+        self.requests = []
+
+    def get_stock_bars(self, request):
+        start = request.start.replace(tzinfo=timezone.utc)
+        end = request.end.replace(tzinfo=timezone.utc)
+        self.requests.append((start, end))
+        symbols = request.symbol_or_symbols
+        symbols = [symbols] if isinstance(symbols, str) else symbols
+        data = {symbol: [b for b in self.bars if start <= b.timestamp <= end] for symbol in symbols}
+        return SimpleNamespace(data=data)
+
+
+class TestBarStore(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = BarStore(self.root)
+        self.t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.bars = [make_bar(self.t0 + timedelta(days=i), 100.0 + i) for i in range(30)]
+        self.client = FakeDataClient(self.bars)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_first_sync_fetches_full_window(self):
+        df = self.store.sync(self.client, 'AAPL', TimeFrame.Day, self.t0, self.t0 + timedelta(days=9))
+        self.assertEqual(len(df), 10)
+        self.assertEqual(df['close'].iloc[-1], 109.0)
+        self.assertEqual(len(self.client.requests), 1)
+
+    def test_second_sync_only_fetches_tail(self):
+        self.store.sync(self.client, 'AAPL', TimeFrame.Day, self.t0, self.t0 + timedelta(days=9))
+        df = self.store.sync(self.client, 'AAPL', TimeFrame.Day, self.t0, self.t0 + timedelta(days=14))
+        self.assertEqual(len(df), 15)
+        tail_start, tail_end = self.client.requests[-1]
+        self.assertEqual(tail_start, self.t0 + timedelta(days=9))
+        self.assertEqual(tail_end, self.t0 + timedelta(days=14))
+
+    def test_earlier_window_fetches_head(self):
+        self.store.sync(self.client, 'AAPL', TimeFrame.Day, self.t0 + timedelta(days=10), self.t0 + timedelta(days=19))
+        df = self.store.sync(self.client, 'AAPL', TimeFrame.Day, self.t0 + timedelta(days=5), self.t0 + timedelta(days=19))
+        self.assertEqual(len(df), 15)
+        self.assertEqual(self.client.requests[1], (self.t0 + timedelta(days=5), self.t0 + timedelta(days=10)))
+
+    def test_refetched_bars_replace_stored_values(self):
+        self.store.sync(self.client, 'AAPL', TimeFrame.Day, self.t0, self.t0 + timedelta(days=4))
+        self.bars[4].close = 999.0
+        df = self.store.sync(self.client, 'AAPL', TimeFrame.Day, self.t0, self.t0 + timedelta(days=4))
+        self.assertEqual(len(df), 5)
+        self.assertEqual(df['close'].iloc[-1], 999.0)
+
+    def test_store_survives_new_instance(self):
+        self.store.sync(self.client, 'AAPL', TimeFrame.Day, self.t0, self.t0 + timedelta(days=9))
+        reopened = BarStore(self.root)
+        self.assertEqual(len(reopened.read('AAPL', TimeFrame.Day)), 10)
+        self.assertEqual(reopened.last_timestamp('AAPL', TimeFrame.Day), self.t0 + timedelta(days=9))
+
+    def test_tail_sync_appends_in_place(self):
+        self.store.sync(self.client, 'AAPL', TimeFrame.Day, self.t0, self.t0 + timedelta(days=9))
+        data_path, _ = self.store._paths('AAPL', TimeFrame.Day)
+        inode = os.stat(data_path).st_ino
+        self.bars[9].close = 555.0
+        df = self.store.sync(self.client, 'AAPL', TimeFrame.Day, self.t0, self.t0 + timedelta(days=14))
+        self.assertEqual(os.stat(data_path).st_ino, inode)  # Not rewritten through a temp file
+        self.assertEqual(len(df), 15)
+        self.assertEqual(df['close'].iloc[9], 555.0)
+        self.assertEqual(list(np.load(data_path)['close']), list(df['close']))
+
+    def test_reads_while_appending_see_whole_records(self):
+        def records(*timestamps):
+            rows = np.zeros(len(timestamps), dtype=BAR_DTYPE)
+            rows['timestamp'], rows['close'] = timestamps, timestamps
+            return rows
+
+        self.store.write('AAPL', TimeFrame.Minute, records(0), 0, 0)
+        errors = []
+
+        def append():
+            try:
+                for i in range(1, 1000):
+                    # Tail syncs refetch the newest stored bar along with the new one
+                    self.store.write('AAPL', TimeFrame.Minute, records(i - 1, i), i - 1, i)
+            except Exception as e:
+                errors.append(e)
+
+        writer = threading.Thread(target=append)
+        writer.start()
+        seen = 0
+        while writer.is_alive():
+            closes = self.store.read_records('AAPL', TimeFrame.Minute)['close']
+            self.assertGreaterEqual(len(closes), seen)
+            np.testing.assert_array_equal(closes, np.arange(len(closes)))
+            seen = len(closes)
+        writer.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.store.read('AAPL', TimeFrame.Minute)), 1000)
+
+    def test_naive_end_is_taken_as_utc(self):
+        df = self.store.sync(self.client, 'AAPL', TimeFrame.Day, self.t0.replace(tzinfo=None),
+                             (self.t0 + timedelta(days=4)).replace(tzinfo=None))
+        self.assertEqual(len(df), 5)
+        self.assertEqual(self.client.requests[0], (self.t0, self.t0 + timedelta(days=4)))
+
+    def test_reads_version_2_headers(self):
+        self.store.sync(self.client, 'AAPL', TimeFrame.Day, self.t0, self.t0 + timedelta(days=9))
+        data_path, _ = self.store._paths('AAPL', TimeFrame.Day)
+        records = np.load(data_path)
+        with open(data_path, 'wb') as f:
+            np.lib.format.write_array(f, records, version=(2, 0))
+        self.assertEqual(len(self.store.read('AAPL', TimeFrame.Day)), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from bot_scheduler import BotScheduler
+
+
+def in_thread(target):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(target()), daemon=True)
+    thread.start()
+    return thread, results
+
+
+class TestBotScheduler(unittest.TestCase):
+    def make_scheduler(self, **kwargs):
+        options = dict(wake_on=['bar', 'quote', 'fill'], coalesce_window=0.05, min_interval=0, heartbeat=30)
+        options.update(kwargs)
+        return BotScheduler(**options)
+
+    def test_first_tick_runs_at_open_then_waits_for_events(self):
+        scheduler = self.make_scheduler()
+        self.assertEqual(scheduler.next_tick(), {'open': set()})
+        thread, results = in_thread(scheduler.next_tick)
+        thread.join(0.2)
+        self.assertTrue(thread.is_alive())  # Nothing happened, so no pass
+        scheduler.on_bar('SPY', {})
+        thread.join(1)
+        self.assertEqual(results, [{'bar': {'SPY'}}])
+
+    def test_burst_is_coalesced_into_one_tick(self):
+        scheduler = self.make_scheduler()
+        scheduler.next_tick()
+        for symbol in ('SPY', 'AAPL', 'MSFT'):
+            scheduler.on_bar(symbol, {})
+        scheduler.on_order_update('fill', SimpleNamespace(symbol='AAPL'))
+        scheduler.on_order_update('new', SimpleNamespace(symbol='NVDA'))
+        self.assertEqual(scheduler.next_tick(), {'bar': {'SPY', 'AAPL', 'MSFT'}, 'fill': {'AAPL'}})
+
+    def test_min_interval_throttles_quote_wakeups(self):
+        scheduler = self.make_scheduler(min_interval=0.2)
+        scheduler.next_tick()
+        started = time.monotonic()
+        scheduler.on_quote('SPY', {})
+        self.assertEqual(scheduler.next_tick(), {'quote': {'SPY'}})
+        self.assertGreaterEqual(time.monotonic() - started, 0.19)
+
+    def test_events_not_listed_in_wake_on_are_ignored(self):
+        scheduler = self.make_scheduler(wake_on=['fill'], heartbeat=0.1)
+        scheduler.next_tick()
+        scheduler.on_quote('SPY', {})
+        self.assertEqual(scheduler.next_tick(), {'heartbeat': set()})
+
+    def test_sleeps_while_closed_and_stop_wakes_promptly(self):
+        is_open = threading.Event()
+        calls = []
+
+        def next_open():
+            calls.append(1)
+            return datetime.now(timezone.utc) + timedelta(hours=10)
+        scheduler = self.make_scheduler(is_open=is_open.is_set, next_open=next_open, closed_recheck=600)
+        thread, results = in_thread(scheduler.next_tick)
+        thread.join(0.2)
+        self.assertTrue(thread.is_alive())
+        scheduler.on_bar('SPY', {})  # Ignored while closed
+        thread.join(0.1)
+        self.assertEqual(len(calls), 1)  # One wait until the open, no polling
+
+        started = time.monotonic()
+        scheduler.stop()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(results, [None])
+
+    def test_restart_after_stop(self):
+        scheduler = self.make_scheduler()
+        scheduler.stop()
+        self.assertIsNone(scheduler.next_tick())
+        scheduler.start()
+        self.assertEqual(scheduler.next_tick(), {'open': set()})
+
+
+if __name__ == '__main__':
+    unittest.main()
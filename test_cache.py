@@ -0,0 +1,72 @@
+import threading
+import time
+import unittest
+
+from cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_get_many_splits_hits_and_misses(self):
+        cache = TTLCache()
+        cache.set_many('snapshot', {'AAPL': {'price': 1.0}, 'MSFT': {'price': 2.0}})
+        hits, misses = cache.get_many('snapshot', ['AAPL', 'SPY', 'MSFT'])
+        self.assertEqual(set(hits), {'AAPL', 'MSFT'})
+        self.assertEqual(misses, ['SPY'])
+
+    def test_namespaces_are_independent(self):
+        cache = TTLCache()
+        cache.set('snapshot', 'AAPL', 1)
+        self.assertIsNone(cache.get('vwap', 'AAPL'))
+
+    def test_entries_expire_per_namespace(self):
+        cache = TTLCache(ttls={'fast': 0.01, 'slow': 60})
+        cache.set('fast', 'a', 1)
+        cache.set('slow', 'a', 2)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('fast', 'a'))
+        self.assertEqual(cache.get('slow', 'a'), 2)
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_lru_eviction_by_count(self):
+        cache = TTLCache(max_entries=2)
+        cache.set('ns', 'a', 1)
+        cache.set('ns', 'b', 2)
+        cache.get('ns', 'a')  # 'b' is now least recently used
+        cache.set('ns', 'c', 3)
+        self.assertEqual(cache.get('ns', 'a'), 1)
+        self.assertIsNone(cache.get('ns', 'b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_eviction_by_bytes(self):
+        cache = TTLCache(max_bytes=2000)
+        for i in range(50):
+            cache.set('ns', i, 'x' * 100)
+        self.assertLessEqual(cache.stats()['bytes'], 2000)
+        self.assertLess(len(cache), 50)
+
+    def test_stats_count_hits_and_misses(self):
+        cache = TTLCache()
+        cache.set('ns', 'a', 1)
+        cache.get('ns', 'a')
+        cache.get('ns', 'b')
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_concurrent_writers_respect_bound(self):
+        cache = TTLCache(max_entries=100)
+
+        def writer(offset):
+            for i in range(1000):
+                cache.set('ns', offset + i, i)
+                cache.get('ns', offset + i // 2)
+
+        threads = [threading.Thread(target=writer, args=(n * 1000,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertLessEqual(len(cache), 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
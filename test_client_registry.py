@@ -0,0 +1,71 @@
+import os
+import unittest
+from unittest import mock
+
+from client_registry import ClientRegistry
+
+
+class TestClientRegistry(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault('ALPACA_API_KEY', 'test-key')
+        os.environ.setdefault('ALPACA_API_SECRET', 'test-secret')
+        self.registry = ClientRegistry()
+
+    def test_clients_are_shared_and_pooled(self):
+        trading = self.registry.trading_client()
+        self.assertIs(self.registry.trading_client(), trading)
+        self.assertIs(self.registry.data_client(), self.registry.data_client())
+        adapter = trading._session.get_adapter('https://paper-api.alpaca.markets')
+        self.assertEqual(adapter._pool_maxsize, 16)
+
+    def test_connection_checked_until_first_success(self):
+        results = [False, True]
+        calls = []
+
+        def check():
+            calls.append(1)
+            return results[len(calls) - 1]
+        self.assertFalse(self.registry.check_connection(check))
+        self.assertTrue(self.registry.check_connection(check))
+        self.assertTrue(self.registry.check_connection(check))
+        self.assertEqual(len(calls), 2)
+
+    def test_openai_client_rebuilt_only_when_key_changes(self):
+        os.environ['OPENAI_API_KEY'] = 'sk-one'
+        first = self.registry.openai_client()
+        self.assertIs(self.registry.openai_client(), first)
+        os.environ['OPENAI_API_KEY'] = 'sk-two'
+        second = self.registry.openai_client()
+        self.assertIsNot(second, first)
+        self.assertTrue(first._client.is_closed)
+        self.assertFalse(second._client.is_closed)
+
+    def test_dotenv_is_not_reloaded_on_every_call(self):
+        os.environ['OPENAI_API_KEY'] = 'sk-one'
+        with mock.patch('client_registry.load_dotenv') as load_dotenv:
+            self.registry.openai_client()
+            self.registry.openai_client()
+        load_dotenv.assert_not_called()
+
+    def test_alpaca_clients_rebuilt_and_holders_notified_when_keys_rotate(self):
+        rotations = []
+        self.registry.add_rotation_listener(lambda: rotations.append(self.registry.trading_client()))
+        with mock.patch.dict(os.environ, {'ALPACA_API_KEY': 'key-one'}):
+            trading, data = self.registry.trading_client(), self.registry.data_client()
+            self.assertFalse(self.registry.refresh())
+            self.assertTrue(self.registry.check_connection(lambda: True))
+            with mock.patch.object(trading._session, 'close') as close_trading, \
+                    mock.patch.object(data._session, 'close') as close_data:
+                os.environ['ALPACA_API_KEY'] = 'key-two'
+                rotated = self.registry.trading_client()
+            close_trading.assert_called_once()
+            close_data.assert_called_once()
+        self.assertIsNot(rotated, trading)
+        self.assertEqual(rotated._api_key, 'key-two')
+        self.assertEqual(rotations, [rotated])
+        self.assertIsNot(self.registry.data_client(), data)
+        self.assertFalse(self.registry.check_connection(lambda: False))  # Checked again for the new keys
+
+
+if __name__ == '__main__':
+    unittest.main()
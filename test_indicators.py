@@ -0,0 +1,156 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from indicators import EMA, IndicatorEngine, RollingSMA, SessionVWAP, WilderRSI
+from test_bar_store import FakeDataClient, make_bar
+
+
+def reference_wilder_rsi(closes, period=14):
+    delta = np.diff(closes)
+    gains, losses = np.clip(delta, 0, None), np.clip(-delta, 0, None)
+    avg_gain, avg_loss = gains[:period].mean(), losses[:period].mean()
+    for gain, loss in zip(gains[period:], losses[period:]):
+        avg_gain = (avg_gain * (period - 1) + gain) / period
+        avg_loss = (avg_loss * (period - 1) + loss) / period
+    return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+class TestStreamingIndicators(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.closes = 100 + np.cumsum(rng.normal(0, 1, 500))
+
+    def test_sma_matches_pandas_rolling_mean(self):
+        sma = RollingSMA(20)
+        values = [sma.update(c) for c in self.closes]
+        expected = pd.Series(self.closes).rolling(20).mean()
+        self.assertIsNone(values[18])
+        np.testing.assert_allclose(values[19:], expected[19:], rtol=1e-12)
+
+    def test_ema_matches_sma_seeded_recursion(self):
+        ema = EMA(12)
+        for c in self.closes:
+            value = ema.update(c)
+        expected = self.closes[:12].mean()
+        for c in self.closes[12:]:
+            expected += 2 / 13 * (c - expected)
+        self.assertAlmostEqual(value, expected, places=9)
+
+    def test_rsi_matches_wilder_reference(self):
+        rsi = WilderRSI(14)
+        for i, c in enumerate(self.closes):
+            value = rsi.update(c)
+            if i < 14:
+                self.assertIsNone(value)
+        self.assertAlmostEqual(value, reference_wilder_rsi(self.closes), places=9)
+
+    def test_peek_equals_update_without_mutating(self):
+        for indicator in (RollingSMA(5), EMA(5), WilderRSI(5)):
+            for c in self.closes[:50]:
+                indicator.update(c)
+            peeked = indicator.peek(123.0)
+            self.assertEqual(indicator.peek(123.0), peeked)
+            self.assertAlmostEqual(indicator.update(123.0), peeked, places=12)
+
+    def test_vwap_resets_each_session(self):
+        vwap = SessionVWAP()
+        day1 = datetime(2024, 3, 4, 15, 0, tzinfo=timezone.utc)
+        vwap.update(day1, 11, 9, 10, 100)
+        vwap.update(day1 + timedelta(minutes=1), 21, 19, 20, 100)
+        self.assertAlmostEqual(vwap.value, 15.0)
+        vwap.update(day1 + timedelta(days=1), 31, 29, 30, 50)
+        self.assertAlmostEqual(vwap.value, 30.0)
+
+    def test_engine_applies_closed_bars_once_and_previews_forming_bar(self):
+        engine = IndicatorEngine(timedelta(days=1))
+        t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        now = t0 + timedelta(days=30, hours=12)
+        index = pd.DatetimeIndex([t0 + timedelta(days=i) for i in range(31)], name='timestamp')
+        df = pd.DataFrame({'high': self.closes[:31] + 1, 'low': self.closes[:31] - 1,
+                           'close': self.closes[:31], 'volume': 100.0}, index=index)
+        engine.ingest('AAPL', df, now)
+        # The last bar is still forming: it is previewed but not committed
+        self.assertEqual(engine.last_timestamp('AAPL'), index[-2])
+        expected = pd.Series(self.closes[:31]).rolling(5).mean().iloc[-1]
+        self.assertAlmostEqual(engine.snapshot('AAPL')['sma_5'], expected, places=9)
+        # Re-ingesting the same frame later commits only the formerly forming bar
+        engine.ingest('AAPL', df, now + timedelta(days=1))
+        self.assertEqual(engine.last_timestamp('AAPL'), index[-1])
+        self.assertAlmostEqual(engine.snapshot('AAPL')['sma_5'], expected, places=9)
+
+
+class TestBatchIndicators(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.environ.setdefault('ALPACA_API_KEY', 'test-key')
+        os.environ.setdefault('ALPACA_API_SECRET', 'test-secret')
+        os.environ['BAR_STORE_DIR'] = self.root
+        from market_data_service import MarketDataService
+        self.service = MarketDataService()
+        rng = np.random.default_rng(7)
+        now = datetime.now(timezone.utc)
+        self.closes = 100 + np.cumsum(rng.normal(0, 1, 60))
+        # All 60 bars fall inside the warmup window; the newest one is still forming
+        self.client = FakeDataClient([make_bar(now - timedelta(days=59.5 - i), float(c))
+                                      for i, c in enumerate(self.closes)])
+        self.service.data_client = self.client
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_batch_matches_independently_computed_indicators(self):
+        batch = self.service.get_technical_indicators_batch(['AAPL', 'MSFT'])
+        self.assertEqual(set(batch), {'AAPL', 'MSFT'})
+
+        def ema(period):
+            value = self.closes[:period].mean()
+            for c in self.closes[period:]:
+                value += 2 / (period + 1) * (c - value)
+            return value
+
+        expected = {
+            'current_price': self.closes[-1],
+            'sma_5': self.closes[-5:].mean(),
+            'sma_20': self.closes[-20:].mean(),
+            'ema_12': ema(12),
+            'ema_26': ema(26),
+            'rsi': reference_wilder_rsi(self.closes),
+            'volume': 100
+        }
+        for symbol in ('AAPL', 'MSFT'):
+            for field, value in expected.items():
+                self.assertAlmostEqual(batch[symbol][field], value, places=9, msg=f"{symbol} {field}")
+
+    def test_batch_uses_one_request_for_all_symbols(self):
+        symbols = [f"SYM{i}" for i in range(50)]
+        result = self.service.get_technical_indicators_batch(symbols, days=30)
+        self.assertEqual(len(result), 50)
+        self.assertEqual(len(self.client.requests), 1)
+
+    def test_warm_symbols_only_fetch_new_bars(self):
+        self.service.get_technical_indicators_batch(['AAPL'], days=30)
+        self.service.cache.invalidate()
+        self.service.get_technical_indicators_batch(['AAPL'], days=30)
+        tail_start, _ = self.client.requests[-1]
+        self.assertGreater(tail_start, datetime.now(timezone.utc) - timedelta(days=2))
+
+    def test_batch_serves_repeat_calls_from_cache(self):
+        self.service.get_technical_indicators_batch(['AAPL'], days=30)
+        self.service.get_technical_indicators_batch(['AAPL'], days=30)
+        self.assertEqual(len(self.client.requests), 1)
+
+    def test_deprecated_days_shares_one_cache_entry(self):
+        batch = self.service.get_technical_indicators_batch(['AAPL'], days=30)
+        single = self.service.get_technical_indicators('AAPL', days=5)
+        self.assertEqual(single, batch['AAPL'])
+        self.assertEqual(len(self.client.requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
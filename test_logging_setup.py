@@ -0,0 +1,59 @@
+import logging
+import queue
+import unittest
+from unittest import mock
+
+from logging_setup import DroppingQueueHandler, SamplingFilter
+
+
+def make_record(level=logging.DEBUG, lineno=10, msg='tick %s'):
+    return logging.LogRecord('trading_bot', level, 'trading_bot.py', lineno, msg, (1,), None)
+
+
+class TestSamplingFilter(unittest.TestCase):
+    def test_repeated_debug_records_are_sampled_per_call_site(self):
+        sampler = SamplingFilter(burst=3, interval=60)
+        with mock.patch('logging_setup.time.monotonic', return_value=100.0):
+            passed = [sampler.filter(make_record()) for _ in range(10)]
+            self.assertEqual(passed.count(True), 3)
+            # Another call site and higher levels are not affected
+            self.assertTrue(sampler.filter(make_record(lineno=11)))
+            self.assertTrue(all(sampler.filter(make_record(logging.WARNING)) for _ in range(10)))
+
+        with mock.patch('logging_setup.time.monotonic', return_value=161.0):
+            record = make_record()
+            self.assertTrue(sampler.filter(record))
+            self.assertIn('[7 similar suppressed]', record.getMessage())
+            self.assertIn('tick 1', record.getMessage())
+
+
+class TestDroppingQueueHandler(unittest.TestCase):
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = DroppingQueueHandler(queue.Queue(2))
+        for _ in range(5):
+            handler.handle(make_record(logging.INFO))
+        self.assertEqual(handler.queue.qsize(), 2)
+        self.assertEqual(handler.dropped, 3)
+        self.assertEqual(handler.queue.get_nowait().getMessage(), 'tick 1')
+
+
+class TestImportSideEffects(unittest.TestCase):
+    def test_importing_the_web_app_keeps_root_handlers(self):
+        import importlib
+        import os
+        import sys
+        os.environ.setdefault('ALPACA_API_KEY', 'test-key')
+        os.environ.setdefault('ALPACA_API_SECRET', 'test-secret')
+        handler = logging.NullHandler()
+        root = logging.getLogger()
+        root.addHandler(handler)
+        try:
+            sys.modules.pop('web_app', None)
+            importlib.import_module('web_app')
+            self.assertIn(handler, root.handlers)
+        finally:
+            root.removeHandler(handler)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from alpaca.data.timeframe import TimeFrame
+from bar_frames import BAR_DTYPE
+from bar_store import BarStore
+from market_breadth import DEFAULT_UNIVERSE, compute_breadth, load_universe
+from test_bar_store import FakeDataClient, make_bar
+
+
+def make_records(closes, t0):
+    records = np.empty(len(closes), dtype=BAR_DTYPE)
+    records['timestamp'] = [pd.Timestamp(t0 + timedelta(days=i)).value for i in range(len(closes))]
+    records['close'] = closes
+    records['open'] = closes
+    records['high'] = closes + 1
+    records['low'] = closes - 1
+    records['volume'] = 100.0
+    return records
+
+
+class TestComputeBreadth(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        t0 = datetime(2023, 1, 1, tzinfo=timezone.utc)
+        self.records = {}
+        for i in range(40):
+            length = 300 if i % 5 else 30  # Some symbols have a short history
+            closes = 50 + np.cumsum(rng.normal(0, 1, length))
+            self.records[f"S{i:02d}"] = make_records(closes, t0 + timedelta(days=300 - length))
+
+    def reference(self, sma_window=50, window=252):
+        advancing = declining = highs = lows = above = with_sma = 0
+        changes = {}
+        for symbol, r in self.records.items():
+            close = pd.Series(r['close'])
+            change = (close.iloc[-1] - close.iloc[-2]) / close.iloc[-2] * 100
+            changes[symbol] = change
+            advancing += change > 0
+            declining += change < 0
+            highs += r['high'][-1] >= r['high'][-window - 1:-1].max()
+            lows += r['low'][-1] <= r['low'][-window - 1:-1].min()
+            if len(close) >= sma_window:
+                with_sma += 1
+                above += close.iloc[-1] > close.iloc[-sma_window:].mean()
+        return advancing, declining, highs, lows, above / with_sma * 100, changes
+
+    def test_matches_per_symbol_reference(self):
+        advancing, declining, highs, lows, pct_above, changes = self.reference()
+        breadth = compute_breadth(self.records)
+        self.assertEqual(breadth['advancing'], advancing)
+        self.assertEqual(breadth['declining'], declining)
+        self.assertEqual(breadth['new_highs'], highs)
+        self.assertEqual(breadth['new_lows'], lows)
+        self.assertAlmostEqual(breadth['pct_above_sma'], pct_above)
+        ranked = sorted(changes, key=changes.get)
+        self.assertEqual([c['symbol'] for c in breadth['top_gainers']], ranked[-5:])
+        self.assertEqual([c['symbol'] for c in breadth['top_losers']], ranked[:5])
+
+    def test_stale_symbols_are_excluded(self):
+        self.records['OLD'] = self.records['S01'][:-3]
+        breadth = compute_breadth(self.records)
+        self.assertEqual(breadth['symbols'], 40)
+        self.assertEqual(breadth['stale_symbols'], 1)
+
+    def test_empty_universe(self):
+        self.assertIsNone(compute_breadth({}))
+
+
+class TestUniverseAndFetching(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_load_universe_from_file(self):
+        path = os.path.join(self.root, 'universe.txt')
+        with open(path, 'w') as f:
+            f.write("# S&P sample\naapl\nMSFT, nvda\n\nAAPL  # duplicate\n")
+        self.assertEqual(load_universe(path), ['AAPL', 'MSFT', 'NVDA'])
+        self.assertEqual(load_universe(os.path.join(self.root, 'missing.txt')), DEFAULT_UNIVERSE)
+
+    def test_chunks_fetched_in_parallel_and_merged(self):
+        t0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        client = FakeDataClient([make_bar(t0 + timedelta(days=i), 100.0 + i) for i in range(10)])
+        store = BarStore(self.root, max_symbols_per_request=3, max_workers=4)
+        symbols = [f"S{i}" for i in range(10)]
+        records = store.sync_records(client, symbols, TimeFrame.Day, t0, t0 + timedelta(days=9))
+        self.assertEqual(len(client.requests), 4)
+        self.assertEqual(sorted(records), sorted(symbols))
+        self.assertTrue(all(len(r) == 10 for r in records.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
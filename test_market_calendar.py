@@ -0,0 +1,75 @@
+import unittest
+from datetime import date, datetime, timedelta
+
+from alpaca.trading.models import Calendar
+
+from indicators import EASTERN
+from market_calendar import MarketCalendar
+
+
+class FakeTradingClient:
+    """Serves weekday sessions (early close on 2024-07-03) and counts calendar requests"""
+
+    def __init__(self):
+        self.requests = []
+
+    def get_calendar(self, request):
+        self.requests.append(request)
+        sessions = []
+        day = request.start
+        while day <= request.end:
+            if day.weekday() < 5 and day != date(2024, 7, 4):
+                close = '13:00' if day == date(2024, 7, 3) else '16:00'
+                sessions.append(Calendar(date=day.isoformat(), open='09:30', close=close))
+            day += timedelta(days=1)
+        return sessions
+
+
+def eastern(*args):
+    return EASTERN.localize(datetime(*args))
+
+
+class TestMarketCalendar(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeTradingClient()
+        self.calendar = MarketCalendar(self.client)
+
+    def test_open_and_closed_intervals(self):
+        self.assertTrue(self.calendar.is_open(eastern(2024, 7, 1, 10, 0)))
+        self.assertFalse(self.calendar.is_open(eastern(2024, 7, 1, 16, 0)))
+        self.assertFalse(self.calendar.is_open(eastern(2024, 7, 1, 9, 29)))
+        self.assertTrue(self.calendar.is_open(eastern(2024, 7, 1, 9, 30)))
+
+    def test_next_open_and_close_skip_holidays_and_early_closes(self):
+        self.assertEqual(self.calendar.next_close(eastern(2024, 7, 3, 10, 0)), eastern(2024, 7, 3, 13, 0))
+        self.assertFalse(self.calendar.is_open(eastern(2024, 7, 3, 14, 0)))
+        self.assertEqual(self.calendar.next_open(eastern(2024, 7, 3, 14, 0)), eastern(2024, 7, 5, 9, 30))
+        status = self.calendar.status(eastern(2024, 7, 6, 12, 0))
+        self.assertFalse(status['is_open'])
+        self.assertEqual(status['next_open'], eastern(2024, 7, 8, 9, 30).isoformat())
+        self.assertEqual(status['next_close'], eastern(2024, 7, 8, 16, 0).isoformat())
+
+    def test_calendar_loaded_once_within_refresh_window(self):
+        start = eastern(2024, 7, 1, 9, 0)
+        for minute in range(0, 12 * 60, 7):
+            self.calendar.is_open(start + timedelta(minutes=minute))
+        self.assertEqual(len(self.client.requests), 1)
+
+    def test_reload_only_after_refresh_interval_at_boundary(self):
+        self.calendar.is_open(eastern(2024, 7, 1, 10, 0))
+        # The next boundary crossed after refresh_after triggers one re-fetch
+        self.calendar.is_open(eastern(2024, 7, 2, 10, 0))
+        self.assertEqual(len(self.client.requests), 2)
+        self.calendar.is_open(eastern(2024, 7, 2, 11, 0))
+        self.assertEqual(len(self.client.requests), 2)
+
+    def test_failed_load_reports_closed_and_retries_later(self):
+        def fail(request):
+            raise ConnectionError('calendar unavailable')
+        self.client.get_calendar = fail
+        self.assertFalse(self.calendar.is_open(eastern(2024, 7, 1, 10, 0)))
+        self.assertIsNone(self.calendar.next_open(eastern(2024, 7, 1, 10, 0, 30)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -61,9 +61,8 @@ class TestMarketDataService(unittest.TestCase):
         second_data = self.service.get_market_snapshot([symbol])
         self.assertEqual(first_data, second_data)
         
-        # Verify cache key exists
-        cache_key = f"snapshot_{symbol}"
-        self.assertIn(cache_key, self.service.cache)
+        # Verify the symbol is cached on its own key
+        self.assertIsNotNone(self.service.cache.get('snapshot', symbol))
 
 if __name__ == '__main__':
     unittest.main()
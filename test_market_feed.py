@@ -0,0 +1,152 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta, timezone
+
+from alpaca.data.timeframe import TimeFrame
+from bar_frames import bars_to_records
+from bar_store import BarStore
+import market_feed
+from market_feed import MarketDataFeed, ReplaySource
+from test_bar_store import make_bar
+
+
+def bar_event(symbol, ts, close, volume=100.0):
+    return {'type': 'bar', 'symbol': symbol, 'timestamp': ts, 'open': close,
+            'high': close + 1, 'low': close - 1, 'close': close, 'volume': volume}
+
+
+class TestMarketDataFeed(unittest.TestCase):
+    def setUp(self):
+        self.t0 = datetime(2024, 1, 2, 15, 0, tzinfo=timezone.utc)
+
+    def replay(self, events, symbols=('AAPL',)):
+        source = ReplaySource(events)
+        feed = MarketDataFeed(source)
+        feed.subscribe(list(symbols))
+        feed.start()
+        source.join(5)
+        return feed
+
+    def test_bars_trades_and_quotes_update_latest_state(self):
+        feed = self.replay([
+            bar_event('AAPL', self.t0 - timedelta(hours=18, minutes=1), 100.0),  # Previous session's last bar
+            bar_event('AAPL', self.t0 - timedelta(hours=18), 99.0),  # 16:00 ET, after hours
+            bar_event('AAPL', self.t0, 101.0),
+            bar_event('AAPL', self.t0 + timedelta(minutes=1), 102.0, volume=250.0),
+            {'type': 'quote', 'symbol': 'AAPL', 'timestamp': self.t0 + timedelta(minutes=2),
+             'bid': 101.9, 'ask': 102.1, 'bid_size': 3, 'ask_size': 4},
+            {'type': 'trade', 'symbol': 'AAPL', 'timestamp': self.t0 + timedelta(minutes=2),
+             'price': 103.0, 'size': 10},
+        ])
+        latest = feed.latest('AAPL')
+        self.assertEqual(latest['price'], 103.0)
+        self.assertEqual((latest['bid'], latest['ask']), (101.9, 102.1))
+        snapshot = feed.snapshot(['AAPL'])['AAPL']
+        self.assertEqual(snapshot['price'], 103.0)
+        self.assertEqual(snapshot['volume'], 250)
+        self.assertAlmostEqual(snapshot['change'], 3.0)
+
+    def test_seeded_session_close_rolls_over_to_the_next_session(self):
+        feed = MarketDataFeed(ReplaySource([]))
+        previous_day = (self.t0 - timedelta(days=1)).date()
+        feed.seed_session('AAPL', previous_day, 100.0, 90.0)
+        feed.on_bar('AAPL', self.t0 - timedelta(hours=6), 95.0, 95.0, 95.0, 95.0, 10)  # Pre-market
+        self.assertAlmostEqual(feed.snapshot(['AAPL'])['AAPL']['change'], -5.0)  # vs the seeded session close
+        feed.on_bar('AAPL', self.t0, 104.0, 104.0, 104.0, 104.0, 10)
+        self.assertAlmostEqual(feed.snapshot(['AAPL'])['AAPL']['change'], 4.0)
+
+    def test_unsubscribed_and_stale_symbols_are_omitted(self):
+        feed = self.replay([bar_event('AAPL', self.t0, 100.0), bar_event('MSFT', self.t0, 300.0)])
+        self.assertIsNone(feed.latest('MSFT'))
+        feed.max_age = -1
+        self.assertEqual(feed.snapshot(['AAPL']), {})
+
+    def test_bar_listeners_receive_bars_in_order(self):
+        seen = []
+        source = ReplaySource([bar_event('AAPL', self.t0 + timedelta(minutes=i), 100.0 + i) for i in range(5)])
+        feed = MarketDataFeed(source)
+        feed.add_bar_listener(lambda symbol, bar: seen.append(bar['close']))
+        feed.start()
+        source.join(5)
+        self.assertEqual(seen, [100.0, 101.0, 102.0, 103.0, 104.0])
+
+    def test_bound_method_listeners_register_once_and_are_held_weakly(self):
+        class Subscriber:
+            def __init__(self):
+                self.bars = 0
+
+            def on_bar(self, symbol, bar):
+                self.bars += 1
+
+        feed = MarketDataFeed(ReplaySource([]))
+        subscriber = Subscriber()
+        feed.add_bar_listener(subscriber.on_bar)
+        feed.add_bar_listener(subscriber.on_bar)
+        feed.on_bar('AAPL', self.t0, 1, 1, 1, 1, 1)
+        self.assertEqual(subscriber.bars, 1)
+        del subscriber
+        self.assertEqual(len(feed._bar_listeners), 0)
+
+    def test_replay_from_bar_store_merges_symbols_by_time(self):
+        root = tempfile.mkdtemp()
+        try:
+            store = BarStore(root)
+            for offset, symbol in enumerate(['AAPL', 'MSFT']):
+                bars = [make_bar(self.t0 + timedelta(minutes=2 * i + offset), 100.0 + i) for i in range(3)]
+                store.write(symbol, TimeFrame.Minute, bars_to_records(bars),
+                            bars[0].timestamp, bars[-1].timestamp)
+            source = ReplaySource.from_bar_store(store, ['AAPL', 'MSFT'], TimeFrame.Minute)
+            self.assertEqual([e['symbol'] for e in source.events], ['AAPL', 'MSFT'] * 3)
+        finally:
+            shutil.rmtree(root)
+
+
+class TestServiceStreaming(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.environ.setdefault('ALPACA_API_KEY', 'test-key')
+        os.environ.setdefault('ALPACA_API_SECRET', 'test-secret')
+        os.environ['BAR_STORE_DIR'] = self.root
+        from market_data_service import MarketDataService
+        self.service = MarketDataService()
+        self.source = ReplaySource([])
+        self.service.feed = MarketDataFeed(self.source)
+        self.service.feed.add_bar_listener(self.service._on_stream_bar)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_snapshot_served_from_feed_without_rest(self):
+        ts = datetime.now(timezone.utc)
+        self.service.feed.on_trade('AAPL', ts, 150.0, 5)
+        self.service.data_client = None  # Any REST call would fail
+        snapshot = self.service.get_market_snapshot(['aapl'])
+        self.assertEqual(snapshot['AAPL']['price'], 150.0)
+
+    def test_stream_bar_extends_intraday_engine(self):
+        engine = self.service.intraday_indicators
+        t0 = datetime.now(timezone.utc).replace(second=0, microsecond=0) - timedelta(minutes=10)
+        engine.update_bar('AAPL', t0, 101.0, 99.0, 100.0, 100.0, datetime.now(timezone.utc))
+        self.service.feed.on_bar('AAPL', t0 + timedelta(minutes=1), 100, 103, 101, 102, 100)
+        self.assertEqual(engine.last_timestamp('AAPL'), t0 + timedelta(minutes=1))
+        # A bar after a gap is left for the REST backfill
+        self.service.feed.on_bar('AAPL', t0 + timedelta(minutes=5), 100, 103, 101, 102, 100)
+        self.assertEqual(engine.last_timestamp('AAPL'), t0 + timedelta(minutes=1))
+
+
+class TestSharedFeed(unittest.TestCase):
+    def test_refusing_process_never_opens_the_websocket(self):
+        with mock.patch.dict(os.environ, {'MARKET_DATA_STREAM': 'alpaca'}), \
+                mock.patch.object(market_feed, '_shared_feed', None), \
+                mock.patch.object(market_feed, '_websocket_refused', None), \
+                mock.patch.object(market_feed.AlpacaStreamSource, 'start') as start:
+            market_feed.refuse_websocket("several workers")
+            self.assertIsNone(market_feed.get_shared_feed())
+            start.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
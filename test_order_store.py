@@ -0,0 +1,167 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from alpaca.trading.enums import OrderSide, OrderStatus, OrderType, QueryOrderStatus
+
+from order_store import OrderStore, decode_cursor, encode_cursor, trade_key
+
+T0 = datetime.now(timezone.utc) - timedelta(days=1)
+
+
+def make_order(i, status=OrderStatus.FILLED, updated=None, symbol='AAPL'):
+    submitted = T0 + timedelta(minutes=i)
+    filled = status == OrderStatus.FILLED
+    return SimpleNamespace(
+        id=f"order-{i}", symbol=symbol, side=OrderSide.BUY, type=OrderType.MARKET, status=status, qty='10',
+        filled_qty='10' if filled else '0', filled_avg_price='100.5' if filled else None,
+        submitted_at=submitted, filled_at=submitted + timedelta(seconds=1) if filled else None,
+        updated_at=updated or submitted + timedelta(seconds=1)
+    )
+
+
+class FakeOrdersClient:
+    """Applies status/symbols/after/until/limit like Alpaca's GET /orders (newest first)"""
+
+    def __init__(self, orders):
+        self.orders = orders
+        self.requests = []
+
+    def get_orders(self, request):
+        self.requests.append(request)
+        open_statuses = (OrderStatus.NEW, OrderStatus.PARTIALLY_FILLED, OrderStatus.ACCEPTED)
+        wanted_open = request.status == QueryOrderStatus.OPEN
+        orders = [o for o in self.orders if request.status == QueryOrderStatus.ALL
+                  or (o.status in open_statuses) == wanted_open]
+        if request.symbols:
+            orders = [o for o in orders if o.symbol in request.symbols]
+        if request.after:
+            orders = [o for o in orders if o.submitted_at > request.after]
+        if request.until:
+            orders = [o for o in orders if o.submitted_at < request.until]
+        orders.sort(key=lambda o: o.submitted_at, reverse=True)
+        return orders[:request.limit]
+
+
+class FakeStream:
+    def __init__(self):
+        self.callback = None
+
+    def start(self, callback):
+        self.callback = callback
+
+    def stop(self):
+        self.callback = None
+
+
+class TestOrderStore(unittest.TestCase):
+    def setUp(self):
+        self.orders = [make_order(i) for i in range(23)] + [make_order(30, OrderStatus.NEW)]
+        self.client = FakeOrdersClient(self.orders)
+        self.stream = FakeStream()
+        self.store = OrderStore(self.client, self.stream, page_size=5)
+
+    def test_horizon_covers_orders_submitted_before_it_and_filled_after(self):
+        resting = make_order(-60 * 24 * 40)  # Submitted 40 days before T0
+        resting.filled_at = T0
+        store = OrderStore(FakeOrdersClient([resting]), page_size=5, backfill_days=30, order_lifetime_days=90)
+        store.ensure_started()
+        self.assertLess(store.horizon, T0)
+        self.assertEqual([o.id for o in store.recent_fills(since=(round(store.horizon.timestamp() * 1e6), ''))],
+                         [resting.id])
+
+    def test_rebind_reloads_the_table_for_new_credentials(self):
+        self.store.ensure_started()
+        other_client, other_stream = FakeOrdersClient([make_order(40, symbol='MSFT')]), FakeStream()
+        self.store.rebind(other_client, other_stream)
+        self.assertIsNone(self.stream.callback)  # The old account's stream is stopped
+        self.assertEqual(len(self.store), 0)
+        self.assertTrue(self.store.ensure_started())
+        self.assertEqual([o.id for o in self.store.recent_fills()], ['order-40'])
+        self.assertIsNotNone(other_stream.callback)
+
+    def test_open_quantities_count_unfilled_open_orders_by_side(self):
+        self.store.ensure_started()
+        sell = make_order(31, OrderStatus.PARTIALLY_FILLED, symbol='MSFT')
+        sell.side, sell.filled_qty = OrderSide.SELL, '4'
+        self.store.upsert(sell)
+        self.store.upsert(make_order(32, OrderStatus.CANCELED, symbol='MSFT'))
+
+        self.assertEqual(self.store.open_quantities(), {'AAPL': 10.0, 'MSFT': -6.0})
+        self.assertEqual(self.store.open_quantities(['MSFT']), {'MSFT': -6.0})
+
+    def test_backfill_paginates_and_subscribes_first(self):
+        self.assertTrue(self.store.ensure_started())
+        self.assertIsNotNone(self.stream.callback)
+        self.assertEqual(len(self.store), 24)
+        # One open-orders query plus six closed pages: each page after the first
+        # starts with the previous page's oldest order again
+        self.assertEqual(len(self.client.requests), 1 + 6)
+        self.assertTrue(self.store.ensure_started())
+        self.assertEqual(len(self.client.requests), 7)
+
+    def test_backfill_keeps_orders_sharing_a_page_boundary_timestamp(self):
+        for order in self.orders[11:14]:  # The second page ends inside this group
+            order.submitted_at = self.orders[11].submitted_at
+        self.store.ensure_started()
+        self.assertEqual(len(self.store), 24)
+        self.assertEqual(len(self.store.recent_fills(100)), 23)
+
+    def test_recent_fills_newest_first(self):
+        self.store.ensure_started()
+        fills = self.store.recent_fills(3)
+        self.assertEqual([o.id for o in fills], ['order-22', 'order-21', 'order-20'])
+
+    def test_recent_fills_between_keys_and_by_symbol(self):
+        self.orders.append(make_order(25, symbol='MSFT'))
+        self.store.ensure_started()
+        before = trade_key(self.orders[20])
+        since = trade_key(self.orders[15])
+        fills = self.store.recent_fills(10, before=before, since=since)
+        self.assertEqual([o.id for o in fills], [f"order-{i}" for i in range(19, 15, -1)])
+        self.assertEqual([o.id for o in self.store.recent_fills(10, symbols={'MSFT'})], ['order-25'])
+
+    def test_cursor_round_trip(self):
+        key = trade_key(self.orders[3])
+        self.assertEqual(decode_cursor(encode_cursor(key)), key)
+        with self.assertRaises(ValueError):
+            decode_cursor('not-a-cursor')
+
+    def test_stream_updates_fill_open_orders_and_notify(self):
+        events = []
+        self.store.add_listener(lambda event, order: events.append((event, order.id)))
+        self.store.ensure_started()
+        self.stream.callback('fill', make_order(30, OrderStatus.FILLED, updated=T0 + timedelta(hours=2)))
+        self.assertEqual(self.store.recent_fills(1)[0].id, 'order-30')
+        self.assertEqual(events, [('fill', 'order-30')])
+
+    def test_listeners_register_once_and_can_be_removed(self):
+        events = []
+        listener = lambda event, order: events.append(event)
+        self.store.add_listener(listener)
+        self.store.add_listener(listener)
+        self.store.apply_update('fill', make_order(41))
+        self.store.remove_listener(listener)
+        self.store.apply_update('fill', make_order(42))
+        self.assertEqual(events, ['fill'])
+
+    def test_older_version_does_not_overwrite_newer(self):
+        self.store.upsert(make_order(40, OrderStatus.FILLED, updated=T0 + timedelta(hours=3)))
+        self.store.upsert(make_order(40, OrderStatus.NEW, updated=T0 + timedelta(hours=1)))
+        self.assertEqual(self.store.get('order-40').status, OrderStatus.FILLED)
+        self.assertEqual(len(self.store.recent_fills()), 1)
+
+    def test_failed_backfill_is_retried(self):
+        get_orders = self.client.get_orders
+
+        def fail(request):
+            raise ConnectionError('offline')
+        self.client.get_orders = fail
+        self.assertFalse(self.store.ensure_started())
+        self.client.get_orders = get_orders
+        self.assertTrue(self.store.ensure_started())
+        self.assertEqual(len(self.store.recent_fills(100)), 23)
+
+
+if __name__ == '__main__':
+    unittest.main()
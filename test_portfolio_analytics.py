@@ -0,0 +1,52 @@
+import unittest
+from types import SimpleNamespace
+
+from portfolio_analytics import analyze_portfolio, position_columns
+
+
+def make_position(symbol, qty, market_value, plpc, pl=10.0):
+    return SimpleNamespace(symbol=symbol, qty=str(qty), avg_entry_price='100', current_price='110',
+                           market_value=str(market_value), unrealized_pl=str(pl), unrealized_plpc=str(plpc))
+
+
+class TestPortfolioAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.positions = [
+            make_position('AAPL', 10, 3000, 0.10),
+            make_position('MSFT', 5, 5000, -0.05, pl=-20.0),
+            make_position('TSLA', -4, -2000, 0.02),
+            make_position('NVDA', 2, 0, 0.30)
+        ]
+        self.analysis = analyze_portfolio(position_columns(self.positions), 10000.0, 4000.0, 8000.0)
+
+    def test_existing_metrics(self):
+        a = self.analysis
+        self.assertEqual([p['symbol'] for p in a['positions']], ['MSFT', 'AAPL', 'NVDA', 'TSLA'])
+        self.assertEqual((a['winning_positions'], a['losing_positions']), (3, 1))
+        self.assertAlmostEqual(a['avg_winner_return'], 14.0)
+        self.assertAlmostEqual(a['max_position_gain'], 30.0)
+        self.assertAlmostEqual(a['max_position_loss'], -5.0)
+        self.assertAlmostEqual(a['top_5_concentration'], 60.0)
+        self.assertAlmostEqual(a['total_pl'], 10.0)
+        self.assertEqual([p['symbol'] for p in a['best_positions']], ['NVDA', 'AAPL', 'TSLA'])
+        self.assertEqual(a['worst_positions'][0]['symbol'], 'MSFT')
+
+    def test_exposure_concentration_and_risk(self):
+        a = self.analysis
+        self.assertEqual(a['exposure']['long'], 8000)
+        self.assertEqual(a['exposure']['short'], 2000)
+        self.assertAlmostEqual(a['exposure']['net_percent'], 60.0)
+        self.assertAlmostEqual(a['hhi'], 0.3 ** 2 + 0.5 ** 2 + 0.2 ** 2)
+        contributions = {p['symbol']: p['risk_contribution'] for p in a['positions']}
+        self.assertAlmostEqual(sum(contributions.values()), 100.0)
+        self.assertAlmostEqual(contributions['MSFT'], 25 / 38 * 100)
+        self.assertEqual(contributions['NVDA'], 0)
+
+    def test_formatted_dicts_and_empty_portfolio(self):
+        dicts = [vars(p) for p in self.positions]
+        self.assertEqual(analyze_portfolio(position_columns(dicts), 10000.0, 0, 0)['hhi'], self.analysis['hhi'])
+        self.assertIsNone(analyze_portfolio(position_columns([]), 10000.0, 0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
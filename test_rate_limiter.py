@@ -0,0 +1,92 @@
+import threading
+import time
+import unittest
+
+from rate_limiter import Priority, RateLimiter, classify, request_priority, throttle
+
+
+class FakeRestClient:
+    def __init__(self):
+        self.calls = []
+
+    def _one_request(self, method, url, opts, retry):
+        self.calls.append((method, url))
+        return {}
+
+
+class RecordingLimiter:
+    def __init__(self):
+        self.priorities = []
+
+    def acquire(self, priority):
+        self.priorities.append(priority)
+        return 0.0
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_burst_is_immediate_then_rate_limited(self):
+        limiter = RateLimiter(requests_per_minute=600, burst=3)  # 10 per second
+        waits = [limiter.acquire() for _ in range(4)]
+        self.assertEqual(waits[:3], [0.0, 0.0, 0.0])
+        self.assertGreater(waits[3], 0.05)
+
+    def test_waiters_are_served_by_priority(self):
+        limiter = RateLimiter(requests_per_minute=600, burst=1)
+        limiter.acquire()  # Drain the bucket so everyone below has to queue
+        order = []
+        lock = threading.Lock()
+
+        def worker(priority):
+            limiter.acquire(priority)
+            with lock:
+                order.append(priority)
+
+        threads = []
+        for priority in (Priority.DASHBOARD, Priority.MARKET_DATA, Priority.DASHBOARD, Priority.ORDERS):
+            thread = threading.Thread(target=worker, args=(priority,))
+            thread.start()
+            threads.append(thread)
+            time.sleep(0.01)
+        for thread in threads:
+            thread.join(5)
+
+        # The first waiter may already hold the head slot; the rest are ordered by priority
+        self.assertEqual(order[-3:], sorted(order[-3:]))
+        self.assertEqual(order.count(Priority.ORDERS), 1)
+        self.assertLess(order.index(Priority.ORDERS), order.index(Priority.MARKET_DATA))
+
+    def test_stats_track_waits_per_priority(self):
+        limiter = RateLimiter(requests_per_minute=600, burst=1)
+        limiter.acquire(Priority.ORDERS)
+        limiter.acquire(Priority.DASHBOARD)
+        stats = limiter.stats()
+        self.assertEqual(stats['priorities']['orders']['queued'], 0)
+        self.assertEqual(stats['priorities']['dashboard']['queued'], 1)
+        self.assertGreater(stats['priorities']['dashboard']['max_wait'], 0)
+
+    def test_try_acquire_never_blocks(self):
+        limiter = RateLimiter(requests_per_minute=600, burst=1)
+        self.assertIsNone(limiter.try_acquire(Priority.DASHBOARD))
+        wait = limiter.try_acquire(Priority.DASHBOARD)
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 0.1)
+
+
+class TestThrottle(unittest.TestCase):
+    def test_priority_from_request_or_context(self):
+        limiter = RecordingLimiter()
+        client = throttle(FakeRestClient(), limiter)
+        client._one_request('POST', 'https://paper-api.alpaca.markets/v2/orders', {}, 3)
+        client._one_request('GET', 'https://data.alpaca.markets/v2/stocks/bars', {}, 3)
+        with request_priority(Priority.DASHBOARD):
+            client._one_request('GET', 'https://paper-api.alpaca.markets/v2/account', {}, 3)
+        self.assertEqual(limiter.priorities, [Priority.ORDERS, Priority.MARKET_DATA, Priority.DASHBOARD])
+        self.assertEqual(len(client.calls), 3)
+
+    def test_classify(self):
+        self.assertEqual(classify('GET', 'https://api.alpaca.markets/v2/orders'), Priority.ACCOUNT)
+        self.assertEqual(classify('DELETE', 'https://api.alpaca.markets/v2/orders/1'), Priority.ORDERS)
+
+
+if __name__ == '__main__':
+    unittest.main()
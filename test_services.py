@@ -0,0 +1,55 @@
+import threading
+import time
+import unittest
+
+from services import LazyServices
+
+
+class TestLazyServices(unittest.TestCase):
+    def test_built_once_on_first_use(self):
+        built = []
+
+        def factory():
+            time.sleep(0.05)
+            built.append(object())
+            return built[-1]
+        services = LazyServices({'svc': factory})
+        self.assertEqual(built, [])
+        threads = [threading.Thread(target=services.get, args=('svc',)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(built), 1)
+        self.assertIs(services.get('svc'), built[0])
+        self.assertGreater(services.health()['services']['svc']['init_seconds'], 0.04)
+
+    def test_health_reports_readiness(self):
+        checked = threading.Event()
+        services = LazyServices({'ok': object}, checks={'api': lambda: checked.wait(5)})
+        self.assertEqual(services.health()['status'], 'starting')
+        services.start_readiness_check()
+        checked.set()
+        services._readiness_thread.join(5)
+        self.assertEqual(services.health()['status'], 'ok')
+
+    def test_failed_service_is_degraded_and_retried(self):
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ValueError('missing credentials')
+            return 'service'
+        services = LazyServices({'flaky': flaky})
+        with self.assertRaises(ValueError):
+            services.get('flaky')
+        health = services.health()
+        self.assertEqual(health['status'], 'degraded')
+        self.assertEqual(health['services']['flaky']['error'], 'missing credentials')
+        self.assertEqual(services.get('flaky'), 'service')
+        self.assertEqual(services.health()['status'], 'ok')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import threading
+import time
+import unittest
+
+from single_flight import SingleFlight, coalesced
+
+
+class SlowService:
+    def __init__(self):
+        self._single_flight = SingleFlight()
+        self.calls = 0
+
+    @coalesced
+    def fetch(self, symbols):
+        self.calls += 1
+        time.sleep(0.05)
+        return {s: len(s) for s in symbols}
+
+
+def run_concurrently(fn, count):
+    results, errors = [], []
+    barrier = threading.Barrier(count)
+
+    def worker():
+        barrier.wait()
+        try:
+            results.append(fn())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_identical_calls_share_one_execution(self):
+        service = SlowService()
+        results, errors = run_concurrently(lambda: service.fetch(['AAPL', 'MSFT']), 10)
+        self.assertEqual(errors, [])
+        self.assertEqual(service.calls, 1)
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(r == {'AAPL': 4, 'MSFT': 4} for r in results))
+        self.assertEqual(service._single_flight.stats()['coalesced'], 9)
+
+    def test_different_arguments_run_separately(self):
+        service = SlowService()
+        t = threading.Thread(target=service.fetch, args=(['AAPL'],))
+        t.start()
+        service.fetch(['MSFT'])
+        t.join()
+        self.assertEqual(service.calls, 2)
+
+    def test_sequential_calls_are_not_cached(self):
+        service = SlowService()
+        service.fetch(['AAPL'])
+        service.fetch(['AAPL'])
+        self.assertEqual(service.calls, 2)
+
+    def test_errors_propagate_to_all_waiters(self):
+        flight = SingleFlight()
+
+        def failing():
+            time.sleep(0.05)
+            raise RuntimeError('boom')
+
+        results, errors = run_concurrently(lambda: flight.do('key', failing), 5)
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 5)
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
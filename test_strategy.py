@@ -0,0 +1,35 @@
+import unittest
+
+import numpy as np
+
+from indicators import WilderRSI
+from strategy import BUY, HOLD, SELL, decide, order_quantity, rsi_signal, wilder_rsi
+
+
+class TestStrategy(unittest.TestCase):
+    def test_vectorized_rsi_matches_streaming_rsi(self):
+        closes = 100 + np.cumsum(np.random.default_rng(1).normal(0, 1, 300))
+        streaming = WilderRSI(14)
+        expected = [streaming.update(close) for close in closes]
+        vectorized = wilder_rsi(closes, 14)
+        self.assertTrue(np.isnan(vectorized[:14]).all())
+        self.assertTrue(all(value is None for value in expected[:14]))
+        np.testing.assert_allclose(vectorized[14:], np.array(expected[14:], dtype=float), rtol=1e-9)
+
+    def test_signal_on_scalars_and_arrays(self):
+        self.assertEqual(rsi_signal(25), BUY)
+        self.assertEqual(rsi_signal(75), SELL)
+        self.assertEqual(rsi_signal(None), HOLD)
+        np.testing.assert_array_equal(rsi_signal(np.array([10, 50, 90, np.nan])), [BUY, HOLD, SELL, HOLD])
+
+    def test_buy_only_when_flat_and_sell_only_when_holding(self):
+        self.assertEqual(decide(BUY, 0, 1000, 30.0), ('BUY', 33))
+        self.assertIsNone(decide(BUY, 10, 1000, 30.0))
+        self.assertEqual(decide(SELL, 10, 1000, 30.0), ('SELL', 10))
+        self.assertIsNone(decide(SELL, 0, 1000, 30.0))
+        self.assertIsNone(decide(BUY, 0, 1000, 2000.0))  # Position size buys no whole share
+        np.testing.assert_array_equal(order_quantity(1000, np.array([30.0, 2000.0])), [33, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,208 @@
+import ast
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from config import TradingConfig
+from trading_bot import TickContext, TradingBot
+
+
+class FakeMarketData:
+    def __init__(self):
+        self.snapshot_requests = []
+        self.indicator_requests = []
+
+    def get_market_snapshot(self, symbols):
+        self.snapshot_requests.append(list(symbols))
+        return {symbol: {'symbol': symbol, 'price': 100.0} for symbol in symbols}
+
+    def subscribe(self, symbols):
+        pass
+
+    def get_technical_indicators_batch(self, symbols):
+        self.indicator_requests.append(list(symbols))
+        return {symbol: {'rsi': 50} for symbol in symbols if symbol != 'NVDA'}
+
+
+class FakeAlpaca:
+    def __init__(self):
+        self.calls = []
+        self.orders = []
+        self.batch_ids = []
+
+    def get_positions(self):
+        self.calls.append('positions')
+        return [{'symbol': 'AAPL', 'qty': 5.0}]
+
+    def get_portfolio_summary(self):
+        self.calls.append('summary')
+        return {'portfolio_value': 5000.0}
+
+    def submit_bulk_orders(self, orders, batch_id=None):
+        self.batch_ids.append(batch_id)
+        self.orders.extend(orders)
+        return {'results': [{'symbol': o['symbol'], 'success': True, 'order_id': str(i)} for i, o in enumerate(orders)]}
+
+
+class SlowAI:
+    """Market context that takes `delays[symbol]` seconds and tracks how many run at once"""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.running = 0
+        self.max_running = 0
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def analyze_market_context(self, snapshot, tweets):
+        symbol = ast.literal_eval(snapshot)['symbol']
+        with self.lock:
+            self.calls.append(symbol)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(self.delays[symbol])
+        finally:
+            with self.lock:
+                self.running -= 1
+        return {'context': symbol}
+
+
+class BotTestCase(unittest.TestCase):
+    def make_bot(self, delays):
+        self.market_data = FakeMarketData()
+        self.ai = SlowAI(delays)
+        return TradingBot(TradingConfig(symbols=list(delays)), alpaca=FakeAlpaca(), market_data=self.market_data,
+                          ai=self.ai, calendar=object())
+
+    def make_context(self, symbols, indicators=None):
+        return TickContext(
+            symbols=symbols,
+            snapshot={symbol: {'symbol': symbol, 'price': 100.0} for symbol in symbols},
+            indicators={symbol: {'rsi': 50} for symbol in symbols} if indicators is None else indicators
+        )
+
+
+class TestAnalyzeSymbols(BotTestCase):
+    def test_runs_concurrently_within_cap_and_keeps_order(self):
+        delays = {'SPY': 0.2, 'AAPL': 0.05, 'MSFT': 0.1, 'NVDA': 0.05}
+        bot = self.make_bot(delays)
+        started = time.perf_counter()
+        results = bot.analyze_symbols(self.make_context(list(delays)), max_workers=3)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual([symbol for symbol, _ in results], list(delays))
+        self.assertEqual([analysis['market_context']['context'] for _, analysis in results], list(delays))
+        self.assertLess(elapsed, sum(delays.values()))
+        self.assertEqual(self.ai.max_running, 3)
+        self.assertEqual(self.market_data.snapshot_requests, [])  # Analysis reads the context only
+
+    def test_slow_symbol_times_out_without_holding_up_the_rest(self):
+        delays = {'SPY': 0.05, 'AAPL': 1.0, 'MSFT': 0.05}
+        bot = self.make_bot(delays)
+        started = time.perf_counter()
+        results = dict(bot.analyze_symbols(self.make_context(list(delays)), timeout=0.2))
+        self.assertLess(time.perf_counter() - started, 0.6)
+        self.assertIsNone(results['AAPL'])
+        self.assertIsNotNone(results['SPY'])
+        self.assertIsNotNone(results['MSFT'])
+
+    def test_hung_symbol_is_not_resubmitted_while_still_running(self):
+        delays = {'SPY': 0.05, 'AAPL': 1.0}
+        bot = self.make_bot(delays)
+        self.addCleanup(bot.stop)
+        context = self.make_context(list(delays))
+        first = dict(bot.analyze_symbols(context, timeout=0.2))
+        second = dict(bot.analyze_symbols(context, timeout=0.2))
+
+        self.assertIsNone(first['AAPL'])
+        self.assertIsNone(second['AAPL'])
+        self.assertIsNotNone(second['SPY'])
+        self.assertEqual(self.ai.calls.count('AAPL'), 1)
+        self.assertEqual(self.ai.calls.count('SPY'), 2)
+
+    def test_pass_ends_on_time_when_the_pool_is_saturated(self):
+        delays = {'AAPL': 1.0, 'SPY': 0.05}
+        bot = self.make_bot(delays)
+        self.addCleanup(bot.stop)
+        started = time.perf_counter()
+        # One worker, held by AAPL's hung analysis; SPY never gets a thread
+        results = dict(bot.analyze_symbols(self.make_context(list(delays)), max_workers=1, timeout=0.2,
+                                           pass_timeout=0.3))
+        self.assertLess(time.perf_counter() - started, 0.6)
+        self.assertEqual(results, {'AAPL': None, 'SPY': None})
+        self.assertTrue(bot._analyses['SPY'].cancelled())
+        self.assertEqual(self.ai.calls, ['AAPL'])
+
+    def test_missing_indicators_yield_none(self):
+        bot = self.make_bot({'SPY': 0, 'AAPL': 0})
+        results = dict(bot.analyze_symbols(self.make_context(['SPY', 'AAPL'], {'SPY': {'rsi': 50}})))
+        self.assertIsNone(results['AAPL'])
+        self.assertEqual(results['SPY']['snapshot']['price'], 100.0)
+
+
+class TestTickContext(BotTestCase):
+    def test_context_is_built_from_one_fetch_of_each_kind(self):
+        bot = self.make_bot({'SPY': 0, 'AAPL': 0, 'NVDA': 0})
+        context = bot.build_tick_context()
+        self.assertEqual(self.market_data.snapshot_requests, [['SPY', 'AAPL', 'NVDA']])
+        self.assertEqual(self.market_data.indicator_requests, [['SPY', 'AAPL', 'NVDA']])
+        self.assertEqual(bot.alpaca.calls, ['positions', 'summary'])
+        self.assertEqual(context.position_qty('AAPL'), 5.0)
+        self.assertEqual(context.position_qty('SPY'), 0.0)
+        self.assertEqual(context.price('SPY'), 100.0)
+
+        results = dict(bot.analyze_symbols(context))
+        self.assertIsNone(results['NVDA'])  # No indicators in the batch, and none refetched
+        self.assertEqual(len(self.market_data.indicator_requests), 1)
+
+    def test_trades_report_context_prices(self):
+        bot = self.make_bot({'SPY': 0})
+        updates = []
+        bot.set_update_handler(lambda kind, data: updates.append((kind, data)))
+        bot.execute_trades([('SPY', 'BUY', 3)], self.make_context(['SPY']))
+        self.assertEqual(self.market_data.snapshot_requests, [])
+        self.assertEqual(updates[0][1][0]['price'], 100.0)
+        self.assertEqual(bot.alpaca.orders, [{'symbol': 'SPY', 'qty': 3, 'side': 'buy'}])
+
+    def test_open_orders_count_toward_the_position(self):
+        bot = self.make_bot({'SPY': 0, 'AAPL': 0, 'MSFT': 0})
+        bot.running = True
+        pending = {'SPY': 5.0, 'AAPL': 2.0}
+        bot.alpaca.order_store = SimpleNamespace(ensure_started=lambda: True,
+                                                 open_quantities=lambda symbols: pending)
+        bot.analyze_symbols = lambda context: [(symbol, {'indicators': {'rsi': rsi}})
+                                               for symbol, rsi in (('SPY', 20), ('AAPL', 80), ('MSFT', 20))]
+        bot.run_tick()
+        # SPY's pending buy isn't repeated; AAPL sells only the 5 shares held
+        self.assertEqual(bot.alpaca.orders, [{'symbol': 'AAPL', 'qty': 5.0, 'side': 'sell'},
+                                             {'symbol': 'MSFT', 'qty': 10, 'side': 'buy'}])
+
+    def test_resubmitting_a_pass_reuses_its_batch_id(self):
+        bot = self.make_bot({'SPY': 0})
+        context = self.make_context(['SPY'])
+        bot.execute_trades([('SPY', 'BUY', 3)], context)
+        bot.execute_trades([('SPY', 'BUY', 3)], context)
+        self.assertEqual(bot.alpaca.batch_ids, [context.batch_id] * 2)
+
+
+
+class TestBotLoop(BotTestCase):
+    def test_runs_once_at_open_then_waits_and_stops_promptly(self):
+        bot = self.make_bot({'SPY': 0})
+        bot.calendar = SimpleNamespace(is_open=lambda: True, next_open=lambda: None)
+        thread = threading.Thread(target=bot.start, daemon=True)
+        thread.start()
+        time.sleep(0.3)
+        self.assertEqual(len(self.market_data.snapshot_requests), 1)  # No fixed-interval polling
+
+        started = time.monotonic()
+        bot.stop()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+        self.assertLess(time.monotonic() - started, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
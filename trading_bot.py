@@ -1,28 +1,78 @@
+import contextvars
+import logging
+import threading
 import time
 import schedule
-from datetime import datetime, time as dt_time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, time as dt_time, timezone
+from typing import Dict, List, Optional
 import pytz
-from config import TradingConfig, STRATEGIES
+from config import ANALYSIS_CONFIG, TradingConfig, STRATEGIES
+from bot_scheduler import BotScheduler
+from strategy import decide, rsi_signal
 from alpaca_client import AlpacaClient
 from ai_analyzer import AIAnalyzer
 from market_data_service import MarketDataService
+from market_calendar import get_market_calendar
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class TickContext:
+    """Market and portfolio state for one pass of the trading loop.
+
+    Built once per iteration from one batched snapshot, one indicator
+    batch, one positions fetch and one account fetch; every stage of the
+    pass reads from it instead of calling the APIs again.
+    """
+    symbols: List[str]
+    snapshot: Dict[str, dict] = field(default_factory=dict)
+    indicators: Dict[str, dict] = field(default_factory=dict)
+    positions: Dict[str, dict] = field(default_factory=dict)
+    open_orders: Dict[str, float] = field(default_factory=dict)  # Signed unfilled qty per symbol
+    account: Optional[dict] = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def price(self, symbol):
+        quote = self.snapshot.get(symbol)
+        return quote['price'] if quote else None
+
+    def position_qty(self, symbol):
+        position = self.positions.get(symbol)
+        return position['qty'] if position else 0.0
+
+    def exposure(self, symbol):
+        """Position plus the unfilled quantity of open orders, so a pending order isn't placed twice"""
+        return self.position_qty(symbol) + self.open_orders.get(symbol, 0.0)
+
+    @property
+    def batch_id(self):
+        """Order batch id of this pass; resubmitting its orders reuses their client_order_ids"""
+        return self.created_at.strftime('%Y%m%d%H%M%S%f')
 
 class TradingBot:
-    def __init__(self, config: TradingConfig):
+    def __init__(self, config: TradingConfig, alpaca=None, market_data=None, ai=None, calendar=None):
         self.config = config
-        self.alpaca = AlpacaClient()
-        self.market_data = MarketDataService()
-        self.ai = AIAnalyzer()
+        # Callers that already hold services (the web app) pass them in to share state and pools
+        self.alpaca = alpaca or AlpacaClient()
+        self.market_data = market_data or MarketDataService()
+        self.calendar = calendar or get_market_calendar()
+        self.ai = ai or AIAnalyzer()
         self.est_tz = pytz.timezone('US/Eastern')
         self.running = False
         self.update_handler = None
+        self.scheduler = BotScheduler(is_open=self.is_market_open, next_open=lambda: self.calendar.next_open())
+        self._listening = False
+        self._analysis_pool = None
+        self._analysis_lock = threading.Lock()
+        self._analyses = {}  # symbol -> future of its latest analysis
 
     def is_market_open(self):
         try:
-            clock = self.alpaca.get_clock()
-            return clock['is_open'] if clock else False
+            return self.calendar.is_open()
         except Exception as e:
-            print(f"Error checking market status: {e}")
+            logger.error("Error checking market status: %s", e)
             return False
 
     def set_update_handler(self, handler):
@@ -34,132 +84,266 @@ class TradingBot:
         if self.update_handler:
             self.update_handler(update_type, data)
 
-    def analyze_symbol(self, symbol):
+    def analyze_symbol(self, symbol, indicators=None, snapshot=None):
         try:
-            # Get market data
-            snapshot = self.market_data.get_market_snapshot([symbol])
-            if not snapshot or symbol not in snapshot:
-                print(f"No market data available for {symbol}")
+            # Get market data unless it was fetched for the whole batch
+            if snapshot is None:
+                snapshot = (self.market_data.get_market_snapshot([symbol]) or {}).get(symbol)
+            if not snapshot:
+                logger.warning("No market data available for %s", symbol)
                 return None
 
-            # Get technical indicators
-            indicators = self.market_data.get_technical_indicators(symbol)
+            # Get technical indicators unless they were computed for the whole batch
+            if indicators is None:
+                indicators = self.market_data.get_technical_indicators(symbol)
             if not indicators:
-                print(f"No technical indicators available for {symbol}")
+                logger.warning("No technical indicators available for %s", symbol)
                 return None
 
             # Get market context
             market_context = self.ai.analyze_market_context(
-                str(snapshot[symbol]),
+                str(snapshot),
                 []  # No tweets needed since we're using technical analysis
             )
 
             # Notify UI of updates
             self.notify_update('market_data', {
                 'symbol': symbol,
-                'snapshot': snapshot[symbol],
+                'snapshot': snapshot,
                 'indicators': indicators
             })
 
             return {
                 'symbol': symbol,
-                'snapshot': snapshot[symbol],
+                'snapshot': snapshot,
                 'indicators': indicators,
                 'market_context': market_context
             }
         except Exception as e:
-            print(f"Error analyzing symbol {symbol}: {e}")
+            logger.error("Error analyzing symbol %s: %s", symbol, e)
             return None
 
-    def execute_trade(self, symbol, action, quantity):
+    def build_tick_context(self, symbols=None):
+        """Fetch everything one pass of the loop needs, once"""
+        symbols = list(symbols or self.config.symbols)
+        positions = self.alpaca.get_positions() or []
+        open_orders = {}
+        order_store = getattr(self.alpaca, 'order_store', None)
+        if order_store:
+            # Orders this process submitted are in the store even if the backfill hasn't run
+            order_store.ensure_started()
+            open_orders = order_store.open_quantities(symbols)
+        return TickContext(
+            symbols=symbols,
+            snapshot=self.market_data.get_market_snapshot(symbols) or {},
+            indicators=self.market_data.get_technical_indicators_batch(symbols) or {},
+            positions={position['symbol']: position for position in positions},
+            open_orders=open_orders,
+            # Shares the account snapshot the positions were read from
+            account=self.alpaca.get_portfolio_summary()
+        )
+
+    def analyze_symbols(self, context, max_workers=None, timeout=None, pass_timeout=None):
+        """Analyze the context's symbols concurrently; returns (symbol, analysis) pairs in order.
+
+        Analyses run on one executor kept for the bot's lifetime, with
+        ``max_workers`` threads (fixed when it is first created). A symbol
+        still running ``timeout`` seconds after its analysis started is
+        skipped for this pass, and it is not resubmitted by later passes
+        until that analysis finishes, so hung calls can't pile up. The whole
+        pass ends ``pass_timeout`` seconds after submission even if the
+        executor is busy with earlier analyses: symbols still queued then
+        are cancelled. Failed and skipped symbols get None.
+        """
+        timeout = timeout or ANALYSIS_CONFIG['symbol_timeout']
+        pass_deadline = time.monotonic() + (pass_timeout or ANALYSIS_CONFIG['pass_timeout'])
+        pool = self._analysis_executor(max_workers)
+        symbols = context.symbols
+        started = {}
+
+        def analyze(symbol):
+            started[symbol] = time.monotonic()
+            # Empty entries stay falsy, so analyze_symbol doesn't refetch what the batch lacked
+            return self.analyze_symbol(symbol, context.indicators.get(symbol, {}), context.snapshot.get(symbol, {}))
+
+        results = {}
+        futures = {}
+        for symbol in symbols:
+            previous = self._analyses.get(symbol)
+            if previous is not None and not previous.done():
+                logger.warning("Skipping %s: its analysis from an earlier pass is still running", symbol)
+                continue
+            # Workers inherit the caller's context (request priority)
+            future = self._analyses[symbol] = pool.submit(contextvars.copy_context().run, analyze, symbol)
+            futures[future] = symbol
+        pending = set(futures)
+        while pending:
+            deadline = min(self._next_deadline(pending, futures, started, timeout), pass_deadline - time.monotonic())
+            done, pending = wait(pending, timeout=max(0, deadline), return_when=FIRST_COMPLETED)
+            for future in done:
+                if not future.cancelled():
+                    results[futures[future]] = future.result()
+            now = time.monotonic()
+            expired = {f for f in pending if futures[f] in started and now - started[futures[f]] >= timeout}
+            if now >= pass_deadline:
+                expired = set(pending)
+            for future in expired:
+                if future.cancel():
+                    logger.warning("Analysis of %s never started before the pass deadline", futures[future])
+                else:
+                    # Left running; its result is discarded
+                    logger.warning("Analysis of %s timed out", futures[future])
+            pending -= expired
+        return [(symbol, results.get(symbol)) for symbol in symbols]
+
+    def _analysis_executor(self, max_workers=None):
+        with self._analysis_lock:
+            if self._analysis_pool is None:
+                self._analysis_pool = ThreadPoolExecutor(
+                    max_workers=max_workers or ANALYSIS_CONFIG['max_workers'], thread_name_prefix='analysis')
+            return self._analysis_pool
+
+    @staticmethod
+    def _next_deadline(pending, futures, started, timeout, poll=0.1):
+        """Seconds until the earliest running analysis times out"""
+        now = time.monotonic()
+        deadlines = [started[futures[f]] + timeout for f in pending if futures[f] in started]
+        if len(deadlines) < len(pending):
+            # A queued analysis may have just started without a deadline being seen yet
+            deadlines.append(now + poll)
+        return max(0, min(deadlines) - now)
+
+    def execute_trade(self, symbol, action, quantity, context=None):
+        results = self.execute_trades([(symbol, action, quantity)], context)
+        return results[0] if results else None
+
+    def execute_trades(self, trades, context=None):
+        """Submit (symbol, action, quantity) trades concurrently as one batch.
+
+        Prices reported to the UI come from ``context`` when given.
+        """
         try:
-            # Convert action to Alpaca's side format
-            side = 'buy' if action.upper() == 'BUY' else 'sell'
+            if not trades:
+                return []
+            orders = [
+                {'symbol': symbol, 'qty': quantity, 'side': 'buy' if action.upper() == 'BUY' else 'sell'}
+                for symbol, action, quantity in trades
+            ]
+            batch = self.alpaca.submit_bulk_orders(orders, batch_id=context.batch_id if context is not None else None)
             
-            # Place the order
-            order = self.alpaca.submit_order(
-                symbol=symbol,
-                qty=quantity,
-                side=side,
-                type='market',
-                time_in_force='day'
-            )
+            # Quotes from this pass's context, or fetched once for the batch
+            if context is not None:
+                snapshot = context.snapshot
+            else:
+                symbols = [result['symbol'] for result in batch['results'] if result['success']]
+                snapshot = self.market_data.get_market_snapshot(symbols) if symbols else {}
             
-            if order:
-                # Get the current quote
-                snapshot = self.market_data.get_market_snapshot([symbol])
-                price = snapshot[symbol]['price'] if snapshot and symbol in snapshot else None
-                
-                # Notify UI of the trade
-                trade_data = {
+            # Notify UI of the trades
+            trade_data = []
+            for (symbol, action, quantity), result in zip(trades, batch['results']):
+                if not result['success']:
+                    logger.error("Error executing trade %s %s: %s", action, symbol, result['error'])
+                    continue
+                trade_data.append({
                     'symbol': symbol,
                     'action': action,
                     'quantity': quantity,
-                    'price': price,
+                    'price': snapshot[symbol]['price'] if snapshot and symbol in snapshot else None,
                     'time': datetime.now().isoformat(),
-                    'order_id': order.get('id')
-                }
-                self.notify_update('trades', [trade_data])
-                
-                print(f"Trade executed: {action} {quantity} shares of {symbol}")
-                return order
+                    'order_id': result['order_id']
+                })
+                logger.info("Trade executed: %s %s shares of %s", action, quantity, symbol)
+            if trade_data:
+                self.notify_update('trades', trade_data)
+            return batch['results']
         except Exception as e:
-            print(f"Error executing trade: {e}")
-            return None
+            logger.error("Error executing trades: %s", e)
+            return []
 
     def stop(self):
-        """Stop the trading bot"""
+        """Stop the trading bot; a waiting loop wakes up immediately"""
         self.running = False
+        self.scheduler.stop()
+        with self._analysis_lock:
+            pool, self._analysis_pool = self._analysis_pool, None
+        if pool:
+            # Don't wait for hung analyses; queued ones are dropped
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _listen_for_events(self):
+        """Wake the scheduler on bar closes and quotes for our symbols and on fills of our orders"""
+        if self._listening:
+            return
+        self._listening = True
+        feed = getattr(self.market_data, 'feed', None)
+        if feed:
+            # Bound methods are held weakly by the shared feed, so a discarded bot is unregistered
+            feed.add_bar_listener(self._on_bar)
+            if 'quote' in self.scheduler.wake_on:
+                feed.add_quote_listener(self._on_quote)
+        else:
+            logger.info("No streaming feed; the bot runs on the scheduler heartbeat")
+        order_store = getattr(self.alpaca, 'order_store', None)
+        if order_store:
+            order_store.add_listener(self.scheduler.on_order_update)
+
+    def _on_bar(self, symbol, bar):
+        if symbol in self.config.symbols:
+            self.scheduler.on_bar(symbol, bar)
+
+    def _on_quote(self, symbol, quote):
+        if symbol in self.config.symbols:
+            self.scheduler.on_quote(symbol, quote)
 
     def start(self):
-        """Start the trading bot"""
-        print("Starting trading bot...")
+        """Start the trading bot; each pass runs when the scheduler sees new data"""
+        logger.info("Starting trading bot...")
         self.running = True
+        self.market_data.subscribe(self.config.symbols)
+        self._listen_for_events()
+        self.scheduler.start()
         
         while self.running:
-            if not self.is_market_open():
-                print("Market is closed. Waiting...")
-                time.sleep(60)
-                continue
+            triggers = self.scheduler.next_tick()
+            if triggers is None:
+                break
+            logger.debug("Trading pass triggered by %s", ', '.join(sorted(triggers)))
+            self.run_tick()
 
-            try:
-                for symbol in self.config.symbols:
-                    if not self.running:
-                        break
-                        
-                    analysis = self.analyze_symbol(symbol)
-                    if analysis is None:
-                        continue
-
-                    # Get current positions
-                    positions = self.alpaca.get_positions()
-                    self.notify_update('positions', positions)
-
-                    # Get current price
-                    snapshot = self.market_data.get_market_snapshot([symbol])
-                    if snapshot and symbol in snapshot:
-                        current_price = snapshot[symbol]['price']
-                        self.notify_update('price', {'symbol': symbol, 'price': current_price})
-
-                        # Trading decision based on technical analysis
-                        indicators = analysis['indicators']
-                        if indicators:
-                            # Example strategy using RSI
-                            rsi = indicators.get('RSI', 50)  # Default to neutral if not available
-                            
-                            if rsi < 30:  # Oversold
-                                quantity = int(self.config.max_position_size / current_price)
-                                self.execute_trade(symbol, 'BUY', quantity)
-                            elif rsi > 70:  # Overbought
-                                quantity = int(self.config.max_position_size / current_price)
-                                self.execute_trade(symbol, 'SELL', quantity)
-
-                # Update portfolio
-                portfolio = self.alpaca.get_portfolio_summary()
-                if portfolio:
-                    self.notify_update('portfolio', portfolio)
-
-            except Exception as e:
-                print(f"Error in trading loop: {e}")
-
-            time.sleep(5)  # Wait 5 seconds before next iteration
+    def run_tick(self):
+        """Run one pass of the trading loop"""
+        try:
+            # One batched snapshot, indicator batch, positions and account fetch per pass
+            context = self.build_tick_context()
+            self.notify_update('positions', list(context.positions.values()))
+
+            # Per-symbol analysis runs concurrently; decisions follow in config order
+            trades = []
+            for symbol, analysis in self.analyze_symbols(context):
+                if not self.running:
+                    break
+                if analysis is None:
+                    continue
+
+                current_price = context.price(symbol)
+                self.notify_update('price', {'symbol': symbol, 'price': current_price})
+
+                # RSI strategy shared with backtest.py (thresholds from STRATEGIES['momentum'])
+                signal = rsi_signal(analysis['indicators'].get('rsi'))
+                order = decide(signal, context.exposure(symbol), self.config.max_position_size, current_price)
+                if order and order[0] == 'SELL':
+                    # Never sell shares that a pending buy hasn't delivered yet
+                    order = ('SELL', min(order[1], context.position_qty(symbol)))
+                if order and order[1] > 0:
+                    trades.append((symbol, *order))
+
+            # Orders for every signal of this pass go out together
+            self.execute_trades(trades, context)
+
+            # The account only needs refetching if this pass changed it
+            portfolio = self.alpaca.get_portfolio_summary() if trades else context.account
+            if portfolio:
+                self.notify_update('portfolio', portfolio)
+
+        except Exception as e:
+            logger.error("Error in trading loop: %s", e)
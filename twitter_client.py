@@ -5,8 +5,6 @@ import time
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class TwitterClient:
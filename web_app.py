@@ -1,37 +1,34 @@
-from flask import Flask, render_template, jsonify, request, redirect, url_for, flash
+from flask import Flask, render_template, jsonify, request, redirect, url_for, flash, g
 from flask_socketio import SocketIO, emit
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from trading_bot import TradingBot
 from config import TradingConfig
 from auth import User, init_admin_account
-from alpaca_client import AlpacaClient
+import asyncio
 import threading
 import queue
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv, set_key
-from ai_analyzer import AIAnalyzer
 import logging
-from market_data_service import MarketDataService
+from logging_setup import configure_logging
+from client_registry import get_client_registry
+from services import (get_alpaca_client, get_async_alpaca_client, get_async_market_data_service,
+                      get_market_data_service, services)
+from rate_limiter import Priority, get_rate_limiter, reset_request_priority, set_request_priority
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'your-secret-key')
 
-# Configure Socket.IO with async mode and logging
+# Socket.IO logs through named loggers so LOGGING_CONFIG['levels'] controls them
 socketio = SocketIO(
     app, 
     async_mode='threading',
     cors_allowed_origins="*",
-    logger=True,
-    engineio_logger=True
+    logger=logging.getLogger('socketio.server'),
+    engineio_logger=logging.getLogger('engineio.server')
 )
 
 # Initialize Flask-Login
@@ -39,19 +36,23 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+@app.before_request
+def use_dashboard_priority():
+    """Alpaca calls made while serving the UI queue behind orders and the bot"""
+    g.priority_token = set_request_priority(Priority.DASHBOARD)
+
+@app.teardown_request
+def reset_priority(exc):
+    token = g.pop('priority_token', None)
+    if token is not None:
+        reset_request_priority(token)
+
 @login_manager.user_loader
 def load_user(username):
     return User.get(username)
 
-# Initialize services
-try:
-    logger.info("Initializing services...")
-    market_data = MarketDataService()
-    alpaca = AlpacaClient()
-    logger.info("Services initialized successfully")
-except Exception as e:
-    logger.error(f"Error initializing services: {e}")
-    raise
+# Services are built on first use; warm them up and check the broker connection in the background
+services.start_readiness_check()
 
 # Global variables
 bot = None
@@ -135,53 +136,60 @@ def save_config(settings):
     with open(env_file, 'w') as f:
         f.write('\n'.join(env_content) + '\n')  # Add newline at end of file
     
-    # Force reload of environment variables
+    # Force reload of environment variables; rotated Alpaca keys rebuild the shared clients
     load_dotenv(override=True)
+    get_client_registry().refresh()
     
     # Return the current config
     return {key: os.getenv(key, '') for key in existing_config.keys()}
 
+async def fetch_dashboard_data(symbols):
+    """Portfolio summary, positions and market snapshot, fetched concurrently"""
+    return await asyncio.gather(
+        get_async_alpaca_client().get_portfolio_summary(),
+        get_async_alpaca_client().get_positions(),
+        get_async_market_data_service().get_market_snapshot(symbols)
+    )
+
 def background_thread():
     """Background thread for sending updates to clients"""
     logger.info("Starting background thread for updates...")
+    from async_services import run_coroutine
     thread_id = threading.get_ident()
     logger.debug("Background thread ID: %s", thread_id)
+    set_request_priority(Priority.DASHBOARD)
     
     while True:
         try:
-            # Update portfolio data every 30 seconds
-            logger.debug("Fetching portfolio summary...")
-            portfolio_summary = alpaca.get_portfolio_summary()
+            # Portfolio, positions and market data are fetched concurrently on the shared event loop
+            symbols = ['SPY', 'QQQ', 'AAPL', 'MSFT', 'GOOGL']  # Example symbols
+            get_market_data_service().subscribe(symbols)
+            logger.debug("Fetching portfolio summary, positions and market data...")
+            portfolio_summary, positions, market_snapshot = run_coroutine(fetch_dashboard_data(symbols), timeout=60)
+            
             if portfolio_summary:
-                logger.debug("Portfolio summary data: %s", portfolio_summary)
                 socketio.emit('portfolio_update', portfolio_summary, namespace='/')
             else:
                 logger.warning("No portfolio summary data available")
             
-            logger.debug("Fetching positions...")
-            positions = alpaca.get_positions()
             if positions:
-                logger.debug("Positions data: %s", positions)
+                logger.debug("Emitting %d positions", len(positions))
                 socketio.emit('positions_update', positions, namespace='/')
             else:
                 logger.warning("No positions data available")
             
             # Get recent trades
             logger.debug("Fetching recent trades...")
-            trades = alpaca.get_recent_trades()
+            trades = get_alpaca_client().get_recent_trades()
             if trades:
                 formatted_trades = [format_trade_data(trade) for trade in trades]
-                logger.debug("Trades data: %s", formatted_trades)
+                logger.debug("Emitting %d trades", len(formatted_trades))
                 socketio.emit('trades_update', formatted_trades, namespace='/')
             else:
                 logger.warning("No recent trades data available")
             
-            # Get market data
-            logger.debug("Fetching market data...")
-            symbols = ['SPY', 'QQQ', 'AAPL', 'MSFT', 'GOOGL']  # Example symbols
-            market_snapshot = market_data.get_market_snapshot(symbols)
             if market_snapshot:
-                logger.debug("Market snapshot data: %s", market_snapshot)
+                logger.debug("Emitting market data for %d symbols", len(market_snapshot))
                 socketio.emit('market_update', market_snapshot, namespace='/')
             else:
                 logger.warning("No market data available")
@@ -282,7 +290,8 @@ def update_settings():
 def test_sentiment():
     """Handle test sentiment request"""
     try:
-        # Initialize clients
+        # Initialize clients (openai is only imported when this is used)
+        from ai_analyzer import AIAnalyzer
         analyzer = AIAnalyzer()
         
         # Get tweets about a test symbol - reduced number of tweets and lookback period
@@ -331,7 +340,7 @@ def get_market_snapshot():
     """Get market snapshot for specified symbols"""
     try:
         symbols = request.args.get('symbols', 'SPY,QQQ,DIA,AAPL,MSFT,GOOGL').split(',')
-        snapshot = market_data.get_market_snapshot(symbols)
+        snapshot = get_market_data_service().get_market_snapshot(symbols)
         if snapshot:
             return jsonify(snapshot)
         return jsonify({'error': 'No market data available'}), 404
@@ -339,13 +348,28 @@ def get_market_snapshot():
         logger.error(f"Error getting market snapshot: {e}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/market/technical', methods=['GET'])
+@login_required
+def get_technical_data_batch():
+    """Get technical analysis data for several symbols at once"""
+    try:
+        symbols = request.args.get('symbols', 'SPY,QQQ,DIA,AAPL,MSFT,GOOGL').split(',')
+        days = int(request.args.get('days', 5))
+        data = get_market_data_service().get_technical_indicators_batch(symbols, days)
+        if data:
+            return jsonify(data)
+        return jsonify({'error': 'No technical data available'}), 404
+    except Exception as e:
+        logger.error(f"Error getting batch technical data: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/market/technical/<symbol>', methods=['GET'])
 @login_required
 def get_technical_data(symbol):
     """Get technical analysis data for a symbol"""
     try:
         days = int(request.args.get('days', 5))
-        data = market_data.get_technical_indicators(symbol, days)
+        data = get_market_data_service().get_technical_indicators(symbol, days)
         if data:
             return jsonify(data)
         return jsonify({'error': f'No technical data available for {symbol}'}), 404
@@ -358,7 +382,7 @@ def get_technical_data(symbol):
 def get_market_breadth():
     """Get market breadth data"""
     try:
-        data = market_data.get_market_breadth()
+        data = get_market_data_service().get_market_breadth()
         if data:
             return jsonify(data)
         return jsonify({'error': 'No market breadth data available'}), 404
@@ -371,7 +395,7 @@ def get_market_breadth():
 def get_vwap(symbol):
     """Get VWAP for a symbol"""
     try:
-        data = market_data.get_intraday_vwap(symbol)
+        data = get_market_data_service().get_intraday_vwap(symbol)
         if data:
             return jsonify(data)
         return jsonify({'error': f'No VWAP data available for {symbol}'}), 404
@@ -384,29 +408,39 @@ def get_vwap(symbol):
 def get_market_status():
     """Get market status"""
     try:
-        account = alpaca.get_account_info()
-        if account:
-            return jsonify({
-                'is_open': True,  # For now, we'll assume market is open if we can get account info
-                'next_open': None,
-                'next_close': None
-            })
-        return jsonify({'error': 'Could not determine market status'}), 404
+        return jsonify(get_market_data_service().get_market_status())
     except Exception as e:
         logger.error(f"Error getting market status: {e}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/market/cache/stats', methods=['GET'])
+@login_required
+def get_market_cache_stats():
+    """Get market data cache hit/miss/eviction counters"""
+    return jsonify(get_market_data_service().cache.stats())
+
+@app.route('/api/health', methods=['GET'])
+def health():
+    """Readiness of the lazily built services and the broker connection (no login required)"""
+    report = services.health()
+    return jsonify(report), 200 if report['status'] == 'ok' else 503
+
+@app.route('/api/rate-limit/stats', methods=['GET'])
+@login_required
+def get_rate_limit_stats():
+    """Get Alpaca request budget usage and queue wait times per priority"""
+    return jsonify(get_rate_limiter().stats())
+
 @app.route('/api/portfolio/summary')
 @login_required
 def get_portfolio_summary():
     """Handle get portfolio summary request"""
     try:
-        logger.info("Fetching portfolio summary...")
-        analysis = alpaca.get_portfolio_analysis()
+        analysis = get_alpaca_client().get_portfolio_analysis()
         if not analysis:
             logger.error("Portfolio analysis returned None")
             return jsonify({'error': 'Failed to get portfolio analysis'}), 500
-        logger.info("Portfolio summary: %s", analysis)
+        logger.debug("Portfolio summary for %d positions", analysis['positions_count'])
         return jsonify(analysis)
     except Exception as e:
         logger.error("Error fetching portfolio summary: %s", str(e))
@@ -417,7 +451,7 @@ def get_portfolio_summary():
 def get_positions():
     """Handle get positions request"""
     try:
-        positions = alpaca.get_positions()
+        positions = get_alpaca_client().get_positions()
         return jsonify(positions)
     except Exception as e:
         logger.error("Error fetching positions: %s", str(e))
@@ -426,38 +460,104 @@ def get_positions():
 @app.route('/api/portfolio/charts')
 @login_required
 def get_portfolio_charts():
-    """Handle get portfolio charts request"""
+    """Handle get portfolio charts request (figures are cached until positions change)"""
     try:
-        logger.info("Generating portfolio charts...")
-        charts = alpaca.create_portfolio_visualizations()
+        charts = get_alpaca_client().get_portfolio_charts()
         if not charts:
             logger.error("Portfolio charts returned None")
             return jsonify({'error': 'Could not generate charts'}), 500
-        logger.info("Successfully generated portfolio charts")
-        
-        # Convert Plotly figures to JSON
-        chart_data = {
-            'treemap': charts['treemap'].to_json(),
-            'distribution': charts['distribution'].to_json(),
-            'winners_losers': charts['winners_losers'].to_json(),
-            'allocation': charts['allocation'].to_json()
-        }
-        return jsonify(chart_data)
+        version, body = charts
+        response = app.response_class(body, mimetype='application/json')
+        response.headers['X-Charts-Version'] = version
+        return response
     except Exception as e:
         logger.error("Error generating charts: %s", str(e))
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/portfolio/chart-data')
+@login_required
+def get_portfolio_chart_data():
+    """Handle get chart data request: columnar arrays, answered with 304 while the ETag still matches"""
+    try:
+        chart_data = get_alpaca_client().get_portfolio_chart_data()
+        if not chart_data:
+            logger.error("Portfolio chart data returned None")
+            return jsonify({'error': 'Could not generate chart data'}), 500
+        version, body = chart_data
+        response = app.response_class(body, mimetype='application/json')
+        response.headers['X-Charts-Version'] = version
+        response.set_etag(version)
+        # Let the browser keep a copy but revalidate it on every load
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    except Exception as e:
+        logger.error("Error generating chart data: %s", str(e))
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/vendor/plotly-<version>.min.js')
+def plotly_bundle(version):
+    """Serve the plotly.js bundle matching the installed plotly package; cached by browsers for a year"""
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+    if version != get_plotlyjs_version():
+        return redirect(url_for('plotly_bundle', version=get_plotlyjs_version()))
+    response = app.response_class(get_plotlyjs(), mimetype='application/javascript')
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response
+
+@app.context_processor
+def plotly_js_url():
+    def url():
+        from plotly.offline import get_plotlyjs_version
+        return url_for('plotly_bundle', version=get_plotlyjs_version())
+    return {'plotly_js_url': url}
+
 @app.route('/api/trades/recent')
 @login_required
 def get_recent_trades():
-    """Handle get recent trades request"""
+    """Handle get recent trades request.
+
+    Query parameters: limit, status (filled/closed/open/all), symbols
+    (comma separated), after/until (ISO fill timestamps), cursor (next page of
+    older trades) and since (only trades newer than a previous cursor).
+    """
+    from order_store import decode_cursor
     try:
-        trades = alpaca.get_recent_trades()
-        return jsonify(trades)
+        try:
+            limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+            status = request.args.get('status', 'filled').lower()
+            if status not in ('filled', 'closed', 'open', 'all'):
+                raise ValueError(f"unknown status {status!r}")
+            symbols = [s.strip() for s in request.args.get('symbols', '').split(',') if s.strip()] or None
+            after, until = (_parse_timestamp(request.args.get(name)) for name in ('after', 'until'))
+            cursor = request.args.get('cursor')
+            since = request.args.get('since')
+            for value in (cursor, since):
+                if value:
+                    decode_cursor(value)
+        except ValueError as e:
+            return jsonify({'error': f"Invalid parameter: {e}"}), 400
+
+        trades = get_alpaca_client().get_recent_trades(limit=limit, status=status, symbols=symbols, after=after,
+                                          until=until, cursor=cursor, since=since)
+        return jsonify({
+            'trades': trades,
+            'next_cursor': trades[-1]['cursor'] if len(trades) == limit else None,
+            'latest_cursor': trades[0]['cursor'] if trades else since
+        })
     except Exception as e:
         logger.error("Error fetching recent trades: %s", str(e))
         return jsonify({'error': str(e)}), 500
 
+def _parse_timestamp(value):
+    """Parse an ISO timestamp query parameter; naive values are taken as UTC"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection"""
@@ -471,9 +571,9 @@ def handle_connect():
     
     # Send initial data
     try:
-        portfolio_summary = alpaca.get_portfolio_summary()
-        positions = alpaca.get_positions()
-        trades = alpaca.get_recent_trades()
+        portfolio_summary = get_alpaca_client().get_portfolio_summary()
+        positions = get_alpaca_client().get_positions()
+        trades = get_alpaca_client().get_recent_trades()
         
         if portfolio_summary:
             emit('portfolio_update', portfolio_summary)
@@ -496,7 +596,8 @@ def handle_start_bot():
     global bot, is_bot_running
     if not is_bot_running:
         config = TradingConfig()
-        bot = TradingBot(config)
+        from trading_bot import TradingBot
+        bot = TradingBot(config, alpaca=get_alpaca_client(), market_data=get_market_data_service())
         is_bot_running = True
         
         def bot_update_handler(update_type, data):
@@ -532,6 +633,9 @@ def format_trade_data(trade):
     }
 
 if __name__ == '__main__':
+    # Logging is set up by the entry point, not at import, so importing the app (tests, gunicorn) keeps its handlers
+    configure_logging()
+
     # Initialize admin account if it doesn't exist
     init_admin_account()
     